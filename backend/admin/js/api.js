@@ -119,14 +119,25 @@ class Api {
         return this.request('GET', '/users/me');
     }
 
+    // ========== 概览 API ==========
+
+    /**
+     * 获取后台概览统计
+     */
+    async getAdminSummary() {
+        return this.request('GET', '/admin/summary');
+    }
+
     // ========== 用户 API ==========
 
     /**
      * 获取用户列表
+     * cursor 为上一页返回的 next_cursor，传入时按游标翻页
      */
-    async getUsers(page = 1, pageSize = 20, search = null) {
+    async getUsers(page = 1, pageSize = 20, search = null, cursor = null) {
         let url = `/users/?page=${page}&page_size=${pageSize}`;
         if (search) url += `&search=${encodeURIComponent(search)}`;
+        if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
         return this.request('GET', url);
     }
 
@@ -155,11 +166,13 @@ class Api {
 
     /**
      * 获取设备列表
+     * cursor 为上一页返回的 next_cursor，传入时按游标翻页
      */
-    async getDevices(page = 1, pageSize = 20, deviceType = null, search = null) {
+    async getDevices(page = 1, pageSize = 20, deviceType = null, search = null, cursor = null) {
         let url = `/devices/?page=${page}&page_size=${pageSize}`;
         if (deviceType) url += `&device_type=${deviceType}`;
         if (search) url += `&search=${encodeURIComponent(search)}`;
+        if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
         return this.request('GET', url);
     }
 
@@ -190,6 +203,92 @@ class Api {
     async pairDevice(detectorId, feedbackerId) {
         return this.request('POST', `/devices/${detectorId}/pair?paired_device_id=${feedbackerId}`);
     }
+
+    /**
+     * 批量导入设备 (CSV 文件)
+     */
+    async importDevices(file) {
+        const response = await fetch(`${API_BASE}/devices/import`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'text/csv',
+                'Authorization': `Bearer ${this.token}`,
+            },
+            body: file,
+        });
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.detail || '导入失败');
+        }
+        return result;
+    }
+
+    // ========== 实时事件 ==========
+
+    /**
+     * 订阅实时事件 (优先 WebSocket，不可用时改用 SSE)
+     * onEvent 收到 presence / posture 事件；断线重连后调用 onResync，页面应重新拉取列表
+     * 返回取消订阅的函数
+     */
+    subscribeEvents(scope, onEvent, onResync = null) {
+        const query = `token=${encodeURIComponent(this.token || '')}&scope=${scope}`;
+        let socket = null;
+        let source = null;
+        let retryTimer = null;
+        let stopped = false;
+        let useSse = !('WebSocket' in window);
+        let connectedOnce = false;
+
+        const handle = (text) => {
+            const event = JSON.parse(text);
+            if (event.type !== 'ping') onEvent(event);
+        };
+
+        const opened = () => {
+            if (connectedOnce && onResync) onResync();
+            connectedOnce = true;
+        };
+
+        const retry = () => {
+            if (stopped || retryTimer) return;
+            retryTimer = setTimeout(() => {
+                retryTimer = null;
+                connect();
+            }, 3000);
+        };
+
+        const connect = () => {
+            if (useSse) {
+                source = new EventSource(`${API_BASE}/events/stream?${query}`);
+                source.onopen = opened;
+                source.onmessage = (e) => handle(e.data);
+                // 消费过慢被断开: 关闭后重连并重新拉取
+                source.addEventListener('evicted', () => {
+                    source.close();
+                    retry();
+                });
+                return;
+            }
+
+            socket = new WebSocket(`${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.host}${API_BASE}/events/ws?${query}`);
+            socket.onopen = opened;
+            socket.onmessage = (e) => handle(e.data);
+            socket.onclose = (e) => {
+                // 从未连上 (如代理不支持 WebSocket) 时改用 SSE；1008 为令牌无效，不再重连
+                if (!connectedOnce && e.code !== 1008) useSse = true;
+                if (e.code !== 1008) retry();
+            };
+        };
+
+        connect();
+
+        return () => {
+            stopped = true;
+            clearTimeout(retryTimer);
+            if (socket) socket.close();
+            if (source) source.close();
+        };
+    }
 }
 
 // 全局 API 实例
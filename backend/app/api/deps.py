@@ -9,8 +9,9 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import async_session
-from app.models.user import User
-from app.services.auth import AuthService
+from app.services.auth import AuthService, Principal
+from app.services.loaders import Loaders
+from app.services.principal_cache import principal_cache, token_digest
 
 # HTTP Bearer 认证
 security = HTTPBearer()
@@ -27,34 +28,45 @@ async def get_db() -> AsyncSession:
             raise
 
 
-async def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
-    """获取当前用户"""
-    token = credentials.credentials
-    payload = AuthService.decode_token(token)
+async def authenticate_token(token: str, db: AsyncSession) -> Principal:
+    """
+    校验访问令牌并返回主体 (供不经过 HTTPBearer 的 WebSocket / SSE 接口复用)
     
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的访问令牌",
-        )
+    先按令牌摘要查进程内缓存，命中时不解码令牌、不访问数据库；
+    未命中时解码令牌并按主键查询 id / phone / is_admin / is_active 四列后写入缓存。
     
-    if payload.get("type") != "access":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="令牌类型错误",
-        )
+    Raises:
+        HTTPException: 令牌无效、用户不存在或已禁用
+    """
+    digest = token_digest(token)
+    user = principal_cache.get(digest)
     
-    user_id = int(payload.get("sub", 0))
-    user = await AuthService.get_user_by_id(db, user_id)
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户不存在",
-        )
+    if user is None:
+        payload = AuthService.decode_token(token)
+        
+        if not payload:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="无效的访问令牌",
+            )
+        
+        if payload.get("type") != "access":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="令牌类型错误",
+            )
+        
+        user_id = int(payload.get("sub", 0))
+        version = principal_cache.version(user_id)
+        user = await AuthService.get_principal(db, user_id)
+        
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户不存在",
+            )
+        
+        principal_cache.put(digest, user, payload["exp"], version)
     
     if not user.is_active:
         raise HTTPException(
@@ -65,9 +77,21 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> Principal:
+    """
+    获取当前用户 (轻量主体)
+    
+    需要完整用户信息的接口自行加载 User。
+    """
+    return await authenticate_token(credentials.credentials, db)
+
+
 async def get_admin_user(
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_user)],
+) -> Principal:
     """获取管理员用户"""
     if not current_user.is_admin:
         raise HTTPException(
@@ -77,7 +101,13 @@ async def get_admin_user(
     return current_user
 
 
+def get_loaders(db: Annotated[AsyncSession, Depends(get_db)]) -> Loaders:
+    """获取请求内批量加载器 (与请求共用同一会话)"""
+    return Loaders(db)
+
+
 # 类型别名
 DbSession = Annotated[AsyncSession, Depends(get_db)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
-AdminUser = Annotated[User, Depends(get_admin_user)]
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
+AdminUser = Annotated[Principal, Depends(get_admin_user)]
+RequestLoaders = Annotated[Loaders, Depends(get_loaders)]
@@ -0,0 +1,24 @@
+"""
+管理后台 API
+"""
+from __future__ import annotations
+from fastapi import APIRouter, Response
+
+from app.api.deps import DbSession, AdminUser
+from app.schemas.admin import AdminSummary
+from app.schemas.common import ResponseModel
+from app.services.summary_service import SummaryService, summary_cache
+
+router = APIRouter(prefix="/admin", tags=["管理后台"])
+
+
+@router.get("/summary", response_model=ResponseModel[AdminSummary], summary="后台概览")
+async def get_summary(admin: AdminUser, db: DbSession, response: Response):
+    """
+    用户、设备、当日日志等全局统计 (管理员)
+    
+    结果最多缓存 ADMIN_SUMMARY_TTL 秒，generated_at 为计算时间。
+    """
+    summary = await summary_cache.get(lambda: SummaryService.compute(db))
+    response.headers["Cache-Control"] = f"private, max-age={int(summary_cache.ttl)}"
+    return ResponseModel(data=summary)
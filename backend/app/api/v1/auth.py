@@ -7,11 +7,21 @@ from app.api.deps import DbSession
 from app.schemas.auth import LoginRequest, RegisterRequest, TokenResponse, RefreshTokenRequest
 from app.schemas.common import ResponseModel
 from app.services.auth import AuthService
+from app.services.password_hasher import PasswordHasherBusy
 from app.services.user_service import UserService
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
 
+def _hasher_busy() -> HTTPException:
+    """密码哈希排队已满"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="服务繁忙，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=ResponseModel[TokenResponse], summary="用户注册")
 async def register(data: RegisterRequest, db: DbSession):
     """
@@ -31,11 +41,14 @@ async def register(data: RegisterRequest, db: DbSession):
     
     # 创建用户
     from app.schemas.user import UserCreate
-    user = await UserService.create_user(db, UserCreate(
-        phone=data.phone,
-        password=data.password,
-        nickname=data.nickname,
-    ))
+    try:
+        user = await UserService.create_user(db, UserCreate(
+            phone=data.phone,
+            password=data.password,
+            nickname=data.nickname,
+        ))
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     
     # 生成令牌
     access_token, expires_in = AuthService.create_access_token(user.id, user.is_admin)
@@ -56,7 +69,10 @@ async def login(data: LoginRequest, db: DbSession):
     - **phone**: 手机号
     - **password**: 密码
     """
-    user = await AuthService.authenticate_user(db, data.phone, data.password)
+    try:
+        user = await AuthService.authenticate_user(db, data.phone, data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     
     if not user:
         raise HTTPException(
@@ -83,7 +99,10 @@ async def admin_login(data: LoginRequest, db: DbSession):
     """
     管理员登录
     """
-    user = await AuthService.authenticate_user(db, data.phone, data.password)
+    try:
+        user = await AuthService.authenticate_user(db, data.phone, data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     
     if not user:
         raise HTTPException(
@@ -2,21 +2,38 @@
 设备管理 API
 """
 from __future__ import annotations
+import asyncio
+from dataclasses import asdict
 from typing import Optional
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, Request, status, Query
+from starlette.requests import ClientDisconnect
 
-from app.api.deps import DbSession, AdminUser, CurrentUser
+from app.api.deps import DbSession, AdminUser, CurrentUser, RequestLoaders
+from app.config import get_settings
 from app.schemas.common import ResponseModel, PaginatedResponse
-from app.schemas.device import DeviceResponse, DeviceCreate, DeviceUpdate
-from app.models.device import DeviceType
+from app.schemas.device import (
+    DeviceResponse,
+    DeviceCreate,
+    DeviceUpdate,
+    HeartbeatBatch,
+    HeartbeatBatchResult,
+    HeartbeatStatus,
+    ProvisionResult,
+)
+from app.models.device import DeviceType, mac_to_int
 from app.services.device_service import DeviceService
-from app.services.user_service import UserService
+from app.services.ndjson_ingest import PayloadTooLarge, UnsupportedEncoding, iter_lines, make_decoder
+from app.services.presence import presence_registry
+from app.services.provisioning import ProvisionReport, ProvisioningService
+
+settings = get_settings()
 
 router = APIRouter(prefix="/devices", tags=["设备管理"])
 
 
 def _build_device_response(device, user_phone: Optional[str] = None, paired_mac: Optional[str] = None) -> DeviceResponse:
-    """构建设备响应"""
+    """构建设备响应 (在线状态取自登记表)"""
+    is_online, last_seen_at = presence_registry.view(device)
     return DeviceResponse(
         id=device.id,
         mac_address=device.mac_address,
@@ -25,8 +42,8 @@ def _build_device_response(device, user_phone: Optional[str] = None, paired_mac:
         firmware_version=device.firmware_version,
         user_id=device.user_id,
         paired_device_id=device.paired_device_id,
-        is_online=device.is_online,
-        last_seen_at=device.last_seen_at,
+        is_online=is_online,
+        last_seen_at=last_seen_at,
         created_at=device.created_at,
         user_phone=user_phone,
         paired_device_mac=paired_mac,
@@ -37,39 +54,50 @@ def _build_device_response(device, user_phone: Optional[str] = None, paired_mac:
 async def list_devices(
     admin: AdminUser,
     db: DbSession,
+    loaders: RequestLoaders,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     device_type: Optional[DeviceType] = Query(None),
     user_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None, description="搜索MAC地址或名称"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor (传入时忽略 page 偏移)"),
 ):
     """
     获取设备列表 (管理员)
     """
-    devices, total = await DeviceService.list_devices(
-        db, page, page_size, device_type, user_id, search
-    )
+    try:
+        result = await DeviceService.list_devices(
+            db, page, page_size, device_type, user_id, search, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    devices = result.items
     
-    items = []
+    # 本页设备直接复用，所属用户和配对设备各一次批量查询
     for device in devices:
-        user_phone = None
-        if device.user_id:
-            user = await UserService.get_user_by_id(db, device.user_id)
-            user_phone = user.phone if user else None
-        
-        paired_mac = None
-        if device.paired_device_id:
-            paired = await DeviceService.get_device_by_id(db, device.paired_device_id)
-            paired_mac = paired.mac_address if paired else None
-        
-        items.append(_build_device_response(device, user_phone, paired_mac))
+        loaders.devices.prime(device.id, device)
+    users, paired_devices = await asyncio.gather(
+        loaders.users.load_many(device.user_id for device in devices),
+        loaders.devices.load_many(device.paired_device_id for device in devices),
+    )
+    
+    items = [
+        _build_device_response(
+            device,
+            user.phone if user else None,
+            paired.mac_address if paired else None,
+        )
+        for device, user, paired in zip(devices, users, paired_devices)
+    ]
     
     return ResponseModel(data=PaginatedResponse(
         items=items,
-        total=total,
+        total=result.total,
         page=page,
         page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size,
+        total_pages=(result.total + page_size - 1) // page_size,
+        next_cursor=result.next_cursor,
+        total_estimated=result.total_estimated,
     ))
 
 
@@ -78,21 +106,83 @@ async def create_device(data: DeviceCreate, db: DbSession):
     """
     注册新设备
     """
-    # 检查 MAC 地址是否已注册
-    existing = await DeviceService.get_device_by_mac(db, data.mac_address)
-    if existing:
+    device = await DeviceService.create_device(db, data)
+    if device is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="MAC地址已注册",
         )
     
-    device = await DeviceService.create_device(db, data)
-    
     return ResponseModel(data=_build_device_response(device))
 
 
+@router.post(
+    "/import",
+    response_model=ResponseModel[ProvisionResult],
+    summary="批量导入设备 (CSV)",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/csv": {"schema": {"type": "string", "format": "binary"}}},
+        },
+    },
+)
+async def import_devices(request: Request, admin: AdminUser, db: DbSession):
+    """
+    批量导入工厂批次设备 (管理员)
+    
+    - 请求体为 UTF-8 CSV，首行表头: mac_address, device_type 必填，name, firmware_version, paired_mac 可选；
+      支持 Content-Encoding: gzip / zstd，解压后超过 PROVISIONING_MAX_BYTES 返回 413
+    - 边读边校验，每满 PROVISIONING_CHUNK_SIZE 行写入并提交一次；已注册的 MAC 跳过
+    - paired_mac 在全部设备写入后批量配对 (含已注册设备，中断后重新导入可补上配对)
+    - 每行的错误按行号返回 (最多 PROVISIONING_MAX_ERRORS 条)
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(("text/csv", "application/csv", "text/plain")):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="请求体必须为 text/csv",
+        )
+    
+    try:
+        decode = make_decoder(request.headers.get("content-encoding"), settings.provisioning_max_bytes)
+    except UnsupportedEncoding as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e),
+        )
+    
+    report = ProvisionReport()
+    lines = iter_lines(request.stream(), decode, settings.provisioning_max_line_bytes)
+    try:
+        await ProvisioningService.import_csv(
+            db,
+            lines,
+            report,
+            chunk_size=settings.provisioning_chunk_size,
+            max_errors=settings.provisioning_max_errors,
+        )
+    except ClientDisconnect:
+        # 已提交的块保留，重新导入时计为已注册
+        await db.rollback()
+    except PayloadTooLarge as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"{e} (已写入 {report.inserted} 台)",
+        )
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e} (已写入 {report.inserted} 台)",
+        )
+    
+    return ResponseModel(data=ProvisionResult(**asdict(report), rows_per_second=report.rows_per_second))
+
+
 @router.get("/{device_id}", response_model=ResponseModel[DeviceResponse], summary="设备详情")
-async def get_device(device_id: int, admin: AdminUser, db: DbSession):
+async def get_device(device_id: int, admin: AdminUser, db: DbSession, loaders: RequestLoaders):
     """
     获取设备详情 (管理员)
     """
@@ -103,17 +193,16 @@ async def get_device(device_id: int, admin: AdminUser, db: DbSession):
             detail="设备不存在",
         )
     
-    user_phone = None
-    if device.user_id:
-        user = await UserService.get_user_by_id(db, device.user_id)
-        user_phone = user.phone if user else None
-    
-    paired_mac = None
-    if device.paired_device_id:
-        paired = await DeviceService.get_device_by_id(db, device.paired_device_id)
-        paired_mac = paired.mac_address if paired else None
+    user, paired = await asyncio.gather(
+        loaders.users.load(device.user_id),
+        loaders.devices.load(device.paired_device_id),
+    )
     
-    return ResponseModel(data=_build_device_response(device, user_phone, paired_mac))
+    return ResponseModel(data=_build_device_response(
+        device,
+        user.phone if user else None,
+        paired.mac_address if paired else None,
+    ))
 
 
 @router.put("/{device_id}", response_model=ResponseModel[DeviceResponse], summary="更新设备")
@@ -197,14 +286,14 @@ async def update_online_status(
     """
     更新设备在线状态 (设备端调用)
     """
-    device = await DeviceService.get_device_by_id(db, device_id)
+    device = await presence_registry.get_device(db, device_id=device_id)
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="设备不存在",
         )
     
-    device = await DeviceService.update_online_status(db, device, is_online)
+    DeviceService.update_online_status(device, is_online)
     
     return ResponseModel(data=_build_device_response(device))
 
@@ -218,13 +307,51 @@ async def update_online_status_by_mac(
     """
     按MAC地址更新设备在线状态 (模拟器/设备端调用，无需认证)
     """
-    device = await DeviceService.get_device_by_mac(db, mac_address)
+    device = await presence_registry.get_device(db, mac_address=mac_address)
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="设备不存在",
         )
     
-    device = await DeviceService.update_online_status(db, device, is_online)
+    DeviceService.update_online_status(device, is_online)
     
     return ResponseModel(data=_build_device_response(device))
+
+
+@router.post("/heartbeats", response_model=ResponseModel[HeartbeatBatchResult], summary="批量更新在线状态")
+async def batch_heartbeat(data: HeartbeatBatch, db: DbSession):
+    """
+    批量更新在线状态 (网关 / 手机代多台设备上报，无需认证)
+    
+    每项为 [MAC地址, 是否在线, 记录时间]，单次最多 PRESENCE_BATCH_MAX 项。
+    未缓存的 MAC 合并查询，状态只写入登记表，由后台任务批量落库；
+    同一 MAC 出现多次时按顺序生效，记录时间早于已知最后在线时间的项被忽略。
+    """
+    if len(data.heartbeats) > settings.presence_batch_max:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"单次最多 {settings.presence_batch_max} 项",
+        )
+    
+    devices = await presence_registry.get_devices_by_mac(db, (mac for mac, _, _ in data.heartbeats))
+    
+    results = []
+    counts = {result: 0 for result in HeartbeatStatus}
+    for mac_address, is_online, seen_at in data.heartbeats:
+        device = devices.get(mac_to_int(mac_address))
+        if device is None:
+            result = HeartbeatStatus.UNKNOWN
+        elif DeviceService.update_online_status(device, is_online, seen_at) is None:
+            result = HeartbeatStatus.STALE
+        else:
+            result = HeartbeatStatus.OK
+        counts[result] += 1
+        results.append((mac_address, device.id if device else None, result))
+    
+    return ResponseModel(data=HeartbeatBatchResult(
+        accepted=counts[HeartbeatStatus.OK],
+        unknown=counts[HeartbeatStatus.UNKNOWN],
+        stale=counts[HeartbeatStatus.STALE],
+        results=results,
+    ))
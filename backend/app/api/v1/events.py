@@ -0,0 +1,141 @@
+"""
+实时事件 API (WebSocket / SSE)
+"""
+from __future__ import annotations
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import authenticate_token
+from app.config import get_settings
+from app.database import async_session
+from app.services.event_bus import (
+    FLEET_TOPIC,
+    EventBusFull,
+    Subscription,
+    SubscriptionClosed,
+    event_bus,
+    user_topic,
+)
+
+settings = get_settings()
+
+router = APIRouter(prefix="/events", tags=["实时事件"])
+
+# 空闲时定期发送，及时发现已断开的连接
+_PING = '{"type":"ping"}'
+
+
+class EventScope(str, Enum):
+    """订阅范围"""
+    MINE = "mine"    # 当前用户的设备
+    FLEET = "fleet"  # 全部设备 (管理员)
+
+
+async def _subscribe(token: Optional[str], scope: EventScope) -> Subscription:
+    """
+    校验令牌并订阅 (只在建立连接时用一个短会话查询，连接期间不占用数据库连接)
+
+    Raises:
+        HTTPException: 未认证、无权限或订阅数已满
+    """
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="缺少访问令牌",
+        )
+    async with async_session() as db:
+        principal = await authenticate_token(token, db)
+
+    if scope == EventScope.FLEET and not principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+
+    topics = [FLEET_TOPIC] if scope == EventScope.FLEET else [user_topic(principal.id)]
+    try:
+        return event_bus.subscribe(topics)
+    except EventBusFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="实时连接数已满，请稍后重试",
+            headers={"Retry-After": "5"},
+        )
+
+
+@router.websocket("/ws")
+async def event_socket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="访问令牌 (浏览器 WebSocket 无法设置请求头)"),
+    scope: EventScope = Query(EventScope.MINE, description="订阅范围"),
+):
+    """
+    实时事件 (WebSocket)
+
+    推送 JSON 文本消息: presence (设备上线 / 离线)、posture (新写入的姿态日志汇总)，
+    空闲时每 EVENTS_KEEPALIVE 秒发送一次 ping。消费过慢时以 1013 关闭，
+    客户端应重新拉取列表后重连。
+    """
+    try:
+        subscription = await _subscribe(token, scope)
+    except HTTPException as e:
+        code = (
+            status.WS_1013_TRY_AGAIN_LATER
+            if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            else status.WS_1008_POLICY_VIOLATION
+        )
+        await websocket.close(code=code, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            payload = await subscription.next(settings.events_keepalive)
+            await websocket.send_text(_PING if payload is None else payload)
+    except SubscriptionClosed as e:
+        code = status.WS_1013_TRY_AGAIN_LATER if e.evicted else status.WS_1001_GOING_AWAY
+        try:
+            await websocket.close(code=code, reason=str(e))
+        except (RuntimeError, OSError):
+            pass
+    except (WebSocketDisconnect, RuntimeError, OSError):
+        pass
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+@router.get("/stream", summary="实时事件 (SSE)")
+async def event_stream(
+    token: Optional[str] = Query(None, description="访问令牌 (EventSource 无法设置请求头)"),
+    scope: EventScope = Query(EventScope.MINE, description="订阅范围"),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    实时事件 (Server-Sent Events，WebSocket 不可用时的备选)
+
+    每个事件一条 data 行 (与 WebSocket 消息相同的 JSON)，空闲时发送注释行保活；
+    消费过慢时发送 event: evicted 后结束。
+    """
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    subscription = await _subscribe(token, scope)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                payload = await subscription.next(settings.events_keepalive)
+                yield ": keepalive\n\n" if payload is None else f"data: {payload}\n\n"
+        except SubscriptionClosed as e:
+            yield f"event: {e}\ndata: {{}}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,156 +1,387 @@
 """
 姿态数据 API
 """
-from datetime import date, timedelta
-from fastapi import APIRouter, Query
+import uuid
+from dataclasses import asdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel
 
-from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
 
 from app.api.deps import DbSession, CurrentUser
+from app.config import get_settings
 from app.schemas.common import ResponseModel
-from app.schemas.posture import PostureLogCreate, PostureLogResponse, PostureStats, WeeklyStats
-from app.models.posture_log import PostureLog
+from app.schemas.posture import (
+    PostureLogCreate, PostureSeries, PostureStats, PostureUploadResult,
+    SeriesBucket, StreamUploadResult, WeeklyStats,
+)
+from app.services.batch_filter import recent_batches
+from app.services.gatt_log import decode_log_records
+from app.services.ingest_buffer import IngestBufferFull, ingest_buffer
+from app.services.ndjson_ingest import (
+    PayloadTooLarge, UnsupportedEncoding, ingest_ndjson, iter_lines, make_decoder, stream_progress,
+)
+from app.services.log_query import day_bounds
+from app.services.posture_service import PostureService
+from app.services.stats_cache import etag_matches, stats_cache
+from app.services.stats_service import StatsService, bucket_range
+
+settings = get_settings()
 
 router = APIRouter(prefix="/postures", tags=["姿态数据"])
 
 
-@router.post("/logs", response_model=ResponseModel, summary="上传姿态日志")
+async def _store_rows(
+    db: AsyncSession,
+    user_id: int,
+    rows: list[dict],
+    batch_id: Optional[str],
+) -> ResponseModel[PostureUploadResult]:
+    """
+    写入日志行并返回上传结果
+    
+    - 最近已写入过的批次直接判定为重复，不访问数据库
+    - 写缓冲开启时只入队，库内重复在合并写入时丢弃；批次在合并写入提交后才记住
+    """
+    batch_key = recent_batches.batch_key(rows, batch_id)
+    seen_count = recent_batches.seen(user_id, batch_key)
+    if seen_count is not None:
+        return ResponseModel(
+            message="批次已上传过",
+            data=PostureUploadResult(accepted=0, duplicates=len(rows)),
+        )
+    
+    if ingest_buffer.running:
+        try:
+            ingest_buffer.submit(
+                rows, on_commit=lambda: recent_batches.remember(user_id, batch_key, len(rows))
+            )
+        except IngestBufferFull:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="服务繁忙，请稍后重试",
+                headers={"Retry-After": str(max(int(settings.ingest_buffer_flush_interval), 1))},
+            )
+        return ResponseModel(
+            message=f"已接收 {len(rows)} 条日志",
+            data=PostureUploadResult(accepted=len(rows), duplicates=0),
+        )
+    
+    accepted = await PostureService.bulk_insert_logs(db, rows)
+    # 提交成功后才记住批次，避免提交失败的批次重试时被误判为重复
+    await db.commit()
+    recent_batches.remember(user_id, batch_key, accepted)
+    
+    return ResponseModel(
+        message=f"成功上传 {accepted} 条日志",
+        data=PostureUploadResult(accepted=accepted, duplicates=len(rows) - accepted),
+    )
+
+
+@router.post("/logs", response_model=ResponseModel[PostureUploadResult], summary="上传姿态日志")
 async def upload_logs(
     logs: list[PostureLogCreate],
     current_user: CurrentUser,
     db: DbSession,
+    batch_id: Optional[str] = Header(None, alias="X-Batch-Id", max_length=64, description="客户端批次ID (重试时保持不变)"),
 ):
     """
     批量上传姿态日志
+    
+    整批校验一次设备引用，再按块批量写入 (不逐条经过 ORM)；
+    开启写缓冲时只入队，缓冲区满返回 429。
+    
+    重复上传是幂等的: 按 (device_id, recorded_at, posture_type) 去重，
+    响应中返回新写入条数和重复条数。
+    """
+    missing = await PostureService.find_missing_devices(db, {log.device_id for log in logs})
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"设备不存在: {sorted(missing)}",
+        )
+    
+    rows = PostureService.build_rows(current_user.id, logs)
+    
+    return await _store_rows(db, current_user.id, rows, batch_id)
+
+
+@router.post(
+    "/logs/binary",
+    response_model=ResponseModel[PostureUploadResult],
+    summary="上传姿态日志 (GATT 二进制)",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+        },
+    },
+)
+async def upload_binary_logs(
+    request: Request,
+    current_user: CurrentUser,
+    db: DbSession,
+    device_id: int = Query(..., description="日志来源设备ID"),
+    batch_id: Optional[str] = Header(None, alias="X-Batch-Id", max_length=64, description="客户端批次ID (重试时保持不变)"),
+):
+    """
+    批量上传探测器原始日志
+    
+    请求体为探测器 GATT 日志特征值读出的原始数据，每条 8 字节 (Little-Endian):
+    timestamp(4) | posture_type(1) | duration_sec(2) | triggered(1)
+    
+    posture_type 按日志协议 0 NORMAL / 1 HUNCHED / 2 LEAN_LEFT / 3 LEAN_RIGHT 解码，
+    triggered 只校验不入库。
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("application/octet-stream"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="请求体必须为 application/octet-stream",
+        )
+    
+    if await PostureService.find_missing_devices(db, [device_id]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"设备不存在: [{device_id}]",
+        )
+    
+    payload = await request.body()
+    try:
+        rows = decode_log_records(
+            payload, device_id, current_user.id, settings.posture_binary_max_records
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    
+    return await _store_rows(db, current_user.id, rows, batch_id)
+
+
+@router.post(
+    "/logs/stream",
+    response_model=ResponseModel[StreamUploadResult],
+    summary="流式上传姿态日志 (NDJSON)",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}}},
+        },
+    },
+)
+async def upload_stream_logs(
+    request: Request,
+    current_user: CurrentUser,
+    db: DbSession,
+    upload_id: Optional[str] = Header(None, alias="X-Upload-Id", max_length=64, description="上传ID (续传时保持不变)"),
+    offset: int = Query(0, ge=0, description="请求体第一行对应的行号偏移 (续传时传入 committed_lines)"),
+):
     """
-    for log_data in logs:
-        log = PostureLog(
-            device_id=log_data.device_id,
-            user_id=current_user.id,
-            posture_type=log_data.posture_type,
-            duration=log_data.duration,
-            is_correct=log_data.is_correct,
-            recorded_at=log_data.recorded_at,
+    流式上传大量离线日志
+    
+    - 请求体为 NDJSON，每行一个 PostureLogCreate；支持 Content-Encoding: gzip / zstd，
+      解压后超过 POSTURE_STREAM_MAX_BYTES 返回 413
+    - 边读边校验，每满一批写入并提交一次，内存占用与上传大小无关
+    - 非法行跳过并在结果中报告，不中断上传
+    - 中断后用 GET /logs/stream/{upload_id} 查询 committed_lines，带 offset 从该行续传
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(("application/x-ndjson", "application/jsonl")):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="请求体必须为 application/x-ndjson",
+        )
+    
+    try:
+        decode = make_decoder(request.headers.get("content-encoding"), settings.posture_stream_max_bytes)
+    except UnsupportedEncoding as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e),
+        )
+    
+    upload_id = upload_id or uuid.uuid4().hex
+    progress = stream_progress.start(current_user.id, upload_id, offset)
+    lines = iter_lines(request.stream(), decode, settings.posture_stream_max_line_bytes)
+    
+    try:
+        await ingest_ndjson(
+            db,
+            current_user.id,
+            lines,
+            progress,
+            chunk_size=settings.posture_stream_chunk_size,
+            max_errors=settings.posture_stream_max_errors,
+        )
+    except ClientDisconnect:
+        # 已提交的批次保留，客户端按 committed_lines 续传
+        await db.rollback()
+    except PayloadTooLarge as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"{e} (已提交至第 {progress.committed_lines} 行)",
+        )
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e} (已提交至第 {progress.committed_lines} 行)",
+        )
+    
+    return ResponseModel(data=StreamUploadResult(upload_id=upload_id, **asdict(progress)))
+
+
+@router.get(
+    "/logs/stream/{upload_id}",
+    response_model=ResponseModel[StreamUploadResult],
+    summary="查询流式上传进度",
+)
+async def get_stream_progress(upload_id: str, current_user: CurrentUser):
+    """
+    查询流式上传进度 (用于断点续传)
+    """
+    progress = stream_progress.get(current_user.id, upload_id)
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="上传记录不存在",
         )
-        db.add(log)
     
-    await db.flush()
+    return ResponseModel(data=StreamUploadResult(upload_id=upload_id, **asdict(progress)))
+
+
+async def _cached_stats(
+    request: Request,
+    response: Response,
+    user_id: int,
+    key: tuple,
+    start: datetime,
+    end: datetime,
+    compute: Callable[[], Awaitable[BaseModel]],
+):
+    """
+    读取缓存的统计结果，未命中时计算并缓存
+    
+    If-None-Match 与 ETag 一致时返回 304 (不含响应体)
+    """
+    entry = stats_cache.get(user_id, key)
+    if entry is None:
+        version = stats_cache.version(user_id)
+        entry = stats_cache.put(user_id, key, await compute(), start, end, version)
+    
+    # 允许客户端缓存，但每次使用前必须携带 ETag 重新验证
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return ResponseModel(message=f"成功上传 {len(logs)} 条日志")
+    response.headers.update(headers)
+    return ResponseModel(data=entry.value)
 
 
 @router.get("/stats", response_model=ResponseModel[PostureStats], summary="获取统计数据")
 async def get_stats(
+    request: Request,
+    response: Response,
     current_user: CurrentUser,
     db: DbSession,
     target_date: date = Query(None, description="统计日期，默认今天"),
 ):
     """
     获取指定日期的姿态统计
+    
+    响应带 ETag，携带 If-None-Match 且数据未变化时返回 304
     """
     if target_date is None:
         target_date = date.today()
     
-    # 查询当天数据
-    result = await db.execute(
-        select(PostureLog)
-        .where(PostureLog.user_id == current_user.id)
-        .where(func.date(PostureLog.recorded_at) == target_date)
+    return await _cached_stats(
+        request, response, current_user.id,
+        ("daily", target_date),
+        *day_bounds(target_date, target_date),
+        lambda: StatsService.get_daily_stats(db, current_user.id, target_date),
     )
-    logs = result.scalars().all()
-    
-    # 计算统计
-    total_duration = sum(log.duration for log in logs)
-    correct_duration = sum(log.duration for log in logs if log.is_correct)
-    incorrect_duration = total_duration - correct_duration
-    correct_rate = correct_duration / total_duration if total_duration > 0 else 0
-    
-    # 按姿态类型分组
-    posture_breakdown = {}
-    for log in logs:
-        posture_breakdown[log.posture_type] = posture_breakdown.get(log.posture_type, 0) + log.duration
-    
-    return ResponseModel(data=PostureStats(
-        date=target_date,
-        total_duration=total_duration,
-        correct_duration=correct_duration,
-        incorrect_duration=incorrect_duration,
-        correct_rate=round(correct_rate, 4),
-        posture_breakdown=posture_breakdown,
-    ))
 
 
 @router.get("/weekly", response_model=ResponseModel[WeeklyStats], summary="获取周统计")
 async def get_weekly_stats(
+    request: Request,
+    response: Response,
     current_user: CurrentUser,
     db: DbSession,
     start_date: date = Query(None, description="周开始日期，默认本周一"),
 ):
     """
     获取一周的姿态统计
+    
+    响应带 ETag，携带 If-None-Match 且数据未变化时返回 304
     """
     if start_date is None:
         today = date.today()
         start_date = today - timedelta(days=today.weekday())
     
-    end_date = start_date + timedelta(days=6)
+    return await _cached_stats(
+        request, response, current_user.id,
+        ("weekly", start_date),
+        *day_bounds(start_date, start_date + timedelta(days=6)),
+        lambda: StatsService.get_weekly_stats(db, current_user.id, start_date),
+    )
+
+
+def _to_naive_utc(moment: datetime) -> datetime:
+    """带时区的时间转换为 UTC (日志和汇总均按 UTC 存储)"""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/series", response_model=ResponseModel[PostureSeries], summary="获取时间序列统计")
+async def get_series(
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
+    db: DbSession,
+    start: datetime = Query(..., description="开始时间 (含)，可只传日期"),
+    end: datetime = Query(..., description="结束时间 (不含)，可只传日期"),
+    bucket: SeriesBucket = Query(SeriesBucket.DAY, description="桶大小: hour / day / week / month / year"),
+):
+    """
+    获取任意区间的正确 / 不良姿态时长时间序列
+    
+    区间按桶大小向外对齐 (周从周一开始)，没有数据的桶返回 0。
+    小时桶读取小时汇总，其余读取日汇总，不扫描原始日志。
+    响应带 ETag，携带 If-None-Match 且数据未变化时返回 304。
+    """
+    start = _to_naive_utc(start)
+    end = _to_naive_utc(end)
+    try:
+        range_start, range_end = bucket_range(start, end, bucket)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    
+    async def compute() -> PostureSeries:
+        try:
+            return await StatsService.get_series(
+                db, current_user.id, start, end, bucket, settings.posture_series_max_points,
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
     
-    # 查询一周数据
-    result = await db.execute(
-        select(PostureLog)
-        .where(PostureLog.user_id == current_user.id)
-        .where(func.date(PostureLog.recorded_at) >= start_date)
-        .where(func.date(PostureLog.recorded_at) <= end_date)
+    return await _cached_stats(
+        request, response, current_user.id,
+        ("series", bucket, start, end),
+        range_start, range_end,
+        compute,
     )
-    logs = result.scalars().all()
-    
-    # 按日期分组
-    daily_data: dict[date, list[PostureLog]] = {}
-    for log in logs:
-        log_date = log.recorded_at.date()
-        if log_date not in daily_data:
-            daily_data[log_date] = []
-        daily_data[log_date].append(log)
-    
-    # 构建每日统计
-    daily_stats = []
-    total_correct = 0
-    total_incorrect = 0
-    
-    for i in range(7):
-        current_date = start_date + timedelta(days=i)
-        day_logs = daily_data.get(current_date, [])
-        
-        day_total = sum(log.duration for log in day_logs)
-        day_correct = sum(log.duration for log in day_logs if log.is_correct)
-        day_incorrect = day_total - day_correct
-        day_rate = day_correct / day_total if day_total > 0 else 0
-        
-        posture_breakdown = {}
-        for log in day_logs:
-            posture_breakdown[log.posture_type] = posture_breakdown.get(log.posture_type, 0) + log.duration
-        
-        daily_stats.append(PostureStats(
-            date=current_date,
-            total_duration=day_total,
-            correct_duration=day_correct,
-            incorrect_duration=day_incorrect,
-            correct_rate=round(day_rate, 4),
-            posture_breakdown=posture_breakdown,
-        ))
-        
-        total_correct += day_correct
-        total_incorrect += day_incorrect
-    
-    total_all = total_correct + total_incorrect
-    avg_rate = total_correct / total_all if total_all > 0 else 0
-    
-    return ResponseModel(data=WeeklyStats(
-        start_date=start_date,
-        end_date=end_date,
-        daily_stats=daily_stats,
-        total_correct_duration=total_correct,
-        total_incorrect_duration=total_incorrect,
-        average_correct_rate=round(avg_rate, 4),
-    ))
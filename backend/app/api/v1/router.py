@@ -3,10 +3,13 @@ API v1 路由汇总
 """
 from fastapi import APIRouter
 
+from app.api.v1.admin import router as admin_router
 from app.api.v1.auth import router as auth_router
 from app.api.v1.users import router as users_router
 from app.api.v1.devices import router as devices_router
+from app.api.v1.events import router as events_router
 from app.api.v1.postures import router as postures_router
+from app.api.v1.search import router as search_router
 
 router = APIRouter(prefix="/api/v1")
 
@@ -14,3 +17,6 @@ router.include_router(auth_router)
 router.include_router(users_router)
 router.include_router(devices_router)
 router.include_router(postures_router)
+router.include_router(search_router)
+router.include_router(admin_router)
+router.include_router(events_router)
@@ -0,0 +1,45 @@
+"""
+搜索 API
+"""
+from __future__ import annotations
+from fastapi import APIRouter, Query
+
+from app.api.deps import DbSession, AdminUser
+from app.schemas.common import ResponseModel
+from app.schemas.search import DeviceSuggestion, TypeaheadResponse, UserSuggestion
+from app.services.search_service import MIN_INDEXED_LENGTH, SearchService
+
+router = APIRouter(prefix="/search", tags=["搜索"])
+
+
+@router.get("/typeahead", response_model=ResponseModel[TypeaheadResponse], summary="搜索联想")
+async def typeahead(
+    admin: AdminUser,
+    db: DbSession,
+    q: str = Query(..., min_length=MIN_INDEXED_LENGTH, max_length=50, description="手机号、昵称、MAC 地址片段或设备名称"),
+    limit: int = Query(10, ge=1, le=50, description="每类最多返回条数"),
+):
+    """
+    管理后台搜索框联想 (管理员)
+    
+    查询词至少 3 个字符，保证命中三元组索引。
+    """
+    q = q.strip()
+    users = await SearchService.typeahead_users(db, q, limit)
+    devices = await SearchService.typeahead_devices(db, q, limit)
+    
+    return ResponseModel(data=TypeaheadResponse(
+        users=[
+            UserSuggestion(id=user.id, phone=user.phone, nickname=user.nickname)
+            for user in users
+        ],
+        devices=[
+            DeviceSuggestion(
+                id=device.id,
+                mac_address=device.mac_address,
+                device_type=device.device_type,
+                name=device.name,
+            )
+            for device in devices
+        ],
+    ))
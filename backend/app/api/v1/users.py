@@ -5,12 +5,14 @@ from __future__ import annotations
 from typing import Optional
 from fastapi import APIRouter, HTTPException, status, Query
 
-from app.api.deps import DbSession, AdminUser, CurrentUser
+from app.api.deps import DbSession, AdminUser, CurrentUser, RequestLoaders
 from app.schemas.common import ResponseModel, PaginatedResponse
 from app.schemas.user import UserResponse, UserUpdate
 from app.schemas.device import DeviceResponse, DeviceCreate
+from app.services.auth import AuthService
 from app.services.user_service import UserService
 from app.services.device_service import DeviceService
+from app.services.presence import presence_registry
 
 router = APIRouter(prefix="/users", tags=["用户管理"])
 
@@ -18,18 +20,18 @@ router = APIRouter(prefix="/users", tags=["用户管理"])
 @router.get("/me", response_model=ResponseModel[UserResponse], summary="获取当前用户信息")
 async def get_me(current_user: CurrentUser, db: DbSession):
     """获取当前登录用户信息"""
-    device_count = await UserService.get_user_device_count(db, current_user.id)
+    user = await AuthService.get_user_by_id(db, current_user.id)
     
     return ResponseModel(data=UserResponse(
-        id=current_user.id,
-        phone=current_user.phone,
-        nickname=current_user.nickname,
-        avatar_url=current_user.avatar_url,
-        is_admin=current_user.is_admin,
-        is_active=current_user.is_active,
-        created_at=current_user.created_at,
-        last_login_at=current_user.last_login_at,
-        device_count=device_count,
+        id=user.id,
+        phone=user.phone,
+        nickname=user.nickname,
+        avatar_url=user.avatar_url,
+        is_admin=user.is_admin,
+        is_active=user.is_active,
+        created_at=user.created_at,
+        last_login_at=user.last_login_at,
+        device_count=user.device_count,
     ))
 
 
@@ -39,8 +41,8 @@ async def update_me(data: UserUpdate, current_user: CurrentUser, db: DbSession):
     # 不允许修改 is_active
     data.is_active = None
     
-    user = await UserService.update_user(db, current_user, data)
-    device_count = await UserService.get_user_device_count(db, user.id)
+    user = await AuthService.get_user_by_id(db, current_user.id)
+    user = await UserService.update_user(db, user, data)
     
     return ResponseModel(data=UserResponse(
         id=user.id,
@@ -51,7 +53,7 @@ async def update_me(data: UserUpdate, current_user: CurrentUser, db: DbSession):
         is_active=user.is_active,
         created_at=user.created_at,
         last_login_at=user.last_login_at,
-        device_count=device_count,
+        device_count=user.device_count,
     ))
 
 
@@ -62,15 +64,18 @@ async def list_users(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     search: Optional[str] = Query(None, description="搜索手机号或昵称"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor (传入时忽略 page 偏移)"),
 ):
     """
     获取用户列表 (管理员)
     """
-    users, total = await UserService.list_users(db, page, page_size, search)
+    try:
+        result = await UserService.list_users(db, page, page_size, search, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     items = []
-    for user in users:
-        device_count = await UserService.get_user_device_count(db, user.id)
+    for user in result.items:
         items.append(UserResponse(
             id=user.id,
             phone=user.phone,
@@ -80,15 +85,17 @@ async def list_users(
             is_active=user.is_active,
             created_at=user.created_at,
             last_login_at=user.last_login_at,
-            device_count=device_count,
+            device_count=user.device_count,
         ))
     
     return ResponseModel(data=PaginatedResponse(
         items=items,
-        total=total,
+        total=result.total,
         page=page,
         page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size,
+        total_pages=(result.total + page_size - 1) // page_size,
+        next_cursor=result.next_cursor,
+        total_estimated=result.total_estimated,
     ))
 
 
@@ -104,8 +111,6 @@ async def get_user(user_id: int, admin: AdminUser, db: DbSession):
             detail="用户不存在",
         )
     
-    device_count = await UserService.get_user_device_count(db, user.id)
-    
     return ResponseModel(data=UserResponse(
         id=user.id,
         phone=user.phone,
@@ -115,7 +120,7 @@ async def get_user(user_id: int, admin: AdminUser, db: DbSession):
         is_active=user.is_active,
         created_at=user.created_at,
         last_login_at=user.last_login_at,
-        device_count=device_count,
+        device_count=user.device_count,
     ))
 
 
@@ -132,7 +137,6 @@ async def update_user(user_id: int, data: UserUpdate, admin: AdminUser, db: DbSe
         )
     
     user = await UserService.update_user(db, user, data)
-    device_count = await UserService.get_user_device_count(db, user.id)
     
     return ResponseModel(data=UserResponse(
         id=user.id,
@@ -143,7 +147,7 @@ async def update_user(user_id: int, data: UserUpdate, admin: AdminUser, db: DbSe
         is_active=user.is_active,
         created_at=user.created_at,
         last_login_at=user.last_login_at,
-        device_count=device_count,
+        device_count=user.device_count,
     ))
 
 
@@ -174,7 +178,8 @@ async def delete_user(user_id: int, admin: AdminUser, db: DbSession):
 
 
 def _build_device_response(device, user_phone: Optional[str] = None, paired_mac: Optional[str] = None) -> DeviceResponse:
-    """构建设备响应"""
+    """构建设备响应 (在线状态取自登记表)"""
+    is_online, last_seen_at = presence_registry.view(device)
     return DeviceResponse(
         id=device.id,
         mac_address=device.mac_address,
@@ -183,8 +188,8 @@ def _build_device_response(device, user_phone: Optional[str] = None, paired_mac:
         firmware_version=device.firmware_version,
         user_id=device.user_id,
         paired_device_id=device.paired_device_id,
-        is_online=device.is_online,
-        last_seen_at=device.last_seen_at,
+        is_online=is_online,
+        last_seen_at=last_seen_at,
         created_at=device.created_at,
         user_phone=user_phone,
         paired_device_mac=paired_mac,
@@ -192,20 +197,21 @@ def _build_device_response(device, user_phone: Optional[str] = None, paired_mac:
 
 
 @router.get("/me/devices", response_model=ResponseModel[list[DeviceResponse]], summary="获取我的设备列表")
-async def get_my_devices(current_user: CurrentUser, db: DbSession):
+async def get_my_devices(current_user: CurrentUser, db: DbSession, loaders: RequestLoaders):
     """
     获取当前用户绑定的设备列表
     """
     devices = await DeviceService.get_devices_by_user(db, current_user.id)
     
-    items = []
+    # 配对设备通常也是自己的设备，直接复用；其余一次批量查询
     for device in devices:
-        paired_mac = None
-        if device.paired_device_id:
-            paired = await DeviceService.get_device_by_id(db, device.paired_device_id)
-            paired_mac = paired.mac_address if paired else None
-        
-        items.append(_build_device_response(device, current_user.phone, paired_mac))
+        loaders.devices.prime(device.id, device)
+    paired_devices = await loaders.devices.load_many(device.paired_device_id for device in devices)
+    
+    items = [
+        _build_device_response(device, current_user.phone, paired.mac_address if paired else None)
+        for device, paired in zip(devices, paired_devices)
+    ]
     
     return ResponseModel(data=items)
 
@@ -219,37 +225,12 @@ async def bind_device(data: DeviceCreate, current_user: CurrentUser, db: DbSessi
     - 如果设备 MAC 地址不存在，则创建新设备并绑定
     - 如果设备已被其他用户绑定，则返回错误
     """
-    # 检查设备是否已存在
-    existing = await DeviceService.get_device_by_mac(db, data.mac_address)
-    
-    if existing:
-        if existing.user_id is not None and existing.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="该设备已被其他用户绑定",
-            )
-        
-        if existing.user_id == current_user.id:
-            # 已经绑定到当前用户
-            return ResponseModel(data=_build_device_response(existing, current_user.phone))
-        
-        # 绑定到当前用户
-        from app.schemas.device import DeviceUpdate
-        existing = await DeviceService.update_device(db, existing, DeviceUpdate(
-            user_id=current_user.id,
-            name=data.name if data.name else existing.name,
-        ))
-        
-        return ResponseModel(data=_build_device_response(existing, current_user.phone))
-    
-    # 创建新设备并绑定
-    device = await DeviceService.create_device(db, data)
-    
-    # 绑定到当前用户
-    from app.schemas.device import DeviceUpdate
-    device = await DeviceService.update_device(db, device, DeviceUpdate(
-        user_id=current_user.id,
-    ))
+    device = await DeviceService.bind_device(db, data, current_user.id)
+    if device is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="该设备已被其他用户绑定",
+        )
     
     return ResponseModel(data=_build_device_response(device, current_user.phone))
 
@@ -16,11 +16,74 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 10080  # 7 天
     jwt_refresh_token_expire_days: int = 30
+    auth_cache_size: int = 10000  # 认证主体缓存条数 (LRU)，0 为不缓存
+    auth_cache_ttl: float = 60  # 认证主体缓存时间(秒)，多进程部署时禁用用户最迟在该时间后生效
+
+    # 密码哈希 (bcrypt)
+    password_hash_workers: int = 4  # 哈希线程数 (同时计算的上限)
+    password_hash_max_waiting: int = 64  # 排队上限，超出时登录 / 注册返回 429
+    password_hash_rounds: int = 0  # bcrypt cost，0 为启动时按目标耗时自动校准
+    password_hash_target_ms: float = 250  # 自动校准的单次哈希目标耗时(毫秒)
     
     # 管理员初始账号
     admin_phone: str = "13810799940"
     admin_password: str = "123456"
     
+    # 姿态日志批量入库
+    posture_insert_chunk_size: int = 1000  # 每条 INSERT 语句写入的行数
+    posture_copy_threshold: int = 5000  # PostgreSQL 下达到该行数改用 COPY
+    posture_binary_max_records: int = 100000  # 二进制上传单次最大记录数
+    posture_batch_filter_size: int = 10000  # 记住的最近上传批次数 (重试去重)
+    posture_stream_chunk_size: int = 5000  # NDJSON 流式上传每次提交的行数
+    posture_stream_max_line_bytes: int = 4096  # NDJSON 单行最大字节数
+    posture_stream_max_errors: int = 100  # 流式上传最多返回的错误行数
+    posture_stream_max_bytes: int = 1 << 30  # 流式上传解压后的最大字节数，超出返回 413
+    
+    # 姿态日志分区与保留期
+    posture_partition_premake_months: int = 3  # PostgreSQL 预建未来几个月的分区
+    posture_log_retention_months: int = 0  # 原始日志保留月数 (0 为永久保留，汇总数据不受影响)
+    posture_retention_delete_chunk: int = 5000  # 按块删除时每块条数 (SQLite / 默认分区)
+    posture_retention_delete_pause: float = 0.1  # 块间暂停(秒)
+    posture_log_maintenance_interval: float = 3600  # 维护任务间隔(秒)
+    
+    # 姿态统计
+    posture_series_max_points: int = 1000  # 时间序列单次最多返回的桶数
+    stats_cache_size: int = 10000  # 统计结果缓存条数 (LRU)
+    
+    # 管理后台
+    admin_count_cache_ttl: float = 30  # 列表总数缓存时间(秒)，0 为不缓存
+    admin_count_estimate_threshold: int = 100000  # PostgreSQL 估算行数超过该值时直接使用估算值
+    admin_summary_ttl: float = 10  # 概览统计缓存时间(秒)
+
+    # 姿态日志写缓冲 (开启后上传接口只入队，由后台任务合并写入)
+    ingest_buffer_enabled: bool = False
+    ingest_buffer_max_records: int = 200000  # 缓冲上限，超出返回 429
+    ingest_buffer_flush_size: int = 5000  # 达到该条数立即写入
+    ingest_buffer_flush_interval: float = 1.0  # 最长写入间隔(秒)
+    ingest_buffer_max_retries: int = 3  # 非数据错误的重试次数，仍失败则整批丢弃
+    
+    # 设备在线状态 (心跳只更新内存，由后台任务批量写入)
+    presence_flush_interval: float = 5.0  # 写入间隔(秒)
+    presence_snapshot_ttl: float = 60  # 心跳用设备快照缓存时间(秒)
+    presence_lease_detector: float = 90  # 探测器在线租约(秒)，超时未心跳视为离线，0 为不超时
+    presence_lease_feedbacker: float = 90  # 反馈器在线租约(秒)
+    presence_sweep_tick: float = 1.0  # 租约到期检查精度(秒)
+    presence_batch_max: int = 50000  # 批量心跳单次最多设备数
+    
+    # 设备批量导入 (CSV)
+    provisioning_chunk_size: int = 5000  # 每次提交的行数
+    provisioning_max_line_bytes: int = 1024  # 单行最大字节数
+    provisioning_max_errors: int = 1000  # 上传接口最多返回的错误行数
+    provisioning_max_bytes: int = 256 << 20  # 上传 CSV 解压后的最大字节数，超出返回 413
+    
+    # MAC 解析缓存 (启动时加载全部设备，MAC -> 设备 ID / 类型 / 归属 / 配对)
+    device_directory_enabled: bool = True
+    
+    # 实时事件推送 (WebSocket / SSE)
+    events_queue_size: int = 256  # 每个订阅者最多积压的事件数，超出即断开
+    events_max_subscribers: int = 10000  # 进程内订阅数上限
+    events_keepalive: float = 20  # 空闲保活间隔(秒)
+    
     # 调试模式
     debug: bool = True
     
@@ -1,12 +1,20 @@
 """
 北岛 AI 姿态矫正器 - 数据库连接
 """
+import logging
+from collections import Counter
+
+from sqlalchemy import (
+    Connection, Index, and_, bindparam, delete, exists, func, inspect, or_, select, text, update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from app.config import get_settings
 from app.models.base import Base
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # 创建异步引擎
 engine = create_async_engine(
@@ -36,7 +44,184 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def dialect_insert(db: AsyncSession):
+    """当前方言的 insert 构造函数 (支持 ON CONFLICT)"""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def _add_device_count(connection: Connection) -> None:
+    """
+    旧库补充 users.device_count 列并按设备表回填
+
+    create_all 不会修改已存在的表，缺少该列时加载 User 即报 no such column
+    """
+    from app.models import Device, User
+
+    columns = inspect(connection).get_columns(User.__tablename__)
+    if any(column["name"] == "device_count" for column in columns):
+        return
+
+    connection.execute(text("ALTER TABLE users ADD COLUMN device_count INTEGER NOT NULL DEFAULT 0"))
+    counts = (
+        select(func.count(Device.id))
+        .where(Device.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    result = connection.execute(update(User).values(device_count=counts))
+    logger.info("已添加 users.device_count 列并回填 %d 个用户", result.rowcount)
+
+
+def _add_natural_key(connection: Connection) -> None:
+    """
+    旧库补充 posture_logs 自然键唯一索引
+
+    批量写入的 ON CONFLICT (device_id, recorded_at, posture_type) 依赖该索引；
+    建索引前先删除重复行 (每组保留 id 最小的一条)
+    """
+    from app.models import PostureLog
+    from app.services.posture_service import NATURAL_KEY
+
+    inspector = inspect(connection)
+    key = set(NATURAL_KEY)
+    unique_sets = [
+        set(item["column_names"])
+        for item in inspector.get_unique_constraints(PostureLog.__tablename__)
+        + [index for index in inspector.get_indexes(PostureLog.__tablename__) if index["unique"]]
+    ]
+    if key in unique_sets:
+        return
+
+    duplicate = PostureLog.__table__.alias("duplicate")
+    result = connection.execute(
+        delete(PostureLog).where(exists().where(and_(
+            *(duplicate.c[column] == PostureLog.__table__.c[column] for column in NATURAL_KEY),
+            duplicate.c.id < PostureLog.id,
+        )))
+    )
+    Index(
+        "uq_posture_logs_natural_key",
+        *(PostureLog.__table__.c[column] for column in NATURAL_KEY),
+        unique=True,
+    ).create(connection)
+    logger.info("已创建 posture_logs 自然键唯一索引，删除重复日志 %d 条", result.rowcount)
+    if result.rowcount:
+        logger.warning("删除了重复日志，请运行 scripts/rebuild_rollup.py 重建汇总")
+
+
+def _normalize_sqlite_timestamps(connection: Connection) -> None:
+    """
+    SQLite 旧库统一 created_at 格式
+
+    早期由 CURRENT_TIMESTAMP 写入的时间不带微秒，游标分页按列直接比较时
+    同一秒内顺序会错位，补齐为 "YYYY-MM-DD HH:MM:SS.ffffff"
+    """
+    from app.models import Device, User
+    from app.models.base import SQLITE_DATETIME_FORMAT
+
+    if connection.dialect.name != "sqlite":
+        return
+    for model in (User, Device):
+        result = connection.execute(
+            update(model)
+            .where(func.length(model.created_at) == 19)
+            .values(created_at=func.strftime(SQLITE_DATETIME_FORMAT, model.created_at))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            logger.info("已统一 %s.created_at 时间格式 %d 行", model.__tablename__, result.rowcount)
+
+
+def _normalize_mac_addresses(connection: Connection) -> None:
+    """
+    旧库 mac_address 统一为大写冒号分隔格式 (与各写入路径的 normalize_mac 一致)
+
+    规范化后与已有设备冲突的 (同一设备以不同写法注册了两次) 不自动合并，
+    记录警告后保留原值，需人工处理
+    """
+    from app.models.device import Device, normalize_mac
+
+    devices = Device.__table__
+    rows = connection.execute(
+        select(devices.c.id, devices.c.mac_address).where(or_(
+            devices.c.mac_address != func.upper(devices.c.mac_address),
+            devices.c.mac_address.not_like("__:__:__:__:__:__"),
+        ))
+    ).all()
+    if not rows:
+        return
+
+    targets = {row.id: normalize_mac(row.mac_address) for row in rows}
+    targets = {device_id: mac for device_id, mac in targets.items() if mac is not None}
+    wanted = Counter(targets.values())
+    taken = set()
+    values = sorted(set(targets.values()))
+    for start in range(0, len(values), 5000):
+        taken.update(connection.execute(
+            select(devices.c.mac_address).where(devices.c.mac_address.in_(values[start:start + 5000]))
+        ).scalars())
+
+    updates, conflicts = [], []
+    for device_id, mac in targets.items():
+        if mac in taken or wanted[mac] > 1:
+            conflicts.append(device_id)
+        else:
+            updates.append({"device_id": device_id, "mac": mac})
+    if updates:
+        connection.execute(
+            update(devices)
+            .where(devices.c.id == bindparam("device_id"))
+            .values(mac_address=bindparam("mac")),
+            updates,
+        )
+        logger.info("已规范化 %d 台设备的 MAC 地址", len(updates))
+    if conflicts:
+        logger.warning("%d 台设备的 MAC 规范化后与其他设备重复，未修改 (设备 ID: %s)",
+                       len(conflicts), ", ".join(map(str, sorted(conflicts)[:20])))
+
+
+def _create_missing_indexes(connection: Connection) -> None:
+    """旧库补充模型中新增的普通索引"""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                logger.info("已创建索引 %s", index.name)
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """补齐旧库中 create_all 无法变更的已有表结构"""
+    _add_device_count(connection)
+    _add_natural_key(connection)
+    _normalize_sqlite_timestamps(connection)
+    _normalize_mac_addresses(connection)
+    _create_missing_indexes(connection)
+
+
+def create_schema(connection: Connection) -> None:
+    """
+    建表 (通过 run_sync 调用)
+
+    PostgreSQL 下 posture_logs 建为分区表，其外键引用 users / devices，
+    因此先建其他表，再建分区表，最后由 create_all 补齐其余对象和搜索索引；
+    已有的表再按 upgrade_schema 补齐新增的列和索引
+    """
+    from app.services.log_partition import TABLE_NAME, create_partitioned_table
+    from app.services.search_service import create_search_index
+
+    tables = [table for name, table in Base.metadata.tables.items() if name != TABLE_NAME]
+    Base.metadata.create_all(connection, tables=tables)
+    create_partitioned_table(connection)
+    Base.metadata.create_all(connection)
+    upgrade_schema(connection)
+    create_search_index(connection)
+
+
 async def init_db():
-    """初始化数据库表"""
+    """初始化数据库表 (PostgreSQL 下 posture_logs 建为分区表) 及搜索索引"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_schema)
@@ -8,11 +8,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.config import get_settings
-from app.database import engine
-from app.models.base import Base
+from app.database import create_schema, engine
 from app.models import User  # 导入模型以创建表
 from app.api.v1.router import router as api_router
 from app.services.auth import AuthService
+from app.services.batch_filter import recent_batches
+from app.services.device_directory import device_directory
+from app.services.event_bus import event_bus
+from app.services.ingest_buffer import ingest_buffer
+from app.services.log_partition import log_maintenance
+from app.services.pagination import count_cache
+from app.services.password_hasher import password_hasher
+from app.services.presence import presence_registry
+from app.services.principal_cache import principal_cache
+from app.services.stats_cache import stats_cache
+from app.services.summary_service import summary_cache
 
 settings = get_settings()
 
@@ -22,7 +32,10 @@ async def lifespan(app: FastAPI):
     """应用生命周期"""
     # 启动时: 初始化数据库
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_schema)
+    
+    # 启动密码哈希线程池 (自动校准 bcrypt cost)
+    await password_hasher.start()
     
     # 创建默认管理员
     from app.database import async_session
@@ -36,7 +49,7 @@ async def lifespan(app: FastAPI):
         if not admin:
             admin = User(
                 phone=settings.admin_phone,
-                password_hash=AuthService.hash_password(settings.admin_password),
+                password_hash=await AuthService.hash_password(settings.admin_password),
                 nickname="管理员",
                 is_admin=True,
             )
@@ -44,9 +57,29 @@ async def lifespan(app: FastAPI):
             await db.commit()
             print(f"✅ 创建默认管理员: {settings.admin_phone}")
     
+    # 启动姿态日志写缓冲
+    if settings.ingest_buffer_enabled:
+        await ingest_buffer.start(async_session)
+    
+    # 预建日志分区并启动保留期清理
+    await log_maintenance.start(async_session)
+    
+    # 加载 MAC 解析缓存
+    if settings.device_directory_enabled:
+        async with async_session() as db:
+            await device_directory.warm(db)
+    
+    # 启动设备在线状态批量写入
+    await presence_registry.start(async_session)
+    
     yield
     
-    # 关闭时: 清理资源
+    # 关闭时: 断开实时连接，写完缓冲中的日志，再清理资源
+    event_bus.close()
+    await log_maintenance.stop()
+    await presence_registry.stop()
+    await ingest_buffer.stop()
+    await password_hasher.stop()
     await engine.dispose()
 
 
@@ -87,3 +120,21 @@ async def root():
 async def health():
     """健康检查"""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", tags=["健康检查"])
+async def metrics():
+    """运行指标"""
+    return {
+        "ingest_buffer": ingest_buffer.metrics(),
+        "recent_batches": recent_batches.metrics(),
+        "stats_cache": stats_cache.metrics(),
+        "log_maintenance": log_maintenance.metrics(),
+        "count_cache": count_cache.metrics(),
+        "admin_summary": summary_cache.metrics(),
+        "principal_cache": principal_cache.metrics(),
+        "password_hasher": password_hasher.metrics(),
+        "presence": presence_registry.metrics(),
+        "device_directory": device_directory.metrics(),
+        "event_bus": event_bus.metrics(),
+    }
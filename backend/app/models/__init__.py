@@ -5,5 +5,9 @@ from app.models.base import Base
 from app.models.user import User
 from app.models.device import Device, DeviceType
 from app.models.posture_log import PostureLog
+from app.models.posture_rollup import PostureDailyRollup, PostureHourlyRollup
 
-__all__ = ["Base", "User", "Device", "DeviceType", "PostureLog"]
+__all__ = [
+    "Base", "User", "Device", "DeviceType", "PostureLog",
+    "PostureDailyRollup", "PostureHourlyRollup",
+]
@@ -3,7 +3,19 @@
 """
 from datetime import datetime
 from sqlalchemy import func
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
+from sqlalchemy.sql.functions import now
+
+# SQLite 时间以字符串存储，比较和排序按字符串进行
+SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%f000"
+
+
+@compiles(now, "sqlite")
+def _now_sqlite(element, compiler, **kw):
+    # 默认的 CURRENT_TIMESTAMP 不带微秒，与 SQLAlchemy 写入的 "YYYY-MM-DD HH:MM:SS.ffffff" 格式不同，
+    # 同一秒内按字符串比较会错位；统一为相同格式后可直接按列比较、走索引
+    return f"strftime('{SQLITE_DATETIME_FORMAT}', 'now')"
 
 
 class Base(DeclarativeBase):
@@ -2,10 +2,11 @@
 设备模型
 """
 from __future__ import annotations
+import re
 from datetime import datetime
 from enum import Enum
 from typing import Optional
-from sqlalchemy import String, Boolean, ForeignKey, func
+from sqlalchemy import String, Boolean, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -17,9 +18,44 @@ class DeviceType(str, Enum):
     FEEDBACKER = "feedbacker"  # 反馈器 (ESP32-C3)
 
 
+_MAC_SEPARATORS = re.compile(r"[:.\-]")
+_MAC_DIGITS = re.compile(r"[0-9A-Fa-f]{12}")
+
+
+def mac_to_int(mac_address: str) -> Optional[int]:
+    """
+    MAC 地址转 48 位整数 (忽略大小写和 : - . 分隔符)
+
+    Returns:
+        格式不正确时为 None
+    """
+    digits = _MAC_SEPARATORS.sub("", mac_address.strip())
+    if not _MAC_DIGITS.fullmatch(digits):
+        return None
+    return int(digits, 16)
+
+
+def normalize_mac(mac_address: str) -> Optional[str]:
+    """
+    MAC 规范化为大写冒号分隔 (AA:BB:CC:DD:EE:FF)，格式不正确时为 None
+
+    mac_address 列一律以该格式存储，所有写入路径 (注册、绑定、批量导入) 都先规范化，
+    按字符串的唯一约束和查询才与 MAC 本身一一对应
+    """
+    key = mac_to_int(mac_address)
+    if key is None:
+        return None
+    raw = f"{key:012X}"
+    return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+
 class Device(Base, TimestampMixin):
     """设备表"""
     __tablename__ = "devices"
+    __table_args__ = (
+        # 管理后台列表按 (created_at, id) 倒序游标分页
+        Index("ix_devices_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     mac_address: Mapped[str] = mapped_column(String(17), unique=True, index=True, comment="MAC地址")
@@ -38,8 +74,10 @@ class Device(Base, TimestampMixin):
     is_online: Mapped[bool] = mapped_column(Boolean, default=False, comment="在线状态")
     last_seen_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, comment="最后在线时间")
     
-    # 姿态日志关联
-    posture_logs = relationship("PostureLog", back_populates="device", lazy="selectin")
+    # 姿态日志关联 (数据量大，不自动加载)
+    posture_logs = relationship(
+        "PostureLog", back_populates="device", lazy="raise_on_sql", passive_deletes=True
+    )
     
     def __repr__(self) -> str:
         return f"<Device(id={self.id}, mac={self.mac_address}, type={self.device_type})>"
@@ -2,7 +2,7 @@
 姿态日志模型
 """
 from datetime import datetime
-from sqlalchemy import String, Integer, ForeignKey, func
+from sqlalchemy import String, Integer, ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -11,6 +11,12 @@ from app.models.base import Base
 class PostureLog(Base):
     """姿态日志表"""
     __tablename__ = "posture_logs"
+    __table_args__ = (
+        # 自然键: 同一设备同一时刻同一姿态只记录一次 (重试上传时去重)
+        UniqueConstraint("device_id", "recorded_at", "posture_type", name="uq_posture_logs_natural_key"),
+        # 按用户 + 时间范围查询 (统计、汇总重建)，最左前缀同时覆盖按用户查询
+        Index("ix_posture_logs_user_recorded", "user_id", "recorded_at"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -18,7 +24,7 @@ class PostureLog(Base):
     device_id: Mapped[int] = mapped_column(ForeignKey("devices.id"), index=True, comment="设备ID")
     device = relationship("Device", back_populates="posture_logs")
     
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, comment="用户ID")
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), comment="用户ID")
     user = relationship("User", back_populates="posture_logs")
     
     # 姿态数据
@@ -0,0 +1,49 @@
+"""
+姿态汇总模型 (日 / 小时)
+"""
+from datetime import date, datetime
+from sqlalchemy import String, Integer, BigInteger, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class PostureDailyRollup(Base):
+    """姿态日汇总表 (与日志写入同一事务增量维护)"""
+    __tablename__ = "posture_daily_rollup"
+    
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, comment="用户ID"
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True, comment="日期")
+    posture_type: Mapped[str] = mapped_column(String(50), primary_key=True, comment="姿态类型")
+    is_correct: Mapped[bool] = mapped_column(primary_key=True, comment="是否正确姿态")
+    
+    total_duration: Mapped[int] = mapped_column(BigInteger, default=0, comment="累计时长(秒)")
+    record_count: Mapped[int] = mapped_column(Integer, default=0, comment="日志条数")
+    
+    def __repr__(self) -> str:
+        return (
+            f"<PostureDailyRollup(user={self.user_id}, day={self.day}, "
+            f"type={self.posture_type}, duration={self.total_duration}s)>"
+        )
+
+
+class PostureHourlyRollup(Base):
+    """姿态小时汇总表 (与日志写入同一事务增量维护，供小时级时间序列使用)"""
+    __tablename__ = "posture_hourly_rollup"
+    
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, comment="用户ID"
+    )
+    hour: Mapped[datetime] = mapped_column(primary_key=True, comment="小时起点")
+    is_correct: Mapped[bool] = mapped_column(primary_key=True, comment="是否正确姿态")
+    
+    total_duration: Mapped[int] = mapped_column(BigInteger, default=0, comment="累计时长(秒)")
+    record_count: Mapped[int] = mapped_column(Integer, default=0, comment="日志条数")
+    
+    def __repr__(self) -> str:
+        return (
+            f"<PostureHourlyRollup(user={self.user_id}, hour={self.hour}, "
+            f"correct={self.is_correct}, duration={self.total_duration}s)>"
+        )
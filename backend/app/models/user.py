@@ -4,7 +4,7 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Boolean, func
+from sqlalchemy import String, Boolean, Integer, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -13,6 +13,10 @@ from app.models.base import Base, TimestampMixin
 class User(Base, TimestampMixin):
     """用户表"""
     __tablename__ = "users"
+    __table_args__ = (
+        # 管理后台列表按 (created_at, id) 倒序游标分页
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     phone: Mapped[str] = mapped_column(String(20), unique=True, index=True, comment="手机号")
@@ -22,10 +26,14 @@ class User(Base, TimestampMixin):
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False, comment="是否管理员")
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, comment="是否启用")
     last_login_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, comment="最后登录时间")
+    # 冗余计数，设备绑定 / 解绑 / 删除时在同一事务内更新 (DeviceService)
+    device_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="绑定设备数")
     
-    # 关联
-    devices = relationship("Device", back_populates="user", lazy="selectin")
-    posture_logs = relationship("PostureLog", back_populates="user", lazy="selectin")
+    # 关联 (不随用户自动加载，需要时在查询中显式 selectinload)
+    devices = relationship("Device", back_populates="user", lazy="raise_on_sql")
+    posture_logs = relationship(
+        "PostureLog", back_populates="user", lazy="raise_on_sql", passive_deletes=True
+    )
     
     def __repr__(self) -> str:
         return f"<User(id={self.id}, phone={self.phone}, is_admin={self.is_admin})>"
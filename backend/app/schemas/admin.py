@@ -0,0 +1,25 @@
+"""
+管理后台相关模型
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class AdminSummary(BaseModel):
+    """后台概览 ("今日" 均按 UTC 自然日)"""
+    users_total: int
+    users_active: int
+    users_admin: int
+    users_new_today: int
+    users_reporting_today: int
+    devices_total: int
+    devices_by_type: Dict[str, int]
+    devices_online: int
+    devices_paired: int
+    devices_bound: int
+    logs_today: int
+    duration_today: int
+    generated_at: datetime
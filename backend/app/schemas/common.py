@@ -16,9 +16,16 @@ class ResponseModel(BaseModel, Generic[T]):
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
-    """分页响应"""
+    """
+    分页响应
+    
+    next_cursor 为下一页游标 (没有下一页时为 null)，传回 cursor 参数即可继续翻页；
+    total 可能是缓存值或估算值 (total_estimated 为 true)，仅用于显示。
+    """
     items: List[T]
     total: int
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    total_estimated: bool = False
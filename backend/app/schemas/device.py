@@ -3,10 +3,11 @@
 """
 from __future__ import annotations
 from datetime import datetime
+from enum import Enum
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
-from app.models.device import DeviceType
+from app.models.device import DeviceType, normalize_mac
 
 
 class DeviceBase(BaseModel):
@@ -15,6 +16,15 @@ class DeviceBase(BaseModel):
     device_type: DeviceType
     name: str = Field("", max_length=50)
 
+    @field_validator("mac_address")
+    @classmethod
+    def normalize_mac_address(cls, value: str) -> str:
+        """统一为大写冒号分隔格式 (与批量导入、库内存储一致)"""
+        mac_address = normalize_mac(value)
+        if mac_address is None:
+            raise ValueError("MAC 地址格式不正确")
+        return mac_address
+
 
 class DeviceCreate(DeviceBase):
     """设备创建"""
@@ -48,3 +58,46 @@ class DeviceResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class HeartbeatBatch(BaseModel):
+    """批量心跳 (网关代多台设备上报)"""
+    heartbeats: list[tuple[str, bool, Optional[datetime]]] = Field(
+        ..., min_length=1, description="[MAC地址, 是否在线, 记录时间 (null 为当前时间)]"
+    )
+
+
+class HeartbeatStatus(str, Enum):
+    """单条心跳处理结果"""
+    OK = "ok"            # 已生效
+    UNKNOWN = "unknown"  # MAC 未注册
+    STALE = "stale"      # 记录时间早于已知最后在线时间，已忽略
+
+
+class HeartbeatBatchResult(BaseModel):
+    """批量心跳结果"""
+    accepted: int
+    unknown: int
+    stale: int
+    # 与请求顺序一致: [MAC地址, 设备ID, 结果]
+    results: list[tuple[str, Optional[int], HeartbeatStatus]]
+
+
+class ProvisionError(BaseModel):
+    """导入失败的行"""
+    line: int  # 行号 (从 1 开始，含表头)
+    mac_address: str
+    error: str
+
+
+class ProvisionResult(BaseModel):
+    """设备批量导入结果"""
+    total: int
+    inserted: int
+    existing: int  # MAC 已注册，跳过
+    invalid: int
+    paired: int  # 配对成功的设备对数
+    pair_failed: int
+    errors: list[ProvisionError]  # 按行号排列，最多返回前若干条
+    elapsed_ms: float
+    rows_per_second: float
@@ -2,6 +2,7 @@
 姿态数据相关模型
 """
 from datetime import datetime, date
+from enum import Enum
 from pydantic import BaseModel, Field
 
 
@@ -18,6 +19,29 @@ class PostureLogCreate(PostureLogBase):
     device_id: int
 
 
+class PostureUploadResult(BaseModel):
+    """姿态日志上传结果"""
+    accepted: int  # 新写入 (或已入队) 的条数
+    duplicates: int  # 因重复被丢弃的条数
+
+
+class StreamUploadError(BaseModel):
+    """流式上传错误行"""
+    line: int  # 行号 (从 1 开始)
+    error: str
+
+
+class StreamUploadResult(BaseModel):
+    """流式上传进度/结果"""
+    upload_id: str
+    committed_lines: int  # 已提交的行数，续传时作为 offset
+    accepted: int
+    duplicates: int
+    invalid: int
+    errors: list[StreamUploadError]  # 最多返回前若干条错误
+    finished: bool
+
+
 class PostureLogResponse(PostureLogBase):
     """姿态日志响应"""
     id: int
@@ -47,3 +71,31 @@ class WeeklyStats(BaseModel):
     total_correct_duration: int
     total_incorrect_duration: int
     average_correct_rate: float
+
+
+class SeriesBucket(str, Enum):
+    """时间序列桶大小"""
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"  # 周一开始
+    MONTH = "month"
+    YEAR = "year"
+
+
+class SeriesPoint(BaseModel):
+    """时间序列中的一个桶"""
+    start: datetime  # 桶起点
+    correct_duration: int
+    incorrect_duration: int
+    correct_rate: float
+
+
+class PostureSeries(BaseModel):
+    """姿态时长时间序列"""
+    start: datetime  # 第一个桶起点 (按桶大小对齐)
+    end: datetime  # 最后一个桶终点 (不含)
+    bucket: SeriesBucket
+    points: list[SeriesPoint]
+    total_correct_duration: int
+    total_incorrect_duration: int
+    average_correct_rate: float
@@ -0,0 +1,30 @@
+"""
+搜索相关模型
+"""
+from __future__ import annotations
+from typing import List
+
+from pydantic import BaseModel
+
+from app.models.device import DeviceType
+
+
+class UserSuggestion(BaseModel):
+    """用户联想项"""
+    id: int
+    phone: str
+    nickname: str
+
+
+class DeviceSuggestion(BaseModel):
+    """设备联想项"""
+    id: int
+    mac_address: str
+    device_type: DeviceType
+    name: str
+
+
+class TypeaheadResponse(BaseModel):
+    """搜索联想结果 (各自按匹配程度排序)"""
+    users: List[UserSuggestion]
+    devices: List[DeviceSuggestion]
@@ -4,5 +4,6 @@
 from app.services.auth import AuthService
 from app.services.user_service import UserService
 from app.services.device_service import DeviceService
+from app.services.posture_service import PostureService
 
-__all__ = ["AuthService", "UserService", "DeviceService"]
+__all__ = ["AuthService", "UserService", "DeviceService", "PostureService"]
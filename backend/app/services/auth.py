@@ -2,40 +2,52 @@
 认证服务
 """
 from __future__ import annotations
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
 import jwt
-import bcrypt
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
 from app.models.user import User
+from app.services.password_hasher import password_hasher
 
 settings = get_settings()
 
 
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """已认证的请求主体 (只含鉴权所需字段，不加载用户关联数据)"""
+    id: int
+    phone: str
+    is_admin: bool
+    is_active: bool
+
+
 class AuthService:
     """认证服务"""
     
     @staticmethod
-    def hash_password(password: str) -> str:
-        """密码加密"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+    async def hash_password(password: str) -> str:
+        """
+        密码加密 (在哈希线程池中执行，不阻塞事件循环)
+        
+        Raises:
+            PasswordHasherBusy: 等待哈希的请求过多
+        """
+        return await password_hasher.hash(password)
     
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """验证密码"""
-        try:
-            return bcrypt.checkpw(
-                plain_password.encode('utf-8'),
-                hashed_password.encode('utf-8')
-            )
-        except Exception:
-            return False
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        """
+        验证密码
+        
+        Raises:
+            PasswordHasherBusy: 等待哈希的请求过多
+        """
+        return await password_hasher.verify(plain_password, hashed_password)
     
     @staticmethod
     def create_access_token(user_id: int, is_admin: bool = False) -> Tuple[str, int]:
@@ -90,7 +102,12 @@ class AuthService:
         phone: str, 
         password: str
     ) -> Optional[User]:
-        """验证用户"""
+        """
+        验证用户
+        
+        Raises:
+            PasswordHasherBusy: 等待哈希的请求过多
+        """
         result = await db.execute(
             select(User).where(User.phone == phone)
         )
@@ -98,10 +115,15 @@ class AuthService:
         
         if not user:
             return None
-        if not AuthService.verify_password(password, user.password_hash):
+        if not await AuthService.verify_password(password, user.password_hash):
             return None
         if not user.is_active:
             return None
+        
+        # cost 变化后登录时透明升级哈希 (随登录时间一起提交)
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = await AuthService.hash_password(password)
+            password_hasher.record_rehash()
             
         return user
     
@@ -112,3 +134,12 @@ class AuthService:
             select(User).where(User.id == user_id)
         )
         return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def get_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+        """根据 ID 获取请求主体 (按主键查询四列，不构造 ORM 对象)"""
+        result = await db.execute(
+            select(User.id, User.phone, User.is_admin, User.is_active).where(User.id == user_id)
+        )
+        row = result.first()
+        return Principal(*row) if row else None
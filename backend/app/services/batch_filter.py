@@ -0,0 +1,69 @@
+"""
+最近上传批次过滤器
+
+客户端超时重试时通常会原样重发整批日志。进程内记住最近成功写入的批次，
+重发的批次在访问数据库之前就被识别为重复。
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class RecentBatchFilter:
+    """最近批次 LRU 过滤器"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._batches: OrderedDict[tuple[int, object], int] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def batch_key(rows: list[dict], batch_id: Optional[str] = None) -> object:
+        """
+        批次键
+
+        优先使用客户端提供的批次ID，否则使用与顺序无关的自然键集合哈希
+        """
+        if batch_id:
+            return ("id", batch_id)
+        return (
+            "digest",
+            len(rows),
+            hash(frozenset((row["device_id"], row["recorded_at"], row["posture_type"]) for row in rows)),
+        )
+
+    def seen(self, user_id: int, key: object) -> Optional[int]:
+        """批次已写入过时返回当时的条数"""
+        count = self._batches.get((user_id, key))
+        if count is None:
+            self._misses += 1
+            return None
+
+        self._batches.move_to_end((user_id, key))
+        self._hits += 1
+        return count
+
+    def remember(self, user_id: int, key: object, count: int) -> None:
+        """记录已写入的批次"""
+        self._batches[(user_id, key)] = count
+        self._batches.move_to_end((user_id, key))
+        while len(self._batches) > self.capacity:
+            self._batches.popitem(last=False)
+
+    def metrics(self) -> dict:
+        """过滤器指标"""
+        return {
+            "size": len(self._batches),
+            "capacity": self.capacity,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+# 进程内单例
+recent_batches = RecentBatchFilter(settings.posture_batch_filter_size)
@@ -0,0 +1,251 @@
+"""
+MAC 地址解析缓存
+
+MAC 规范化为 48 位整数，按整数排序存放在几个并列的 array 中
+(MAC / 设备 ID / 类型 / 绑定用户 / 配对设备)，二分查找；每台设备约 21 字节，
+一百万台约 20 MB，远小于以字符串为键的 dict。
+
+启动时按 mac_address 索引顺序流式加载一次 (未加载时缓存不生效，查找一律未命中)；
+DeviceService 的创建、修改、配对、删除在事务提交后同步到缓存 (同一事务的变更经 put_many
+排序后一次归并写入，批量导入不会逐条插入数组)。未命中时由调用方回落到数据库查询并写回。
+缓存为进程内缓存，其他进程的修改在本进程回落查询时才会更新。
+"""
+from __future__ import annotations
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.device import Device, DeviceType, mac_to_int
+
+logger = logging.getLogger(__name__)
+
+# 会话 info 中待同步的 MAC -> 设备 (None 表示已删除)，提交后生效
+_DIRTY_KEY = "device_directory_dirty"
+
+_TYPES = list(DeviceType)
+_TYPE_CODES = {device_type: code for code, device_type in enumerate(_TYPES)}
+
+# 流式加载时每批行数
+_WARM_BATCH = 10000
+
+# 新增条数不超过该值时逐条插入 (移动内存)，否则排序后与原数组归并重建
+_MERGE_THRESHOLD = 16
+
+
+class DeviceEntry(NamedTuple):
+    """缓存中的设备"""
+    id: int
+    device_type: DeviceType
+    user_id: Optional[int]
+    paired_device_id: Optional[int]
+
+
+class DeviceDirectory:
+    """MAC -> 设备 解析缓存"""
+
+    def __init__(self):
+        self.loaded = False
+        self._keys = array("q")
+        # 设备 ID 为 32 位整数主键，0 表示无绑定用户 / 配对设备
+        self._ids = array("i")
+        self._types = array("b")
+        self._owners = array("i")
+        self._pairs = array("i")
+
+        # 指标
+        self._hits = 0
+        self._misses = 0
+        self._last_warm_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _index(self, key: int) -> int:
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return index
+        return -1
+
+    def _entry(self, index: int) -> DeviceEntry:
+        return DeviceEntry(
+            self._ids[index],
+            _TYPES[self._types[index]],
+            self._owners[index] or None,
+            self._pairs[index] or None,
+        )
+
+    def lookup(self, mac_address: str) -> Optional[DeviceEntry]:
+        """按 MAC 查找 (未命中或格式不正确时为 None)"""
+        if not self.loaded:
+            return None
+        key = mac_to_int(mac_address)
+        index = self._index(key) if key is not None else -1
+        if index < 0:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return self._entry(index)
+
+    def put(self, mac_address: str, entry: DeviceEntry) -> None:
+        self.put_many([(mac_address, entry)])
+
+    def put_many(self, items: Iterable[tuple[str, DeviceEntry]]) -> None:
+        """
+        批量写入 (MAC, 设备)
+
+        已有的 MAC 原地更新；新增的 MAC 排序后与原数组一次归并，
+        整批为 O(n + m log n)，而不是每条 array.insert 的 O(n)。
+        """
+        if not self.loaded:
+            return
+        columns = (self._ids, self._types, self._owners, self._pairs)
+        added: dict[int, tuple[int, int, int, int]] = {}
+        for mac_address, entry in items:
+            key = mac_to_int(mac_address)
+            if key is None:
+                continue
+            values = (entry.id, _TYPE_CODES[entry.device_type], entry.user_id or 0, entry.paired_device_id or 0)
+            index = self._index(key)
+            if index >= 0:
+                for column, value in zip(columns, values):
+                    column[index] = value
+            else:
+                added[key] = values
+        if not added:
+            return
+
+        keys = sorted(added)
+        positions = [bisect_left(self._keys, key) for key in keys]
+        if len(keys) <= _MERGE_THRESHOLD:
+            # 从后往前插入，前面的插入位置不受影响
+            for key, index in zip(reversed(keys), reversed(positions)):
+                self._keys.insert(index, key)
+                for column, value in zip(columns, added[key]):
+                    column.insert(index, value)
+            return
+
+        new_columns = [keys] + [[added[key][i] for key in keys] for i in range(len(columns))]
+        merged = []
+        for column, values in zip((self._keys, *columns), new_columns):
+            result = array(column.typecode)
+            start = 0
+            for index, value in zip(positions, values):
+                result.extend(column[start:index])
+                result.append(value)
+                start = index
+            result.extend(column[start:])
+            merged.append(result)
+        self._keys, self._ids, self._types, self._owners, self._pairs = merged
+
+    def put_device(self, device) -> None:
+        """写入设备 (Device 或带相同列属性的行)"""
+        self.put_devices([device])
+
+    def put_devices(self, devices: Iterable) -> None:
+        """批量写入设备 (Device 或带相同列属性的行)"""
+        self.put_many(
+            (device.mac_address, DeviceEntry(device.id, device.device_type, device.user_id, device.paired_device_id))
+            for device in devices
+        )
+
+    def remove(self, mac_address: str) -> None:
+        key = mac_to_int(mac_address)
+        index = self._index(key) if key is not None and self.loaded else -1
+        if index >= 0:
+            for column in (self._keys, self._ids, self._types, self._owners, self._pairs):
+                del column[index]
+
+    def mark_dirty(self, session: Session, device: Device, deleted: bool = False) -> None:
+        """本事务提交后同步设备 (deleted 为 True 时移除)"""
+        session.info.setdefault(_DIRTY_KEY, {})[device.mac_address] = None if deleted else device
+
+    async def warm(self, db: AsyncSession) -> int:
+        """
+        一次流式查询加载全部设备 (按 mac_address 唯一索引顺序读取，
+        规范化后仍有序时无需再排序)
+
+        Returns:
+            加载的设备数
+        """
+        started = time.perf_counter()
+        keys, ids, types, owners, pairs = array("q"), array("i"), array("b"), array("i"), array("i")
+        ordered = True
+        result = await db.stream(
+            select(Device.mac_address, Device.id, Device.device_type, Device.user_id, Device.paired_device_id)
+            .order_by(Device.mac_address)
+            .execution_options(yield_per=_WARM_BATCH)
+        )
+        # 按批取行，逐行 await 的开销比解析本身大得多
+        async for partition in result.partitions():
+            for mac_address, device_id, device_type, user_id, paired_device_id in partition:
+                key = mac_to_int(mac_address)
+                if key is None:
+                    continue
+                if keys and key <= keys[-1]:
+                    ordered = False
+                keys.append(key)
+                ids.append(device_id)
+                types.append(_TYPE_CODES[device_type])
+                owners.append(user_id or 0)
+                pairs.append(paired_device_id or 0)
+
+        if not ordered:
+            # 大小写或分隔符不一致时字符串顺序与整数顺序不同，按整数重排
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            keys, ids, types, owners, pairs = (
+                array(column.typecode, (column[i] for i in order))
+                for column in (keys, ids, types, owners, pairs)
+            )
+
+        self._keys, self._ids, self._types, self._owners, self._pairs = keys, ids, types, owners, pairs
+        self.loaded = True
+        self._last_warm_ms = (time.perf_counter() - started) * 1000
+        logger.info("MAC 解析缓存加载 %d 台设备 (%.0f ms)", len(keys), self._last_warm_ms)
+        return len(keys)
+
+    def memory_bytes(self) -> int:
+        return sum(
+            column.itemsize * len(column)
+            for column in (self._keys, self._ids, self._types, self._owners, self._pairs)
+        )
+
+    def metrics(self) -> dict:
+        """缓存指标"""
+        lookups = self._hits + self._misses
+        return {
+            "loaded": self.loaded,
+            "devices": len(self._keys),
+            "memory_bytes": self.memory_bytes(),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "last_warm_ms": round(self._last_warm_ms, 2),
+        }
+
+
+# 进程内单例
+device_directory = DeviceDirectory()
+
+
+@event.listens_for(Session, "after_commit")
+def _sync_after_commit(session: Session) -> None:
+    # 删除逐条移除 (很少见)，写入合并为一次 put_many (批量导入一次提交数千台)
+    changed = []
+    for mac_address, device in session.info.pop(_DIRTY_KEY, {}).items():
+        if device is None:
+            device_directory.remove(mac_address)
+        else:
+            changed.append(device)
+    if changed:
+        device_directory.put_devices(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -5,37 +5,135 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional, Tuple, List
 
-from sqlalchemy import select, func
+from sqlalchemy import case, select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.device import Device, DeviceType
+from app.database import dialect_insert
+from app.models.device import Device, DeviceType, mac_to_int, normalize_mac
+from app.models.user import User
 from app.schemas.device import DeviceCreate, DeviceUpdate
+from app.services.device_directory import device_directory
+from app.services.pagination import Page, count_cache, paginate
+from app.services.presence import DeviceSnapshot, Presence, presence_registry
+from app.services.search_service import SearchService
 
 
 class DeviceService:
     """设备服务"""
     
     @staticmethod
-    async def create_device(db: AsyncSession, data: DeviceCreate) -> Device:
-        """创建设备"""
-        device = Device(
+    async def _move_device_count(
+        db: AsyncSession,
+        old_user_id: Optional[int],
+        new_user_id: Optional[int],
+    ) -> None:
+        """设备归属变化时调整用户的 device_count (原子自增 / 自减，按用户 ID 顺序加锁)"""
+        if old_user_id == new_user_id:
+            return
+        deltas = {old_user_id: -1, new_user_id: 1}
+        for user_id in sorted(key for key in deltas if key is not None):
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(device_count=User.device_count + deltas[user_id])
+            )
+    
+    @staticmethod
+    async def create_device(db: AsyncSession, data: DeviceCreate) -> Optional[Device]:
+        """
+        注册设备 (一条 INSERT ... ON CONFLICT DO NOTHING RETURNING，并发注册同一 MAC 时只有一方成功)
+        
+        Returns:
+            新设备；MAC 已注册时为 None
+        """
+        stmt = (
+            dialect_insert(db)(Device)
+            .values(
+                mac_address=data.mac_address,
+                device_type=data.device_type,
+                name=data.name,
+                firmware_version=data.firmware_version,
+            )
+            .on_conflict_do_nothing(index_elements=[Device.mac_address])
+            .returning(Device)
+        )
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        device = result.scalar_one_or_none()
+        if device is not None:
+            count_cache.invalidate(Device.__tablename__)
+            device_directory.mark_dirty(db.sync_session, device)
+        return device
+    
+    @staticmethod
+    async def bind_device(db: AsyncSession, data: DeviceCreate, user_id: int) -> Optional[Device]:
+        """
+        绑定设备到用户 (设备不存在时创建)
+        
+        创建或绑定未归属的设备为一条 INSERT ... ON CONFLICT (mac_address) DO UPDATE ... RETURNING，
+        归属检查写在冲突条件中 (只更新 user_id 为空的设备)，两台手机同时绑定同一 MAC 时只有一方成功；
+        名称非空时同时改名。设备已有归属时不修改，再读取一次判断是否属于该用户。
+        
+        Returns:
+            绑定后的设备；已被其他用户绑定时为 None
+        """
+        insert_stmt = dialect_insert(db)(Device).values(
             mac_address=data.mac_address,
             device_type=data.device_type,
             name=data.name,
             firmware_version=data.firmware_version,
+            user_id=user_id,
         )
-        db.add(device)
-        await db.flush()
-        await db.refresh(device)
+        stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[Device.mac_address],
+            set_={
+                "user_id": insert_stmt.excluded.user_id,
+                "name": case((insert_stmt.excluded.name != "", insert_stmt.excluded.name), else_=Device.name),
+                "updated_at": func.now(),
+            },
+            where=Device.user_id.is_(None),
+        ).returning(Device)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        device = result.scalar_one_or_none()
+        
+        if device is None:
+            # 已有归属 (已绑定到该用户时原样返回)
+            device = await DeviceService.get_device_by_mac(db, data.mac_address)
+            return device if device is not None and device.user_id == user_id else None
+        
+        await DeviceService._move_device_count(db, None, user_id)
+        # 设备总数或按用户筛选的设备数随之变化
+        count_cache.invalidate(Device.__tablename__)
+        presence_registry.mark_dirty(db.sync_session, device.id)
+        device_directory.mark_dirty(db.sync_session, device)
         return device
     
     @staticmethod
     async def get_device_by_mac(db: AsyncSession, mac_address: str) -> Optional[Device]:
-        """根据 MAC 地址获取设备"""
+        """
+        根据 MAC 地址获取设备
+        
+        先经 MAC 解析缓存得到设备 ID 按主键读取；未命中或缓存已过时时按 MAC 查询并写回缓存。
+        MAC 可用任意分隔符 / 大小写，格式不正确时返回 None
+        """
+        mac_address = normalize_mac(mac_address)
+        if mac_address is None:
+            return None
+        entry = device_directory.lookup(mac_address)
+        if entry is not None:
+            device = await db.get(Device, entry.id)
+            if device is None:
+                # 已被其他进程删除
+                device_directory.remove(mac_address)
+            elif mac_to_int(device.mac_address) == mac_to_int(mac_address):
+                return device
+        
         result = await db.execute(
             select(Device).where(Device.mac_address == mac_address)
         )
-        return result.scalar_one_or_none()
+        device = result.scalar_one_or_none()
+        if device is not None:
+            device_directory.put_device(device)
+        return device
     
     @staticmethod
     async def get_device_by_id(db: AsyncSession, device_id: int) -> Optional[Device]:
@@ -45,6 +143,14 @@ class DeviceService:
         )
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_devices_by_ids(db: AsyncSession, device_ids: list[int]) -> dict[int, Device]:
+        """根据 ID 批量获取设备"""
+        result = await db.execute(
+            select(Device).where(Device.id.in_(device_ids))
+        )
+        return {device.id: device for device in result.scalars()}
+    
     @staticmethod
     async def list_devices(
         db: AsyncSession,
@@ -52,9 +158,15 @@ class DeviceService:
         page_size: int = 20,
         device_type: Optional[DeviceType] = None,
         user_id: Optional[int] = None,
-        search: Optional[str] = None
-    ) -> Tuple[List[Device], int]:
-        """获取设备列表 (分页)"""
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[Device]:
+        """
+        获取设备列表 (按注册时间倒序，支持游标分页)
+        
+        Raises:
+            ValueError: 游标格式不正确
+        """
         query = select(Device)
         
         if device_type:
@@ -62,51 +174,50 @@ class DeviceService:
         if user_id:
             query = query.where(Device.user_id == user_id)
         if search:
-            query = query.where(
-                Device.mac_address.contains(search) | Device.name.contains(search)
-            )
-        
-        # 统计总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await db.execute(count_query)).scalar() or 0
-        
-        # 分页查询
-        query = query.offset((page - 1) * page_size).limit(page_size)
-        query = query.order_by(Device.created_at.desc())
+            query = query.where(SearchService.device_filter(db, search))
         
-        result = await db.execute(query)
-        devices = list(result.scalars().all())
-        
-        return devices, total
+        return await paginate(db, query, Device, page, page_size, cursor)
     
     @staticmethod
     async def update_device(db: AsyncSession, device: Device, data: DeviceUpdate) -> Device:
-        """更新设备"""
+        """更新设备 (归属用户变化时同步更新 device_count)"""
         update_data = data.model_dump(exclude_unset=True)
+        old_user_id = device.user_id
         for key, value in update_data.items():
             setattr(device, key, value)
         
         await db.flush()
+        presence_registry.mark_dirty(db.sync_session, device.id)
+        device_directory.mark_dirty(db.sync_session, device)
+        await DeviceService._move_device_count(db, old_user_id, device.user_id)
+        if old_user_id != device.user_id:
+            # 按用户筛选的设备总数随之变化
+            count_cache.invalidate(Device.__tablename__)
         await db.refresh(device)
         return device
     
     @staticmethod
     async def delete_device(db: AsyncSession, device: Device) -> None:
         """删除设备"""
+        await DeviceService._move_device_count(db, device.user_id, None)
         await db.delete(device)
+        presence_registry.mark_dirty(db.sync_session, device.id, deleted=True)
+        device_directory.mark_dirty(db.sync_session, device, deleted=True)
+        count_cache.invalidate(Device.__tablename__)
     
     @staticmethod
-    async def update_online_status(
-        db: AsyncSession, 
-        device: Device, 
-        is_online: bool
-    ) -> Device:
-        """更新设备在线状态"""
-        device.is_online = is_online
-        if is_online:
-            device.last_seen_at = datetime.utcnow()
-        await db.flush()
-        return device
+    def update_online_status(
+        device: DeviceSnapshot,
+        is_online: bool,
+        seen_at: Optional[datetime] = None,
+    ) -> Optional[Presence]:
+        """
+        更新设备在线状态并续约 (只更新登记表，由后台任务批量写入数据库)
+
+        Returns:
+            更新后的状态；seen_at 早于已知最后在线时间时为 None (过时心跳)
+        """
+        return presence_registry.heartbeat(device, is_online, seen_at)
     
     @staticmethod
     async def pair_devices(
@@ -124,6 +235,10 @@ class DeviceService:
         feedbacker.paired_device_id = detector.id
         
         await db.flush()
+        presence_registry.mark_dirty(db.sync_session, detector.id)
+        presence_registry.mark_dirty(db.sync_session, feedbacker.id)
+        device_directory.mark_dirty(db.sync_session, detector)
+        device_directory.mark_dirty(db.sync_session, feedbacker)
         await db.refresh(detector)
         await db.refresh(feedbacker)
         
@@ -0,0 +1,244 @@
+"""
+实时事件分发 (进程内发布 / 订阅)
+
+订阅者按主题订阅: "fleet" (全部设备，管理员) 或 "user:{id}" (该用户的设备)。
+事件在发布时只编码一次 JSON，按主题投递到各订阅者的有界队列；队列满的订阅者
+(消费过慢) 直接断开，由客户端重连后重新拉取列表，不拖慢发布方和其他订阅者。
+空闲订阅只占一个队列，不产生任何查询。
+
+事件为进程内事件，多进程部署时客户端只收到所连进程内产生的事件。
+"""
+from __future__ import annotations
+import asyncio
+import json
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+
+settings = get_settings()
+
+FLEET_TOPIC = "fleet"
+
+# 会话 info 中待发布的姿态日志汇总，提交后发布
+_PENDING_KEY = "event_bus_posture"
+
+# 订阅结束标记
+_CLOSED = None
+
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class EventBusFull(Exception):
+    """订阅数已达上限"""
+
+
+class SubscriptionClosed(Exception):
+    """订阅已结束 (消费过慢被断开或服务关闭)"""
+
+    def __init__(self, evicted: bool):
+        super().__init__("evicted" if evicted else "closed")
+        self.evicted = evicted
+
+
+class Subscription:
+    """单个订阅 (有界队列)"""
+
+    def __init__(self, topics: tuple[str, ...], queue_size: int):
+        self.topics = topics
+        self.evicted = False
+        self._queue: asyncio.Queue[Optional[str]] = asyncio.Queue(queue_size + 1)
+        self._queue_size = queue_size
+        self._closed = False
+
+    def offer(self, payload: str) -> bool:
+        """放入事件，队列已满时返回 False"""
+        if self._closed:
+            return True
+        if self._queue.qsize() >= self._queue_size:
+            return False
+        self._queue.put_nowait(payload)
+        return True
+
+    def close(self, evicted: bool = False) -> None:
+        """结束订阅，未读事件丢弃"""
+        if self._closed:
+            return
+        self._closed = True
+        self.evicted = evicted
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+    async def next(self, timeout: float) -> Optional[str]:
+        """
+        等待下一个事件 (已编码的 JSON)，超时返回 None
+
+        Raises:
+            SubscriptionClosed: 订阅已结束
+        """
+        try:
+            payload = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if payload is _CLOSED:
+            raise SubscriptionClosed(self.evicted)
+        return payload
+
+
+class EventBus:
+    """进程内事件总线"""
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._topics: dict[str, set[Subscription]] = {}
+        self._count = 0
+
+        # 指标
+        self._published = 0
+        self._delivered = 0
+        self._evicted = 0
+        self._rejected = 0
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """
+        订阅主题
+
+        Raises:
+            EventBusFull: 订阅数已达上限
+        """
+        if self._count >= self.max_subscribers:
+            self._rejected += 1
+            raise EventBusFull()
+        subscription = Subscription(tuple(topics), self.queue_size)
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        removed = False
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                removed = True
+                if not subscribers:
+                    del self._topics[topic]
+        if removed:
+            self._count -= 1
+        subscription.close()
+
+    def publish(self, topics: Iterable[str], payload: dict) -> int:
+        """
+        发布事件到主题 (同一订阅者只收到一次)
+
+        Returns:
+            投递到的订阅者数
+        """
+        targets: set[Subscription] = set()
+        for topic in topics:
+            subscribers = self._topics.get(topic)
+            if subscribers:
+                targets.update(subscribers)
+        self._published += 1
+        if not targets:
+            return 0
+
+        encoded = json.dumps(payload, ensure_ascii=False, default=_encode)
+        delivered = 0
+        for subscription in targets:
+            if subscription.offer(encoded):
+                delivered += 1
+            else:
+                # 消费过慢: 断开，客户端重连后重新拉取
+                subscription.close(evicted=True)
+                self.unsubscribe(subscription)
+                self._evicted += 1
+        self._delivered += delivered
+        return delivered
+
+    def publish_presence(
+        self,
+        device_id: int,
+        user_id: Optional[int],
+        is_online: bool,
+        last_seen_at: Optional[datetime],
+    ) -> None:
+        """发布设备上线 / 离线"""
+        topics = [FLEET_TOPIC] if user_id is None else [FLEET_TOPIC, user_topic(user_id)]
+        self.publish(topics, {
+            "type": "presence",
+            "device_id": device_id,
+            "user_id": user_id,
+            "is_online": is_online,
+            "last_seen_at": last_seen_at,
+        })
+
+    def mark_posture(self, session: Session, logs: Iterable) -> None:
+        """按用户累计本事务写入的日志，提交后发布汇总"""
+        pending: dict[int, dict] = session.info.setdefault(_PENDING_KEY, {})
+        for log in logs:
+            summary = pending.get(log.user_id)
+            if summary is None:
+                summary = pending[log.user_id] = {
+                    "type": "posture",
+                    "user_id": log.user_id,
+                    "count": 0,
+                    "correct_count": 0,
+                    "duration": 0,
+                    "first_recorded_at": log.recorded_at,
+                    "last_recorded_at": log.recorded_at,
+                }
+            summary["count"] += 1
+            summary["correct_count"] += int(log.is_correct)
+            summary["duration"] += log.duration
+            summary["first_recorded_at"] = min(summary["first_recorded_at"], log.recorded_at)
+            summary["last_recorded_at"] = max(summary["last_recorded_at"], log.recorded_at)
+
+    def close(self) -> None:
+        """结束全部订阅 (服务关闭时)"""
+        subscriptions = {s for subscribers in self._topics.values() for s in subscribers}
+        for subscription in subscriptions:
+            self.unsubscribe(subscription)
+
+    def metrics(self) -> dict:
+        """事件总线指标"""
+        return {
+            "subscribers": self._count,
+            "topics": len(self._topics),
+            "published": self._published,
+            "delivered": self._delivered,
+            "evicted": self._evicted,
+            "rejected": self._rejected,
+        }
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法编码 {type(value).__name__}")
+
+
+# 进程内单例
+event_bus = EventBus(settings.events_queue_size, settings.events_max_subscribers)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    # 提交后才发布，回滚的日志不会推送
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        for user_id, summary in pending.items():
+            event_bus.publish([FLEET_TOPIC, user_topic(user_id)], summary)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
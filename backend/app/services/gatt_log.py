@@ -0,0 +1,122 @@
+"""
+GATT 日志记录解码
+
+单条日志 8 字节 (Little-Endian):
+
+    Offset | Size | Field
+    0      | 4    | timestamp     Unix 时间戳
+    4      | 1    | posture_type  姿态类型
+    5      | 2    | duration_sec  持续时间
+    7      | 1    | triggered     是否触发反馈
+
+每条记录恰好是两个 u32 字 (timestamp, posture | duration << 8 | triggered << 24)，
+因此整个负载可以零拷贝地视为 u32 数组，按步长切片得到各列。
+
+triggered 只做取值校验 (0 / 1)，不入库: posture_logs 没有对应列，
+反馈是否触发由设备端按阈值决定，统计只按姿态和时长计算。
+"""
+from __future__ import annotations
+import sys
+import time
+from array import array
+from datetime import datetime
+
+RECORD_SIZE = 8
+
+# 日志记录的姿态类型编码 (.cursor/rules/05-ble-protocol.md PostureType):
+# 0 NORMAL / 1 HUNCHED / 2 LEAN_LEFT / 3 LEAN_RIGHT，按下标映射为入库的姿态类型。
+# 注意与 iOS 实时姿态特征值的编码不同，不能混用。
+POSTURE_TYPE_CODES: tuple[str, ...] = (
+    "correct",      # NORMAL
+    "slouch",       # HUNCHED
+    "lean_left",    # LEAN_LEFT
+    "lean_right",   # LEAN_RIGHT
+)
+CORRECT_POSTURE_CODE = 0
+
+# 时间戳合法范围下限 (2020-01-01)，低于此值说明设备时钟未同步
+MIN_TIMESTAMP = 1577836800
+
+_VALID_POSTURE_BYTES = bytes(range(len(POSTURE_TYPE_CODES)))
+_VALID_TRIGGERED_BYTES = b"\x00\x01"
+
+
+def _as_words(payload: bytes):
+    """将负载视为 u32 数组 (小端主机零拷贝，大端主机退化为一次字节交换拷贝)"""
+    if sys.byteorder == "little":
+        return memoryview(payload).cast("I")
+
+    words = array("I")
+    words.frombytes(payload)
+    words.byteswap()
+    return words
+
+
+def _first_invalid(column: bytes, valid: bytes) -> int:
+    """返回列中第一个非法字节的下标"""
+    allowed = set(valid)
+    return next(i for i, value in enumerate(column) if value not in allowed)
+
+
+def decode_log_records(
+    payload: bytes,
+    device_id: int,
+    user_id: int,
+    max_records: int,
+) -> list[dict]:
+    """
+    解码打包的 GATT 日志记录为批量写入行
+
+    先对整列做向量化校验 (bytes.translate / min / max 均在 C 层完成)，
+    全部合法后再逐条生成行。
+
+    Raises:
+        ValueError: 负载长度或任一字段不合法
+    """
+    if len(payload) % RECORD_SIZE:
+        raise ValueError(f"数据长度 {len(payload)} 不是 {RECORD_SIZE} 字节的整数倍")
+
+    count = len(payload) // RECORD_SIZE
+    if count > max_records:
+        raise ValueError(f"单次最多上传 {max_records} 条日志")
+    if count == 0:
+        return []
+
+    # 列校验: 姿态类型与触发标志
+    posture_column = payload[4::RECORD_SIZE]
+    if posture_column.translate(None, _VALID_POSTURE_BYTES):
+        index = _first_invalid(posture_column, _VALID_POSTURE_BYTES)
+        raise ValueError(f"第 {index} 条日志姿态类型非法: {posture_column[index]}")
+
+    triggered_column = payload[7::RECORD_SIZE]
+    if triggered_column.translate(None, _VALID_TRIGGERED_BYTES):
+        index = _first_invalid(triggered_column, _VALID_TRIGGERED_BYTES)
+        raise ValueError(f"第 {index} 条日志触发标志非法: {triggered_column[index]}")
+
+    # 列校验: 时间戳范围
+    words = _as_words(payload)
+    timestamps = words[0::2]
+    packed = words[1::2]
+    max_timestamp = int(time.time()) + 86400
+
+    if min(timestamps) < MIN_TIMESTAMP or max(timestamps) > max_timestamp:
+        index = next(
+            i for i, ts in enumerate(timestamps)
+            if ts < MIN_TIMESTAMP or ts > max_timestamp
+        )
+        raise ValueError(f"第 {index} 条日志时间戳非法: {timestamps[index]}")
+
+    now = datetime.utcnow()
+    from_timestamp = datetime.utcfromtimestamp
+    return [
+        {
+            "device_id": device_id,
+            "user_id": user_id,
+            "posture_type": POSTURE_TYPE_CODES[word & 0xFF],
+            "duration": (word >> 8) & 0xFFFF,
+            "is_correct": (word & 0xFF) == CORRECT_POSTURE_CODE,
+            "recorded_at": from_timestamp(ts),
+            "created_at": now,
+        }
+        for ts, word in zip(timestamps, packed)
+    ]
@@ -0,0 +1,274 @@
+"""
+姿态日志写缓冲
+
+请求只把校验过的日志行放入进程内缓冲并立即返回，后台任务在达到
+条数阈值或时间阈值时把多个请求的日志合并成一次批量写入、一次提交。
+
+写入失败时:
+- 数据错误 (外键、非空等约束或取值非法) 与批内具体行有关，重试无用，
+  立即二分拆批写入，最终只把单独写入仍失败的行转入死信 (记录日志后丢弃)
+- 其他错误 (连接中断等) 把批次放回队首，最多重试 max_retries 次，
+  仍失败则整批转入死信，避免一批坏数据永久阻塞队列
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.services.posture_service import PostureService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+# 与批内具体行有关、重试无法恢复的错误
+_DATA_ERRORS = (IntegrityError, DataError)
+
+
+class IngestBufferFull(Exception):
+    """缓冲区已满 (需要客户端稍后重试)"""
+
+
+class _Submission:
+    """一次 submit 放入的日志，全部提交后回调 on_commit"""
+    __slots__ = ("remaining", "failed", "on_commit")
+
+    def __init__(self, count: int, on_commit: Callable[[], None]):
+        self.remaining = count
+        self.failed = False
+        self.on_commit = on_commit
+
+
+class IngestBuffer:
+    """姿态日志写缓冲"""
+
+    def __init__(
+        self,
+        max_records: int,
+        flush_size: int,
+        flush_interval: float,
+        max_retries: int,
+    ):
+        self.max_records = max_records
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        # (日志行, 所属 submit，无回调时为 None)
+        self._pending: list[tuple[dict, Optional[_Submission]]] = []
+        self._in_flight = 0
+        # 队首批次已失败的次数
+        self._attempts = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # 指标
+        self._flush_count = 0
+        self._flushed_records = 0
+        self._duplicate_records = 0
+        self._failed_flushes = 0
+        self._retries = 0
+        self._rejected_records = 0
+        self._dropped_records = 0
+        self._dead_letter_records = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        """缓冲中 (含正在写入) 的日志条数"""
+        return len(self._pending) + self._in_flight
+
+    def submit(self, rows: list[dict], on_commit: Optional[Callable[[], None]] = None) -> None:
+        """
+        放入待写日志
+
+        Args:
+            on_commit: 本批日志全部写入并提交后调用 (有行转入死信时不调用)
+
+        Raises:
+            IngestBufferFull: 缓冲区剩余容量不足以容纳本批日志
+        """
+        if self._closing or self.depth + len(rows) > self.max_records:
+            self._rejected_records += len(rows)
+            raise IngestBufferFull()
+
+        submission = _Submission(len(rows), on_commit) if on_commit and rows else None
+        self._pending.extend((row, submission) for row in rows)
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    async def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """启动后台写入任务"""
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self._closing = False
+        self._task = asyncio.create_task(self._run(), name="posture-ingest-buffer")
+
+    async def stop(self) -> None:
+        """停止接收并把缓冲中的日志全部写入"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._pending:
+                await self._flush_once()
+                # 正常运行时每轮只写一批，关闭时持续写到清空
+                if not self._closing and len(self._pending) < self.flush_size:
+                    break
+
+            if self._closing and not self._pending:
+                return
+
+    async def _flush_once(self) -> None:
+        batch = self._pending[:self.flush_size]
+        del self._pending[:len(batch)]
+        self._in_flight = len(batch)
+
+        started = time.perf_counter()
+        dead_letters = self._dead_letter_records
+        try:
+            try:
+                inserted = await self._write(batch)
+            except Exception as e:
+                self._failed_flushes += 1
+                self._attempts += 1
+                if isinstance(e, _DATA_ERRORS):
+                    logger.warning("姿态日志批量写入失败 (%d 条)，拆批写入: %s", len(batch), e)
+                    inserted = await self._write_isolated(batch, e)
+                elif self._closing:
+                    # 关闭阶段不再重试，避免数据库不可用时阻塞退出
+                    logger.exception("姿态日志批量写入失败 (%d 条)", len(batch))
+                    self._dead_letter(batch, e)
+                    self._dropped_records += len(self._pending)
+                    self._pending.clear()
+                    return
+                elif self._attempts <= self.max_retries:
+                    logger.warning(
+                        "姿态日志批量写入失败 (%d 条)，第 %d 次重试", len(batch), self._attempts, exc_info=True
+                    )
+                    self._retries += 1
+                    self._requeue(batch)
+                    await asyncio.sleep(self.flush_interval)
+                    return
+                else:
+                    logger.exception("姿态日志批量写入失败 (%d 条)，重试 %d 次后放弃", len(batch), self.max_retries)
+                    self._dead_letter(batch, e)
+                    inserted = 0
+        finally:
+            self._in_flight = 0
+        self._attempts = 0
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._flush_count += 1
+        self._flushed_records += inserted
+        self._duplicate_records += len(batch) - inserted - (self._dead_letter_records - dead_letters)
+        self._last_flush_ms = elapsed_ms
+        self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def _write(self, batch: list[tuple[dict, Optional[_Submission]]]) -> int:
+        """一次批量写入并提交，提交后回调已全部写入的 submit"""
+        async with self._session_factory() as db:
+            inserted = await PostureService.bulk_insert_logs(db, [row for row, _ in batch])
+            await db.commit()
+
+        for _, submission in batch:
+            if submission is not None:
+                submission.remaining -= 1
+                if submission.remaining == 0 and not submission.failed:
+                    submission.on_commit()
+        return inserted
+
+    async def _write_isolated(self, batch: list[tuple[dict, Optional[_Submission]]], error: Exception) -> int:
+        """
+        数据错误时二分拆批写入，单行仍失败的转入死信
+
+        Returns:
+            写入条数
+        """
+        if len(batch) == 1 or not isinstance(error, _DATA_ERRORS):
+            self._dead_letter(batch, error)
+            return 0
+
+        middle = len(batch) // 2
+        inserted = 0
+        for part in (batch[:middle], batch[middle:]):
+            try:
+                inserted += await self._write(part)
+            except Exception as e:
+                inserted += await self._write_isolated(part, e)
+        return inserted
+
+    def _dead_letter(self, batch: list[tuple[dict, Optional[_Submission]]], error: Exception) -> None:
+        """无法写入的日志记录到日志后丢弃"""
+        self._dead_letter_records += len(batch)
+        for row, submission in batch:
+            if submission is not None:
+                submission.failed = True
+                submission.remaining -= 1
+        logger.error(
+            "%d 条姿态日志无法写入，已丢弃 (%s: %s)，首条: %r",
+            len(batch), type(error).__name__, error, batch[0][0],
+        )
+
+    def _requeue(self, batch: list[tuple[dict, Optional[_Submission]]]) -> None:
+        """写入失败的批次放回队首，超出容量的部分丢弃"""
+        room = max(self.max_records - len(self._pending), 0)
+        kept = batch[:room]
+        self._dropped_records += len(batch) - len(kept)
+        for _, submission in batch[room:]:
+            if submission is not None:
+                submission.failed = True
+        self._pending[:0] = kept
+
+    def metrics(self) -> dict:
+        """缓冲区指标"""
+        return {
+            "enabled": self.running,
+            "queue_depth": self.depth,
+            "capacity": self.max_records,
+            "flush_count": self._flush_count,
+            "flushed_records": self._flushed_records,
+            "duplicate_records": self._duplicate_records,
+            "failed_flushes": self._failed_flushes,
+            "retries": self._retries,
+            "rejected_records": self._rejected_records,
+            "dropped_records": self._dropped_records,
+            "dead_letter_records": self._dead_letter_records,
+            "last_flush_ms": round(self._last_flush_ms, 2),
+            "max_flush_ms": round(self._max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self._flush_count, 2) if self._flush_count else 0.0,
+        }
+
+
+# 进程内单例
+ingest_buffer = IngestBuffer(
+    max_records=settings.ingest_buffer_max_records,
+    flush_size=settings.ingest_buffer_flush_size,
+    flush_interval=settings.ingest_buffer_flush_interval,
+    max_retries=settings.ingest_buffer_max_retries,
+)
@@ -0,0 +1,112 @@
+"""
+请求内批量加载器 (DataLoader)
+
+构建响应时对每个对象调用 load(key)，同一轮事件循环中收集到的键合并成一次
+IN 查询；同一请求内已加载的键直接复用结果。
+
+    users, paired = await asyncio.gather(
+        loaders.users.load_many(device.user_id for device in devices),
+        loaders.devices.load_many(device.paired_device_id for device in devices),
+    )
+
+同一请求的所有加载器共享一把锁，批量查询串行执行 (AsyncSession 不允许并发使用)。
+有加载未完成时不要直接用同一会话执行其他查询。
+"""
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.device import Device
+from app.models.user import User
+from app.services.device_service import DeviceService
+from app.services.user_service import UserService
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# 单条 IN 查询的最大键数
+MAX_BATCH_SIZE = 500
+
+
+class BatchLoader(Generic[K, V]):
+    """按键批量加载并在请求内缓存结果"""
+
+    def __init__(
+        self,
+        batch_fn: Callable[[list[K]], Awaitable[dict[K, V]]],
+        lock: asyncio.Lock,
+    ):
+        self._batch_fn = batch_fn
+        self._lock = lock
+        self._futures: dict[K, asyncio.Future] = {}
+        self._pending: list[K] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    def load(self, key: Optional[K]) -> Awaitable[Optional[V]]:
+        """加载单个键 (键为 None 或不存在时结果为 None)"""
+        loop = asyncio.get_running_loop()
+        if key is None:
+            future = loop.create_future()
+            future.set_result(None)
+            return future
+
+        future = self._futures.get(key)
+        if future is None:
+            future = loop.create_future()
+            self._futures[key] = future
+            self._pending.append(key)
+            if len(self._pending) == 1:
+                # 让出一轮事件循环，收集同一轮中的其他键
+                loop.call_soon(self._schedule_dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[Optional[K]]) -> list[Optional[V]]:
+        """加载多个键，结果与键一一对应"""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: V) -> None:
+        """预置已知结果 (例如列表查询已取出的对象)"""
+        if key not in self._futures:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._futures[key] = future
+
+    def _schedule_dispatch(self) -> None:
+        task = asyncio.create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        for start in range(0, len(keys), MAX_BATCH_SIZE):
+            chunk = keys[start:start + MAX_BATCH_SIZE]
+            try:
+                async with self._lock:
+                    values = await self._batch_fn(chunk)
+            except Exception as e:
+                # 失败的键不缓存，后续可以重试
+                for key in chunk:
+                    future = self._futures.pop(key)
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for key in chunk:
+                future = self._futures[key]
+                if not future.done():
+                    future.set_result(values.get(key))
+
+
+class Loaders:
+    """一个请求内的全部加载器"""
+
+    def __init__(self, db: AsyncSession):
+        lock = asyncio.Lock()
+        self.users: BatchLoader[int, User] = BatchLoader(
+            lambda ids: UserService.get_users_by_ids(db, ids), lock
+        )
+        self.devices: BatchLoader[int, Device] = BatchLoader(
+            lambda ids: DeviceService.get_devices_by_ids(db, ids), lock
+        )
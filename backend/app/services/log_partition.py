@@ -0,0 +1,356 @@
+"""
+姿态日志分区与保留期
+
+PostgreSQL: posture_logs 建为按 recorded_at 的月范围分区表，分区名 posture_logs_pYYYYMM，
+另有默认分区 posture_logs_default 兜底 (超出已建分区范围的日志)。后台任务定期预建
+未来几个月的分区，超过保留期的月份整个分区 DROP，不产生大批量 DELETE。
+带时间范围的查询 (半开区间) 只扫描相关分区。
+
+SQLite: 不分区，超过保留期的日志按块删除，块间暂停，避免长时间占用写锁。
+
+分区表要求主键包含分区键，因此 PostgreSQL 上的物理主键为 (id, recorded_at)；
+id 仍由序列生成，ORM 映射不变。
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time as time_module
+from datetime import date, datetime, time
+from typing import Optional
+
+from sqlalchemy import Connection, MetaData, PrimaryKeyConstraint, Table, delete, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.models.base import Base
+from app.models.posture_log import PostureLog
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = PostureLog.__tablename__
+PARTITION_PREFIX = f"{TABLE_NAME}_p"
+DEFAULT_PARTITION = f"{TABLE_NAME}_default"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """月份加减 (month 为月初)"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def retention_cutoff(today: Optional[date] = None) -> Optional[date]:
+    """
+    保留期起点 (早于该月初的日志会被清理)
+
+    Returns:
+        未配置保留期时返回 None
+    """
+    if settings.posture_log_retention_months <= 0:
+        return None
+    today = today or datetime.utcnow().date()
+    return add_months(month_start(today), -settings.posture_log_retention_months)
+
+
+def _partitioned_table() -> Table:
+    """posture_logs 的分区表定义 (复制模型表结构，主键加入分区键)"""
+    metadata = MetaData()
+    for name in ("users", "devices"):
+        Base.metadata.tables[name].to_metadata(metadata)
+
+    table = PostureLog.__table__.to_metadata(metadata)
+    table.c.recorded_at.primary_key = True
+    table.append_constraint(PrimaryKeyConstraint(table.c.id, table.c.recorded_at))
+    table.c.id.autoincrement = True
+    table.dialect_kwargs["postgresql_partition_by"] = "RANGE (recorded_at)"
+    return table
+
+
+def create_partitioned_table(connection: Connection) -> bool:
+    """
+    PostgreSQL 下 posture_logs 不存在时创建为分区表
+    (由 database.create_schema 在 users / devices 建好之后、完整 create_all 之前调用)
+
+    Returns:
+        是否创建了分区表
+    """
+    if connection.dialect.name != "postgresql" or inspect(connection).has_table(TABLE_NAME):
+        return False
+
+    _partitioned_table().create(connection)
+    connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE_NAME} DEFAULT"))
+    return True
+
+
+class LogPartitionService:
+    """姿态日志分区管理"""
+
+    @staticmethod
+    async def is_partitioned(db: AsyncSession) -> bool:
+        if db.bind.dialect.name != "postgresql":
+            return False
+        result = await db.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"),
+            {"name": TABLE_NAME},
+        )
+        return result.first() is not None
+
+    @staticmethod
+    async def list_partitions(db: AsyncSession) -> list[date]:
+        """已建的月分区 (按月份排序，不含默认分区)"""
+        result = await db.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:name)"
+            ),
+            {"name": TABLE_NAME},
+        )
+        months = []
+        for (name,) in result:
+            suffix = name.removeprefix(PARTITION_PREFIX)
+            if name.startswith(PARTITION_PREFIX) and suffix.isdigit() and len(suffix) == 6:
+                months.append(date(int(suffix[:4]), int(suffix[4:]), 1))
+        return sorted(months)
+
+    @staticmethod
+    async def create_partition(db: AsyncSession, month: date) -> None:
+        """
+        创建一个月分区
+
+        默认分区中已有该月日志时先摘下默认分区，把这部分日志移入新分区后再挂回
+        (否则 PostgreSQL 拒绝创建与默认分区数据重叠的分区)。
+        """
+        name = partition_name(month)
+        bounds = {
+            "lower": datetime.combine(month, time.min),
+            "upper": datetime.combine(add_months(month, 1), time.min),
+        }
+        bound_sql = f"FROM ('{bounds['lower']:%Y-%m-%d}') TO ('{bounds['upper']:%Y-%m-%d}')"
+
+        overlap = await db.execute(
+            text(
+                f"SELECT 1 FROM {DEFAULT_PARTITION} "
+                "WHERE recorded_at >= :lower AND recorded_at < :upper LIMIT 1"
+            ),
+            bounds,
+        )
+        if overlap.first() is None:
+            # 多进程同时维护时可能已被其他进程创建
+            await db.execute(
+                text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE_NAME} FOR VALUES {bound_sql}")
+            )
+            return
+
+        await db.execute(text(f"ALTER TABLE {TABLE_NAME} DETACH PARTITION {DEFAULT_PARTITION}"))
+        await db.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE_NAME} FOR VALUES {bound_sql}"))
+        await db.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                "WHERE recorded_at >= :lower AND recorded_at < :upper RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            bounds,
+        )
+        await db.execute(text(f"ALTER TABLE {TABLE_NAME} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+    @staticmethod
+    async def ensure_partitions(db: AsyncSession, first_month: date, last_month: date) -> list[str]:
+        """
+        补齐 [first_month, last_month] 之间缺少的月分区 (调用方负责提交)
+
+        Returns:
+            新建的分区名
+        """
+        existing = set(await LogPartitionService.list_partitions(db))
+        created = []
+        month = month_start(first_month)
+        while month <= last_month:
+            if month not in existing:
+                await LogPartitionService.create_partition(db, month)
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+        return created
+
+    @staticmethod
+    async def drop_expired(db: AsyncSession, cutoff: date) -> list[str]:
+        """
+        删除整月早于 cutoff 的分区 (调用方负责提交)
+
+        Returns:
+            删除的分区名
+        """
+        dropped = []
+        for month in await LogPartitionService.list_partitions(db):
+            if add_months(month, 1) <= cutoff:
+                name = partition_name(month)
+                await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                dropped.append(name)
+        return dropped
+
+    @staticmethod
+    async def delete_expired(
+        session_factory: async_sessionmaker[AsyncSession],
+        cutoff: date,
+        chunk_size: int,
+        pause: float,
+    ) -> int:
+        """
+        按块删除早于 cutoff 的日志，每块单独提交并暂停 pause 秒
+
+        SQLite 上用于实现保留期；PostgreSQL 上只会命中默认分区中的零散旧日志。
+
+        Returns:
+            删除的条数
+        """
+        cutoff_at = datetime.combine(cutoff, time.min)
+        chunk_ids = (
+            select(PostureLog.id)
+            .where(PostureLog.recorded_at < cutoff_at)
+            .limit(chunk_size)
+            .scalar_subquery()
+        )
+        stmt = (
+            delete(PostureLog)
+            .where(PostureLog.recorded_at < cutoff_at)
+            .where(PostureLog.id.in_(chunk_ids))
+        )
+
+        deleted = 0
+        while True:
+            async with session_factory() as db:
+                result = await db.execute(stmt)
+                await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < chunk_size:
+                return deleted
+            await asyncio.sleep(pause)
+
+
+async def run_maintenance(
+    session_factory: async_sessionmaker[AsyncSession],
+    today: Optional[date] = None,
+) -> dict:
+    """
+    执行一轮维护: 预建分区 (PostgreSQL)、删除过期分区、按块删除剩余过期日志
+
+    Returns:
+        {"created": 新建分区, "dropped": 删除的分区, "deleted": 按块删除的条数}
+    """
+    today = today or datetime.utcnow().date()
+    cutoff = retention_cutoff(today)
+    report = {"created": [], "dropped": [], "deleted": 0}
+
+    async with session_factory() as db:
+        if await LogPartitionService.is_partitioned(db):
+            current = month_start(today)
+            # 上个月也保证存在，兼容跨月补传
+            first = add_months(current, -1)
+            if cutoff is not None:
+                first = max(first, cutoff)
+            report["created"] = await LogPartitionService.ensure_partitions(
+                db, first, add_months(current, settings.posture_partition_premake_months)
+            )
+            if cutoff is not None:
+                report["dropped"] = await LogPartitionService.drop_expired(db, cutoff)
+            await db.commit()
+
+    if cutoff is not None:
+        report["deleted"] = await LogPartitionService.delete_expired(
+            session_factory,
+            cutoff,
+            settings.posture_retention_delete_chunk,
+            settings.posture_retention_delete_pause,
+        )
+    return report
+
+
+class LogMaintenance:
+    """姿态日志维护后台任务 (预建分区 + 保留期清理)"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+
+        self._session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # 指标
+        self._runs = 0
+        self._failed_runs = 0
+        self._created_partitions = 0
+        self._dropped_partitions = 0
+        self._deleted_records = 0
+        self._last_run_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """先同步执行一次 (保证当前月份分区存在)，再启动后台任务"""
+        if self.running:
+            return
+        self._session_factory = session_factory
+        await self.run_once()
+        self._task = asyncio.create_task(self._run(), name="posture-log-maintenance")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    async def run_once(self) -> dict:
+        """执行一轮维护并记录指标 (失败只记录日志，下一轮重试)"""
+        started = time_module.perf_counter()
+        try:
+            report = await run_maintenance(self._session_factory)
+        except Exception:
+            self._failed_runs += 1
+            logger.exception("姿态日志分区维护失败")
+            return {"created": [], "dropped": [], "deleted": 0}
+
+        self._runs += 1
+        self._created_partitions += len(report["created"])
+        self._dropped_partitions += len(report["dropped"])
+        self._deleted_records += report["deleted"]
+        self._last_run_ms = (time_module.perf_counter() - started) * 1000
+        if report["created"] or report["dropped"] or report["deleted"]:
+            logger.info(
+                "姿态日志维护: 新建分区 %s, 删除分区 %s, 删除日志 %d 条",
+                report["created"], report["dropped"], report["deleted"],
+            )
+        return report
+
+    def metrics(self) -> dict:
+        """维护任务指标"""
+        return {
+            "enabled": self.running,
+            "runs": self._runs,
+            "failed_runs": self._failed_runs,
+            "created_partitions": self._created_partitions,
+            "dropped_partitions": self._dropped_partitions,
+            "deleted_records": self._deleted_records,
+            "last_run_ms": round(self._last_run_ms, 2),
+            "retention_months": settings.posture_log_retention_months,
+        }
+
+
+# 进程内单例
+log_maintenance = LogMaintenance(settings.posture_log_maintenance_interval)
@@ -0,0 +1,111 @@
+"""
+姿态日志查询层
+
+原始日志的时间过滤一律使用半开区间 recorded_at >= start AND recorded_at < end，
+可以命中 (user_id, recorded_at) 复合索引 (分区表上还能做分区裁剪)；
+汇总统一在数据库中 GROUP BY 完成，不把原始行拉回应用层。
+"""
+from __future__ import annotations
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import DateTime, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.models.posture_log import PostureLog
+
+
+def day_bounds(start_date: date, end_date: date) -> tuple[datetime, datetime]:
+    """闭区间日期 [start_date, end_date] 转换为半开时间区间"""
+    return (
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min),
+    )
+
+
+class hour_floor(FunctionElement):
+    """时间截断到整点 (各方言编译为各自的函数)"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(hour_floor, "postgresql")
+def _hour_floor_postgresql(element, compiler, **kw):
+    return "date_trunc('hour', {})".format(compiler.process(element.clauses, **kw))
+
+
+@compiles(hour_floor, "sqlite")
+def _hour_floor_sqlite(element, compiler, **kw):
+    # 与 SQLAlchemy 在 SQLite 中的 DateTime 存储格式一致，保证主键比较正确
+    return "strftime('%Y-%m-%d %H:00:00.000000', {})".format(compiler.process(element.clauses, **kw))
+
+
+class LogQuery:
+    """姿态日志查询"""
+
+    @staticmethod
+    def in_range(query: Select, start: Optional[datetime], end: Optional[datetime]) -> Select:
+        """追加半开时间区间条件 (可走索引)"""
+        if start is not None:
+            query = query.where(PostureLog.recorded_at >= start)
+        if end is not None:
+            query = query.where(PostureLog.recorded_at < end)
+        return query
+
+    @staticmethod
+    def daily_totals(
+        user_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Select:
+        """按 (user_id, 日期, 姿态类型, 是否正确) 汇总时长和条数"""
+        day = func.date(PostureLog.recorded_at)
+        query = (
+            select(
+                PostureLog.user_id,
+                day.label("day"),
+                PostureLog.posture_type,
+                PostureLog.is_correct,
+                func.sum(PostureLog.duration).label("total_duration"),
+                func.count().label("record_count"),
+            )
+            .group_by(PostureLog.user_id, day, PostureLog.posture_type, PostureLog.is_correct)
+        )
+        if user_id is not None:
+            query = query.where(PostureLog.user_id == user_id)
+        return LogQuery.in_range(query, start, end)
+
+    @staticmethod
+    def hourly_totals(
+        user_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Select:
+        """按 (user_id, 整点, 是否正确) 汇总时长和条数"""
+        hour = hour_floor(PostureLog.recorded_at)
+        query = (
+            select(
+                PostureLog.user_id,
+                hour.label("hour"),
+                PostureLog.is_correct,
+                func.sum(PostureLog.duration).label("total_duration"),
+                func.count().label("record_count"),
+            )
+            .group_by(PostureLog.user_id, hour, PostureLog.is_correct)
+        )
+        if user_id is not None:
+            query = query.where(PostureLog.user_id == user_id)
+        return LogQuery.in_range(query, start, end)
+
+    @staticmethod
+    async def explain(db: AsyncSession, query: Select) -> str:
+        """返回查询计划文本 (SQLite: EXPLAIN QUERY PLAN；PostgreSQL: EXPLAIN)"""
+        compiled = query.compile(
+            dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}
+        )
+        prefix = "EXPLAIN QUERY PLAN" if db.bind.dialect.name == "sqlite" else "EXPLAIN"
+        conn = await db.connection()
+        result = await conn.exec_driver_sql(f"{prefix} {compiled}")
+        return "\n".join(" ".join(str(value) for value in row) for row in result)
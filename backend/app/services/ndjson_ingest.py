@@ -0,0 +1,250 @@
+"""
+NDJSON 流式日志入库
+
+请求体按块读取、按需解压、按行校验，每满 chunk_size 行写入并提交一次，
+内存占用与上传总量无关。解压按片产出 (每片不超过 1 MB) 并累计解压总量，
+超过上限即中止，压缩炸弹既不会一次性展开，也不能无限展开。每次提交后记录已提交的行号，中断的上传可以
+从该行号续传 (写入本身按自然键幂等，重叠部分会被计为重复)。
+"""
+from __future__ import annotations
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.posture import PostureLogCreate
+from app.services.posture_service import PostureService
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+# 单次解压输出上限，防止压缩炸弹一次性展开
+_DECOMPRESS_STEP = 1 << 20
+
+# zstd 增量解压没有输出上限参数，改为限制每次送入的输入量:
+# 一个块最多展开为 128 KB，最短的块 (RLE) 只占 4 字节，32 字节输入最多展开约 1 MB
+_ZSTD_INPUT_STEP = 32
+
+
+class UnsupportedEncoding(ValueError):
+    """不支持的 Content-Encoding"""
+
+
+class LineTooLong(ValueError):
+    """单行超过长度限制"""
+
+
+class CorruptStream(ValueError):
+    """压缩数据损坏"""
+
+
+class PayloadTooLarge(ValueError):
+    """解压后的请求体超过上限"""
+
+
+_DECODE_ERRORS: tuple[type[Exception], ...] = (zlib.error,)
+if zstandard is not None:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+def _make_raw_decoder(encoding: str) -> Callable[[bytes], Iterable[bytes]]:
+    if encoding == "identity":
+        return lambda chunk: (chunk,)
+
+    if encoding in ("gzip", "x-gzip"):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        def decode_gzip(chunk: bytes) -> Iterable[bytes]:
+            if not chunk:
+                yield decompressor.flush()
+                return
+            yield decompressor.decompress(chunk, _DECOMPRESS_STEP)
+            while decompressor.unconsumed_tail:
+                yield decompressor.decompress(decompressor.unconsumed_tail, _DECOMPRESS_STEP)
+
+        return decode_gzip
+
+    if encoding == "zstd":
+        if zstandard is None:
+            raise UnsupportedEncoding("服务端未安装 zstandard，无法解压 zstd")
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+        def decode_zstd(chunk: bytes) -> Iterable[bytes]:
+            view = memoryview(chunk)
+            for start in range(0, len(view), _ZSTD_INPUT_STEP):
+                part = decompressor.decompress(view[start:start + _ZSTD_INPUT_STEP])
+                if part:
+                    yield part
+
+        return decode_zstd
+
+    raise UnsupportedEncoding(f"不支持的 Content-Encoding: {encoding}")
+
+
+def make_decoder(encoding: Optional[str], max_bytes: int = 0) -> Callable[[bytes], Iterable[bytes]]:
+    """
+    根据 Content-Encoding 创建增量解码函数 (传入 b"" 表示结束)
+
+    解码函数逐片产出解压结果，由调用方边产出边消费。
+
+    Args:
+        max_bytes: 解压后总字节数上限 (0 为不限制)，超出时迭代抛出 PayloadTooLarge
+    """
+    decode = _make_raw_decoder((encoding or "identity").strip().lower())
+    if max_bytes <= 0:
+        return decode
+
+    total = 0
+
+    def decode_limited(chunk: bytes) -> Iterable[bytes]:
+        nonlocal total
+        for part in decode(chunk):
+            total += len(part)
+            if total > max_bytes:
+                raise PayloadTooLarge(f"请求体解压后超过 {max_bytes} 字节")
+            yield part
+
+    return decode_limited
+
+
+async def iter_lines(
+    stream: AsyncIterator[bytes],
+    decode: Callable[[bytes], Iterable[bytes]],
+    max_line_bytes: int,
+) -> AsyncIterator[bytes]:
+    """从请求体流中逐行读取 (经 make_decoder 创建的解码函数解压，每片解压结果立即切行)"""
+    pending = b""
+
+    def safe_decode(chunk: bytes) -> Iterable[bytes]:
+        try:
+            yield from decode(chunk)
+        except _DECODE_ERRORS as e:
+            raise CorruptStream(f"压缩数据损坏: {e}")
+
+    async for chunk in stream:
+        for data in safe_decode(chunk):
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line
+            if len(pending) > max_line_bytes:
+                raise LineTooLong(f"单行超过 {max_line_bytes} 字节")
+
+    for data in safe_decode(b""):
+        pending += data
+    *lines, pending = pending.split(b"\n")
+    for line in lines:
+        yield line
+    if pending:
+        yield pending
+
+
+@dataclass
+class StreamProgress:
+    """流式上传进度"""
+    committed_lines: int = 0  # 已提交的行号 (续传时从此行开始)
+    accepted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list[dict] = field(default_factory=list)
+    finished: bool = False
+
+
+class StreamProgressRegistry:
+    """最近流式上传的进度 (按用户和上传ID)"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: OrderedDict[tuple[int, str], StreamProgress] = OrderedDict()
+
+    def get(self, user_id: int, upload_id: str) -> Optional[StreamProgress]:
+        return self._items.get((user_id, upload_id))
+
+    def start(self, user_id: int, upload_id: str, offset: int) -> StreamProgress:
+        """开始一次上传 (offset > 0 且有记录时视为续传，累计之前的计数)"""
+        progress = self._items.get((user_id, upload_id))
+        if progress is None or offset == 0:
+            progress = StreamProgress()
+            self._items[(user_id, upload_id)] = progress
+        else:
+            # 续传时丢弃未提交区间的错误，这些行会被重新发送
+            progress.errors = [error for error in progress.errors if error["line"] <= offset]
+        progress.committed_lines = offset
+        progress.finished = False
+        self._items.move_to_end((user_id, upload_id))
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+        return progress
+
+
+stream_progress = StreamProgressRegistry(capacity=1000)
+
+
+async def ingest_ndjson(
+    db: AsyncSession,
+    user_id: int,
+    lines: AsyncIterator[bytes],
+    progress: StreamProgress,
+    chunk_size: int,
+    max_errors: int,
+) -> StreamProgress:
+    """
+    流式写入 NDJSON 日志
+
+    非法行和引用不存在设备的行记入错误列表并跳过，不中断整个上传。
+    """
+    known_devices: set[int] = set()
+    line_no = progress.committed_lines
+    chunk: list[PostureLogCreate] = []
+    chunk_lines: list[int] = []
+
+    def add_error(line: int, message: str) -> None:
+        progress.invalid += 1
+        if len(progress.errors) < max_errors:
+            progress.errors.append({"line": line, "error": message})
+
+    async def write_chunk() -> None:
+        nonlocal chunk, chunk_lines
+        missing = await PostureService.find_missing_devices(
+            db, {log.device_id for log in chunk} - known_devices
+        )
+        valid = []
+        for log, number in zip(chunk, chunk_lines):
+            if log.device_id in missing:
+                add_error(number, f"设备不存在: {log.device_id}")
+            else:
+                known_devices.add(log.device_id)
+                valid.append(log)
+
+        rows = PostureService.build_rows(user_id, valid)
+        accepted = await PostureService.bulk_insert_logs(db, rows)
+        await db.commit()
+
+        progress.accepted += accepted
+        progress.duplicates += len(rows) - accepted
+        progress.committed_lines = line_no
+        chunk, chunk_lines = [], []
+
+    async for raw in lines:
+        line_no += 1
+        if not raw.strip():
+            continue
+        try:
+            chunk.append(PostureLogCreate.model_validate_json(raw))
+            chunk_lines.append(line_no)
+        except ValidationError as e:
+            add_error(line_no, e.errors(include_url=False)[0]["msg"])
+
+        if len(chunk) >= chunk_size:
+            await write_chunk()
+
+    if chunk:
+        await write_chunk()
+    progress.committed_lines = line_no
+    progress.finished = True
+    return progress
@@ -0,0 +1,184 @@
+"""
+管理后台列表分页
+
+游标分页: 按 (created_at, id) 倒序，下一页条件为 (created_at, id) < 游标位置，
+可以命中 (created_at, id) 复合索引，翻到多深都只读取一页数据。
+(SQLite 中 func.now() 已编译为与 SQLAlchemy 写入一致的时间格式，同样直接按列比较)
+游标对客户端不透明 (base64 编码的最后一行位置)。
+
+总数: 先查进程内缓存 (TTL)；PostgreSQL 上先取查询计划的估算行数，
+超过阈值时直接返回估算值 (标记 total_estimated)，否则执行精确 COUNT 并缓存。
+新增 / 删除记录时按表失效缓存，其余变化 (筛选条件下的归属变化等) 等待 TTL 过期。
+"""
+from __future__ import annotations
+import base64
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic, Optional, TypeVar
+
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+@dataclass
+class Page(Generic[T]):
+    """一页列表结果"""
+    items: list[T]
+    total: int
+    next_cursor: Optional[str] = None
+    total_estimated: bool = False
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """编码游标 (一页最后一行的位置)"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    解码游标
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+class CountCache:
+    """列表总数缓存 (TTL)"""
+
+    def __init__(self, ttl: float, capacity: int = 1000):
+        self.ttl = ttl
+        self.capacity = capacity
+        self._entries: dict[tuple, tuple[float, int, bool]] = {}
+
+        # 指标
+        self._hits = 0
+        self._misses = 0
+        self._estimates = 0
+
+    def get(self, key: tuple) -> Optional[tuple[int, bool]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._misses += 1
+            return None
+        self._hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key: tuple, total: int, estimated: bool) -> None:
+        if estimated:
+            self._estimates += 1
+        if self.ttl <= 0:
+            return
+        if len(self._entries) >= self.capacity:
+            now = time.monotonic()
+            self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+            if len(self._entries) >= self.capacity:
+                self._entries.clear()
+        self._entries[key] = (time.monotonic() + self.ttl, total, estimated)
+
+    def invalidate(self, table: str) -> None:
+        """失效某张表的全部总数"""
+        self._entries = {k: v for k, v in self._entries.items() if k[0] != table}
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "estimates": self._estimates,
+            "ttl_seconds": self.ttl,
+        }
+
+
+# 进程内单例
+count_cache = CountCache(settings.admin_count_cache_ttl)
+
+
+async def _estimate_rows(db: AsyncSession, query: Select) -> Optional[int]:
+    """PostgreSQL 查询计划估算的行数 (其他方言返回 None)"""
+    if db.bind.dialect.name != "postgresql":
+        return None
+    sql = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    # 直接交给驱动执行: 搜索词中的 ":xx" (MAC 地址) 不能被当作绑定参数解析
+    conn = await db.connection()
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(db: AsyncSession, table: str, query: Select) -> tuple[int, bool]:
+    """
+    列表总数 (带缓存，大表在 PostgreSQL 上使用估算值)
+
+    Returns:
+        (总数, 是否为估算值)
+    """
+    compiled = query.compile(dialect=db.bind.dialect)
+    key = (table, compiled.string, tuple(sorted(compiled.params.items())))
+    cached = count_cache.get(key)
+    if cached is not None:
+        return cached
+
+    estimate = await _estimate_rows(db, query)
+    if estimate is not None and estimate >= settings.admin_count_estimate_threshold:
+        total, estimated = estimate, True
+    else:
+        count_query = select(func.count()).select_from(query.order_by(None).subquery())
+        total, estimated = (await db.execute(count_query)).scalar() or 0, False
+
+    count_cache.put(key, total, estimated)
+    return total, estimated
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    model,
+    page: int,
+    page_size: int,
+    cursor: Optional[str] = None,
+) -> Page:
+    """
+    按 (created_at, id) 倒序分页
+
+    传入 cursor 时按游标取下一页 (忽略 page)；否则按 page 偏移，兼容按页码跳转。
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    position = decode_cursor(cursor) if cursor else None
+    total, estimated = await count_total(db, model.__tablename__, query)
+
+    if position is not None:
+        created_at, row_id = position
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # 多取一行判断是否还有下一页
+    query = query.order_by(model.created_at.desc(), model.id.desc()).limit(page_size + 1)
+    items = list((await db.execute(query)).scalars().all())
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return Page(items=items, total=total, next_cursor=next_cursor, total_estimated=estimated)
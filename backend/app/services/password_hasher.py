@@ -0,0 +1,213 @@
+"""
+密码哈希 (bcrypt)
+
+bcrypt 计算期间释放 GIL，放到专用线程池中执行，不阻塞事件循环；
+同时执行的哈希数不超过线程数，等待中的请求超过上限时直接拒绝 (登录洪峰时快速失败，
+不拖慢其他接口)。
+
+cost (rounds) 可以固定配置，也可以在启动时按目标耗时自动校准。登录成功时
+若已存哈希的 cost 与当前不一致 (自动校准时只在低于当前 cost 时) 透明重新哈希。
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+import bcrypt
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 自动校准的 cost 范围 (低于 10 不安全，高于 16 单次超过数秒)
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+# 校准时的测量 cost
+_PROBE_ROUNDS = 8
+
+
+class PasswordHasherBusy(Exception):
+    """等待哈希的请求过多 (需要客户端稍后重试)"""
+
+
+def calibrate_rounds(target_ms: float) -> int:
+    """
+    按目标耗时估算 cost (每加 1 耗时翻倍)
+
+    Returns:
+        不超过目标耗时的最大 cost，限制在 [MIN_ROUNDS, MAX_ROUNDS]
+    """
+    salt = bcrypt.gensalt(_PROBE_ROUNDS)
+    samples = []
+    for _ in range(3):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration", salt)
+        samples.append((time.perf_counter() - started) * 1000)
+    probe_ms = max(min(samples), 0.01)
+    rounds = _PROBE_ROUNDS + math.floor(math.log2(target_ms / probe_ms))
+    return max(MIN_ROUNDS, min(MAX_ROUNDS, rounds))
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """从 "$2b$12$..." 中取出 cost"""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """线程池中执行的 bcrypt 哈希 / 校验"""
+
+    def __init__(self, workers: int, max_waiting: int, rounds: int, target_ms: float):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.target_ms = target_ms
+        # 配置为 0 时自动校准
+        self.fixed_rounds = rounds > 0
+        self.rounds: Optional[int] = rounds if rounds > 0 else None
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = asyncio.Lock()
+        self._waiting = 0
+
+        # 指标
+        self._hashes = 0
+        self._verifications = 0
+        self._rehashes = 0
+        self._rejected = 0
+        self._max_wait_ms = 0.0
+        self._total_wait_ms = 0.0
+        self._total_run_ms = 0.0
+
+    async def start(self) -> None:
+        """创建线程池并校准 cost (可重复调用，首次使用时也会自动调用)"""
+        if self.rounds is not None and (self.workers <= 0 or self._executor is not None):
+            return
+        async with self._start_lock:
+            if self.workers > 0 and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+                self._semaphore = asyncio.Semaphore(self.workers)
+            if self.rounds is None:
+                self.rounds = await self._run(calibrate_rounds, self.target_ms)
+                logger.info("bcrypt cost 自动校准为 %d (目标 %.0f ms)", self.rounds, self.target_ms)
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._semaphore = None
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        """在线程池中执行 (未配置线程时直接在事件循环中执行，仅用于对比测试)"""
+        if self._executor is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _submit(self, fn: Callable[..., T], *args) -> T:
+        """
+        排队执行一次哈希计算
+
+        Raises:
+            PasswordHasherBusy: 等待中的请求已达上限
+        """
+        await self.start()
+        if self._semaphore is None:
+            started = time.perf_counter()
+            result = fn(*args)
+            self._total_run_ms += (time.perf_counter() - started) * 1000
+            return result
+
+        if self._semaphore.locked() and self._waiting >= self.max_waiting:
+            self._rejected += 1
+            raise PasswordHasherBusy()
+
+        queued = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            started = time.perf_counter()
+            wait_ms = (started - queued) * 1000
+            self._total_wait_ms += wait_ms
+            self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+            result = await self._run(fn, *args)
+            self._total_run_ms += (time.perf_counter() - started) * 1000
+            return result
+        finally:
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """
+        计算密码哈希
+
+        Raises:
+            PasswordHasherBusy: 等待中的请求已达上限
+        """
+        await self.start()
+        salt = bcrypt.gensalt(self.rounds)
+        hashed = await self._submit(bcrypt.hashpw, password.encode("utf-8"), salt)
+        self._hashes += 1
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """
+        校验密码 (哈希格式错误时返回 False)
+
+        Raises:
+            PasswordHasherBusy: 等待中的请求已达上限
+        """
+        self._verifications += 1
+        try:
+            return await self._submit(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+        except PasswordHasherBusy:
+            raise
+        except Exception:
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """已存哈希是否需要按当前 cost 重新计算"""
+        rounds = hash_rounds(hashed)
+        if rounds is None or self.rounds is None:
+            return False
+        if self.fixed_rounds:
+            return rounds != self.rounds
+        # 自动校准的结果因机器而异，只升级不降级，避免多进程间来回重算
+        return rounds < self.rounds
+
+    def record_rehash(self) -> None:
+        self._rehashes += 1
+
+    def metrics(self) -> dict:
+        """哈希指标"""
+        calls = self._hashes + self._verifications
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "waiting": self._waiting,
+            "hashes": self._hashes,
+            "verifications": self._verifications,
+            "rehashes": self._rehashes,
+            "rejected": self._rejected,
+            "max_wait_ms": round(self._max_wait_ms, 2),
+            "avg_wait_ms": round(self._total_wait_ms / calls, 2) if calls else 0.0,
+            "avg_run_ms": round(self._total_run_ms / calls, 2) if calls else 0.0,
+        }
+
+
+# 进程内单例
+password_hasher = PasswordHasher(
+    settings.password_hash_workers,
+    settings.password_hash_max_waiting,
+    settings.password_hash_rounds,
+    settings.password_hash_target_ms,
+)
@@ -0,0 +1,143 @@
+"""
+姿态日志服务
+"""
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Iterable, Sequence
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models.device import Device
+from app.models.posture_log import PostureLog
+from app.schemas.posture import PostureLogCreate
+from app.services.rollup_service import RollupService
+
+settings = get_settings()
+
+# 批量写入的列 (COPY 需要显式列顺序)
+LOG_COLUMNS = (
+    "device_id",
+    "user_id",
+    "posture_type",
+    "duration",
+    "is_correct",
+    "recorded_at",
+    "created_at",
+)
+
+# 自然键 (重复上传时按此去重)
+NATURAL_KEY = ("device_id", "recorded_at", "posture_type")
+
+# 新写入行返回的列 (用于维护日汇总)
+_RETURNING_COLUMNS = ("user_id", "recorded_at", "posture_type", "is_correct", "duration")
+
+# COPY 暂存表: 先 COPY 到暂存表，再 INSERT ... SELECT ... ON CONFLICT DO NOTHING
+_STAGE_TABLE = "posture_logs_stage"
+_COLUMN_LIST = ", ".join(LOG_COLUMNS)
+_CREATE_STAGE_SQL = text(
+    f"CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} ON COMMIT DELETE ROWS "
+    f"AS SELECT {_COLUMN_LIST} FROM {PostureLog.__tablename__} WITH NO DATA"
+)
+_MERGE_STAGE_SQL = text(
+    f"INSERT INTO {PostureLog.__tablename__} ({_COLUMN_LIST}) "
+    f"SELECT {_COLUMN_LIST} FROM {_STAGE_TABLE} "
+    f"ON CONFLICT ({', '.join(NATURAL_KEY)}) DO NOTHING "
+    f"RETURNING {', '.join(_RETURNING_COLUMNS)}"
+)
+_TRUNCATE_STAGE_SQL = text(f"TRUNCATE {_STAGE_TABLE}")
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    """带时区的时间统一转换为 UTC naive 时间 (与库中存储格式一致)"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class PostureService:
+    """姿态日志服务"""
+
+    @staticmethod
+    def build_rows(user_id: int, logs: Sequence[PostureLogCreate]) -> list[dict]:
+        """将已校验的日志转换为批量写入行"""
+        now = datetime.utcnow()
+        return [
+            {
+                "device_id": log.device_id,
+                "user_id": user_id,
+                "posture_type": log.posture_type,
+                "duration": log.duration,
+                "is_correct": log.is_correct,
+                "recorded_at": _to_naive_utc(log.recorded_at),
+                "created_at": now,
+            }
+            for log in logs
+        ]
+
+    @staticmethod
+    async def find_missing_devices(db: AsyncSession, device_ids: Iterable[int]) -> set[int]:
+        """一次查询校验整批日志引用的设备，返回不存在的设备ID"""
+        wanted = set(device_ids)
+        if not wanted:
+            return set()
+
+        result = await db.execute(select(Device.id).where(Device.id.in_(wanted)))
+        return wanted - set(result.scalars().all())
+
+    @staticmethod
+    async def bulk_insert_logs(
+        db: AsyncSession,
+        rows: list[dict],
+        chunk_size: int | None = None,
+    ) -> int:
+        """
+        批量写入姿态日志
+
+        - 按 chunk_size 分块，每块一次 Core INSERT executemany，不经过 ORM 工作单元
+        - PostgreSQL (asyncpg) 且行数达到 posture_copy_threshold 时使用 COPY
+        - 自然键 (device_id, recorded_at, posture_type) 冲突的行被 ON CONFLICT DO NOTHING 丢弃
+        - 新写入的行在同一事务内累加到日汇总表
+
+        Returns:
+            实际写入行数 (不含重复行)
+        """
+        if not rows:
+            return 0
+
+        chunk_size = chunk_size or settings.posture_insert_chunk_size
+
+        if db.bind.dialect.name == "postgresql" and len(rows) >= settings.posture_copy_threshold:
+            inserted = await PostureService._copy_rows(db, rows)
+        else:
+            stmt = (
+                dialect_insert(db)(PostureLog)
+                .on_conflict_do_nothing(index_elements=list(NATURAL_KEY))
+                .returning(*(PostureLog.__table__.c[name] for name in _RETURNING_COLUMNS))
+            )
+            inserted = []
+            for start in range(0, len(rows), chunk_size):
+                result = await db.execute(stmt, rows[start:start + chunk_size])
+                inserted.extend(result.all())
+
+        await RollupService.apply_logs(db, inserted)
+        return len(inserted)
+
+    @staticmethod
+    async def _copy_rows(db: AsyncSession, rows: list[dict]) -> list:
+        """通过 asyncpg COPY 写入暂存表后合并 (与会话共用同一连接和事务)"""
+        conn = await db.connection()
+        await conn.execute(_CREATE_STAGE_SQL)
+        await conn.execute(_TRUNCATE_STAGE_SQL)
+
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            _STAGE_TABLE,
+            records=(tuple(row[column] for column in LOG_COLUMNS) for row in rows),
+            columns=LOG_COLUMNS,
+        )
+
+        result = await conn.execute(_MERGE_STAGE_SQL)
+        return result.all()
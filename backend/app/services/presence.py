@@ -0,0 +1,479 @@
+"""
+设备在线状态登记表
+
+心跳 (/devices/{id}/online、/devices/mac/{mac}/online) 只更新进程内登记表并立即返回，
+后台任务每 PRESENCE_FLUSH_INTERVAL 秒把有变化的 is_online / last_seen_at
+合并成一次批量 UPDATE、一次提交。
+
+在线心跳同时续约租约 (时长按设备类型配置)，租约放在时间轮中，到期的设备
+标记为离线并随下一次批量写入落库；写入时只在数据库中的 last_seen_at 不晚于
+本进程所见时才改为离线，避免覆盖其他进程收到的更新心跳。启动时为数据库中
+在线的设备按 last_seen_at 补上剩余租约。
+
+心跳响应用的设备快照按 ID 缓存 PRESENCE_SNAPSHOT_TTL 秒 (MAC 经 MAC 解析缓存转为 ID)，设备被修改、配对或删除时
+在事务提交后失效；设备响应中的在线状态优先取登记表。
+
+上线 / 离线变化 (含租约到期) 立即通过事件总线推送。
+
+登记表为进程内状态: 多进程部署时以数据库为准，已写入且超过快照 TTL 未再收到心跳的条目
+会从登记表移除，读取回落到数据库中的值。
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import Row, bindparam, event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.device import Device, DeviceType, mac_to_int, normalize_mac
+from app.services.device_directory import device_directory
+from app.services.event_bus import event_bus
+from app.services.timing_wheel import TimingWheel
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 会话 info 中待失效快照的设备 ID，提交后生效
+_DIRTY_KEY = "presence_dirty"
+
+# 批量心跳按 MAC 查询时每条 IN 查询的 MAC 数 (低于 SQLite 绑定参数上限)
+_LOOKUP_CHUNK = 5000
+
+_devices = Device.__table__
+
+# 设备快照: devices 表的只读行，列属性与 Device 相同
+DeviceSnapshot = Row
+_BULK_UPDATE = (
+    update(_devices)
+    .where(_devices.c.id == bindparam("device_id"))
+    .values(is_online=bindparam("online"), last_seen_at=bindparam("seen_at"))
+)
+# 租约到期: 其他进程写入了更新的心跳时不改
+_BULK_EXPIRE = (
+    update(_devices)
+    .where(
+        _devices.c.id == bindparam("device_id"),
+        _devices.c.last_seen_at.is_(None) | (_devices.c.last_seen_at <= bindparam("seen_at")),
+    )
+    .values(is_online=False)
+)
+
+
+@dataclass(slots=True)
+class Presence:
+    """设备在线状态"""
+    is_online: bool
+    last_seen_at: Optional[datetime]
+    # 最近一次心跳 (time.monotonic)
+    reported_at: float
+
+
+class PresenceRegistry:
+    """设备在线状态登记表"""
+
+    def __init__(
+        self,
+        flush_interval: float,
+        snapshot_ttl: float,
+        leases: dict[DeviceType, float],
+        sweep_tick: float,
+    ):
+        self.flush_interval = flush_interval
+        self.snapshot_ttl = snapshot_ttl
+        # 租约时长 (0 表示不自动离线)
+        self.leases = leases
+        self.sweep_tick = sweep_tick
+
+        self._session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self._presence: dict[int, Presence] = {}
+        self._dirty: set[int] = set()
+        # 设备 ID -> (过期时间, 快照)，MAC -> 设备 ID 由 MAC 解析缓存提供
+        self._snapshots: dict[int, tuple[float, DeviceSnapshot]] = {}
+        # 设备 ID -> (续约时的 last_seen_at, 绑定用户 ID)
+        self._leases: TimingWheel[int, tuple[Optional[datetime], Optional[int]]] = TimingWheel(
+            sweep_tick, max(leases.values(), default=0), time.monotonic()
+        )
+        # 租约到期、待写入的设备
+        self._expired: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # 指标
+        self._heartbeats = 0
+        self._stale = 0
+        self._expirations = 0
+        self._snapshot_hits = 0
+        self._snapshot_loads = 0
+        self._flush_count = 0
+        self._flushed_rows = 0
+        self._failed_flushes = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def get_device(
+        self,
+        db: AsyncSession,
+        device_id: Optional[int] = None,
+        mac_address: Optional[str] = None,
+    ) -> Optional[DeviceSnapshot]:
+        """
+        心跳用的设备快照 (按 ID 或 MAC，缓存期内不查询数据库)
+
+        快照为 devices 表的只读行 (按属性读取各列)，不属于任何会话；
+        MAC 可用任意分隔符 / 大小写，格式不正确时视为不存在
+        """
+        key = None
+        if mac_address is not None:
+            mac_address = normalize_mac(mac_address)
+            if mac_address is None:
+                return None
+            key = mac_to_int(mac_address)
+        if device_id is None:
+            resolved = device_directory.lookup(mac_address)
+            device_id = resolved.id if resolved is not None else None
+
+        device = None
+        if device_id is not None:
+            entry = self._snapshots.get(device_id)
+            if entry is not None and entry[0] > time.monotonic() and (
+                key is None or mac_to_int(entry[1].mac_address) == key
+            ):
+                self._snapshot_hits += 1
+                return entry[1]
+
+            # 按主键读取；MAC 解析缓存已过时 (MAC 不符) 时再按 MAC 查询
+            device = (await db.execute(select(_devices).where(_devices.c.id == device_id))).one_or_none()
+            if device is not None and key is not None and mac_to_int(device.mac_address) != key:
+                device = None
+        if device is None and mac_address is not None:
+            device = (await db.execute(select(_devices).where(_devices.c.mac_address == mac_address))).one_or_none()
+        self._snapshot_loads += 1
+        if device is None:
+            return None
+        return self._cache(device)
+
+    async def get_devices_by_mac(self, db: AsyncSession, mac_addresses: Iterable[str]) -> dict[int, DeviceSnapshot]:
+        """
+        批量获取心跳用的设备快照
+
+        MAC 可用任意分隔符 / 大小写；经 MAC 解析缓存命中的按 ID 合并成 IN 查询，
+        未命中或缓存已过时的按规范化 MAC 合并查询，每 _LOOKUP_CHUNK 个一条
+
+        Returns:
+            mac_to_int(MAC) -> 设备快照 (不存在或格式不正确的 MAC 不在结果中)
+        """
+        now = time.monotonic()
+        keys: dict[int, str] = {}
+        for mac_address in mac_addresses:
+            mac_address = normalize_mac(mac_address)
+            if mac_address is not None:
+                keys[mac_to_int(mac_address)] = mac_address
+
+        found: dict[int, DeviceSnapshot] = {}
+        by_id: list[int] = []  # 经 MAC 解析缓存命中、需按 ID 读取的 MAC 键
+        ids: set[int] = set()
+        by_mac: list[str] = []
+        for key, mac_address in keys.items():
+            device = device_directory.lookup(mac_address)
+            if device is None:
+                by_mac.append(mac_address)
+                continue
+            entry = self._snapshots.get(device.id)
+            if entry is not None and entry[0] > now and mac_to_int(entry[1].mac_address) == key:
+                found[key] = entry[1]
+            else:
+                by_id.append(key)
+                ids.add(device.id)
+        self._snapshot_hits += len(found)
+        self._snapshot_loads += len(keys) - len(found)
+
+        ids = sorted(ids)
+        for start in range(0, len(ids), _LOOKUP_CHUNK):
+            result = await db.execute(select(_devices).where(_devices.c.id.in_(ids[start:start + _LOOKUP_CHUNK])))
+            for device in result:
+                key = mac_to_int(device.mac_address)
+                if key in keys:
+                    found[key] = self._cache(device)
+        # MAC 解析缓存已过时 (设备已删除或 MAC 不符) 的改按 MAC 查询
+        by_mac.extend(keys[key] for key in by_id if key not in found)
+
+        for start in range(0, len(by_mac), _LOOKUP_CHUNK):
+            result = await db.execute(
+                select(_devices).where(_devices.c.mac_address.in_(by_mac[start:start + _LOOKUP_CHUNK]))
+            )
+            for device in result:
+                found[mac_to_int(device.mac_address)] = self._cache(device)
+        return found
+
+    def _cache(self, device: DeviceSnapshot) -> DeviceSnapshot:
+        # 按过期时间排列 (重新插入到末尾)
+        self.forget(device.id)
+        self._snapshots[device.id] = (time.monotonic() + self.snapshot_ttl, device)
+        device_directory.put_device(device)
+        return device
+
+    def heartbeat(self, device: DeviceSnapshot, is_online: bool, seen_at: Optional[datetime] = None) -> Optional[Presence]:
+        """
+        记录一次心跳 (在线时刷新 last_seen_at 并续约)，等待后台批量写入
+
+        seen_at 为设备端 / 网关记录的时间 (缺省为当前时间，晚于当前时间时按当前时间)；
+        早于已知 last_seen_at 的心跳已过时，不生效并返回 None
+        """
+        current = self._presence.get(device.id)
+        was_online = current.is_online if current is not None else device.is_online
+        known_seen_at = current.last_seen_at if current is not None else device.last_seen_at
+        utcnow = datetime.utcnow()
+        if seen_at is not None:
+            if seen_at.tzinfo is not None:
+                seen_at = seen_at.astimezone(timezone.utc).replace(tzinfo=None)
+            if known_seen_at is not None and seen_at < known_seen_at:
+                self._stale += 1
+                return None
+            seen_at = min(seen_at, utcnow)
+
+        now = time.monotonic()
+        if is_online:
+            last_seen_at = seen_at or utcnow
+            lease = self.leases.get(device.device_type, 0)
+            if lease > 0:
+                remaining = lease - (utcnow - last_seen_at).total_seconds()
+                self._leases.schedule(device.id, now + max(remaining, 0), (last_seen_at, device.user_id))
+        else:
+            last_seen_at = known_seen_at
+            self._leases.cancel(device.id)
+        self._expired.discard(device.id)
+
+        presence = Presence(is_online=is_online, last_seen_at=last_seen_at, reported_at=now)
+        self._set(device.id, presence)
+        self._heartbeats += 1
+        if is_online != was_online:
+            event_bus.publish_presence(device.id, device.user_id, is_online, last_seen_at)
+        return presence
+
+    def _set(self, device_id: int, presence: Presence) -> None:
+        # 按最近心跳时间排列 (重新插入到末尾)
+        self._presence.pop(device_id, None)
+        self._presence[device_id] = presence
+        self._dirty.add(device_id)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        把租约到期的设备标记为离线 (只访问到期的时间轮槽位)
+
+        Returns:
+            到期的设备数
+        """
+        expired = self._leases.advance(time.monotonic() if now is None else now)
+        for device_id, (last_seen_at, user_id) in expired:
+            self._set(device_id, Presence(is_online=False, last_seen_at=last_seen_at, reported_at=time.monotonic()))
+            self._expired.add(device_id)
+            event_bus.publish_presence(device_id, user_id, False, last_seen_at)
+        self._expirations += len(expired)
+        return len(expired)
+
+    async def restore_leases(self, db: AsyncSession) -> int:
+        """
+        为数据库中在线的设备按 last_seen_at 补上剩余租约 (启动时调用)
+
+        Returns:
+            补上租约的设备数
+        """
+        rows = await db.execute(
+            select(Device.id, Device.device_type, Device.last_seen_at, Device.user_id)
+            .where(Device.is_online.is_(True))
+        )
+        now, utcnow = time.monotonic(), datetime.utcnow()
+        restored = 0
+        for device_id, device_type, last_seen_at, user_id in rows:
+            lease = self.leases.get(device_type, 0)
+            if lease <= 0 or device_id in self._leases:
+                continue
+            elapsed = (utcnow - last_seen_at).total_seconds() if last_seen_at else lease
+            self._leases.schedule(device_id, now + max(lease - elapsed, 0), (last_seen_at, user_id))
+            restored += 1
+        return restored
+
+    def view(self, device: Device) -> tuple[bool, Optional[datetime]]:
+        """设备当前的 (is_online, last_seen_at)，登记表优先"""
+        presence = self._presence.get(device.id)
+        if presence is None:
+            return device.is_online, device.last_seen_at
+        return presence.is_online, presence.last_seen_at
+
+    def forget(self, device_id: int) -> None:
+        """失效设备快照"""
+        self._snapshots.pop(device_id, None)
+
+    def discard(self, device_id: int) -> None:
+        """设备已删除: 移除快照和未写入的状态"""
+        self.forget(device_id)
+        self._presence.pop(device_id, None)
+        self._dirty.discard(device_id)
+        self._expired.discard(device_id)
+        self._leases.cancel(device_id)
+
+    def mark_dirty(self, session: Session, device_id: int, deleted: bool = False) -> None:
+        """立即失效快照，并在本事务提交后再失效一次 (deleted 为 True 时提交后移除)"""
+        self.forget(device_id)
+        dirty = session.info.setdefault(_DIRTY_KEY, {})
+        dirty[device_id] = deleted or dirty.get(device_id, False)
+
+    async def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """启动后台写入任务"""
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self._closing = False
+        async with session_factory() as db:
+            await self.restore_leases(db)
+        self._task = asyncio.create_task(self._run(), name="device-presence")
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余状态"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(self.sweep_tick, self.flush_interval))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self.sweep()
+            if time.monotonic() >= next_flush:
+                async with self._session_factory() as db:
+                    await self.flush(db)
+                next_flush = time.monotonic() + self.flush_interval
+
+        if self._dirty:
+            async with self._session_factory() as db:
+                await self.flush(db)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        把有变化的在线状态批量写入数据库并提交
+
+        Returns:
+            写入的设备数 (失败时为 0，状态保留到下一轮)
+        """
+        if not self._dirty:
+            self._expire()
+            return 0
+
+        batch = {device_id: self._presence[device_id] for device_id in self._dirty}
+        expired = self._expired & batch.keys()
+        self._dirty.clear()
+        self._expired.clear()
+        rows, expired_rows = [], []
+        for device_id, presence in batch.items():
+            row = {"device_id": device_id, "online": presence.is_online, "seen_at": presence.last_seen_at}
+            (expired_rows if device_id in expired else rows).append(row)
+
+        started = time.perf_counter()
+        try:
+            if rows:
+                await db.execute(_BULK_UPDATE, rows)
+            if expired_rows:
+                await db.execute(_BULK_EXPIRE, expired_rows)
+            await db.commit()
+        except Exception:
+            self._failed_flushes += 1
+            logger.exception("设备在线状态批量写入失败 (%d 台)", len(batch))
+            await db.rollback()
+            # 写入期间又收到心跳的设备已在 _dirty 中，其余放回
+            for device_id in batch:
+                if device_id in self._presence and device_id not in self._dirty:
+                    self._dirty.add(device_id)
+                    if device_id in expired:
+                        self._expired.add(device_id)
+            return 0
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._flush_count += 1
+        self._flushed_rows += len(rows)
+        self._last_flush_ms = elapsed_ms
+        self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+        self._expire()
+        return len(batch)
+
+    def _expire(self) -> None:
+        """
+        移除已写入且超过快照 TTL 未再心跳的状态 (之后以数据库为准) 和过期快照
+
+        两者都按时间先后排列，只从头部取到第一个未过期的条目为止
+        """
+        now = time.monotonic()
+        while self._presence:
+            device_id, presence = next(iter(self._presence.items()))
+            if device_id in self._dirty or now - presence.reported_at <= self.snapshot_ttl:
+                break
+            del self._presence[device_id]
+        while self._snapshots:
+            device_id, (expires_at, _) = next(iter(self._snapshots.items()))
+            if expires_at > now:
+                break
+            self.forget(device_id)
+
+    def metrics(self) -> dict:
+        """登记表指标"""
+        lookups = self._snapshot_hits + self._snapshot_loads
+        return {
+            "enabled": self.running,
+            "tracked_devices": len(self._presence),
+            "pending_devices": len(self._dirty),
+            "cached_snapshots": len(self._snapshots),
+            "heartbeats": self._heartbeats,
+            "stale_heartbeats": self._stale,
+            "leases": len(self._leases),
+            "lease_expirations": self._expirations,
+            "snapshot_hit_rate": round(self._snapshot_hits / lookups, 4) if lookups else 0.0,
+            "flush_count": self._flush_count,
+            "flushed_rows": self._flushed_rows,
+            "failed_flushes": self._failed_flushes,
+            "last_flush_ms": round(self._last_flush_ms, 2),
+            "max_flush_ms": round(self._max_flush_ms, 2),
+        }
+
+
+# 进程内单例
+presence_registry = PresenceRegistry(
+    settings.presence_flush_interval,
+    settings.presence_snapshot_ttl,
+    leases={
+        DeviceType.DETECTOR: settings.presence_lease_detector,
+        DeviceType.FEEDBACKER: settings.presence_lease_feedbacker,
+    },
+    sweep_tick=settings.presence_sweep_tick,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_after_commit(session: Session) -> None:
+    # 提交前到提交之间其他心跳可能缓存了旧快照，提交后再失效一次；
+    # 删除在提交后才移除状态 (回滚时设备仍在)
+    for device_id, deleted in session.info.pop(_DIRTY_KEY, {}).items():
+        if deleted:
+            presence_registry.discard(device_id)
+        else:
+            presence_registry.forget(device_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,162 @@
+"""
+认证主体缓存
+
+按访问令牌摘要缓存已验证的 Principal，命中时跳过 JWT 解码和数据库查询。
+缓存条目在 min(写入时间 + TTL, 令牌 exp) 过期，LRU 淘汰。
+
+用户被禁用 / 启用或删除时立即失效该用户的全部条目，事务提交后再失效一次；
+每个用户带数据版本，查询期间发生失效的结果不写回缓存，避免并发请求把旧状态缓存下来。
+
+缓存为进程内缓存，多进程部署时其他进程最迟在 TTL 后生效。
+"""
+from __future__ import annotations
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.services.auth import Principal
+
+settings = get_settings()
+
+# 会话 info 中待失效的用户 ID，提交后生效
+_DIRTY_KEY = "principal_cache_dirty"
+
+
+def token_digest(token: str) -> bytes:
+    """令牌摘要 (缓存键，不在内存中保留令牌原文)"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+class PrincipalCache:
+    """认证主体 LRU 缓存"""
+
+    def __init__(self, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, Principal]] = OrderedDict()
+        self._user_keys: dict[int, set[bytes]] = {}
+        self._versions: dict[int, int] = {}
+
+        # 指标
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0 and self.ttl > 0
+
+    def version(self, user_id: int) -> int:
+        """用户版本 (查询数据库前读取，写回缓存时校验)"""
+        return self._versions.get(user_id, 0)
+
+    def get(self, digest: bytes) -> Optional[Principal]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        expires_at, principal = entry
+        if expires_at <= time.time():
+            self._remove(digest, principal.id)
+            self._expirations += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self._hits += 1
+        return principal
+
+    def put(self, digest: bytes, principal: Principal, token_exp: float, version: int) -> None:
+        """
+        写入缓存
+
+        token_exp 为令牌 exp (Unix 时间戳)；version 为查询前读取的用户版本，
+        期间用户已失效时不写入
+        """
+        if not self.enabled or version != self.version(principal.id):
+            return
+        expires_at = min(time.time() + self.ttl, token_exp)
+        if expires_at <= time.time():
+            return
+
+        self._entries[digest] = (expires_at, principal)
+        self._entries.move_to_end(digest)
+        self._user_keys.setdefault(principal.id, set()).add(digest)
+
+        while len(self._entries) > self.capacity:
+            evicted, (_, evicted_principal) = self._entries.popitem(last=False)
+            self._discard_user_key(evicted_principal.id, evicted)
+            self._evictions += 1
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        失效用户的全部条目
+
+        Returns:
+            失效的条目数
+        """
+        self._versions[user_id] = self.version(user_id) + 1
+        digests = self._user_keys.pop(user_id, set())
+        for digest in digests:
+            self._entries.pop(digest, None)
+        self._invalidations += len(digests)
+        return len(digests)
+
+    def mark_dirty(self, session: Session, user_id: int) -> None:
+        """立即失效，并在本事务提交后再失效一次"""
+        self.invalidate_user(user_id)
+        session.info.setdefault(_DIRTY_KEY, set()).add(user_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._user_keys.clear()
+
+    def _remove(self, digest: bytes, user_id: int) -> None:
+        del self._entries[digest]
+        self._discard_user_key(user_id, digest)
+
+    def _discard_user_key(self, user_id: int, digest: bytes) -> None:
+        digests = self._user_keys.get(user_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._user_keys[user_id]
+
+    def metrics(self) -> dict:
+        """缓存指标"""
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "ttl_seconds": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "expirations": self._expirations,
+            "invalidations": self._invalidations,
+            "evictions": self._evictions,
+        }
+
+
+# 进程内单例
+principal_cache = PrincipalCache(settings.auth_cache_size, settings.auth_cache_ttl)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # 提交前到提交之间其他请求可能读到旧状态，提交后再失效一次
+    for user_id in session.info.pop(_DIRTY_KEY, ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,331 @@
+"""
+设备批量导入 (工厂批次 CSV)
+
+CSV 首行为表头，列名不区分大小写、顺序不限:
+    mac_address, device_type           必填
+    name, firmware_version, paired_mac 可选
+
+按行流式读取，每 chunk_size 行为一块: 整块解析、校验后用一条 IN 查询剔除已注册的 MAC，
+其余以多行 INSERT (ON CONFLICT DO NOTHING) 写入并提交，内存占用与文件大小无关。
+paired_mac 列在全部设备写入后统一校验 (一台探测器配一台反馈器，双方均未与其他设备配对)，
+以批量 UPDATE 写入；已注册设备的配对同样处理，中断后重新导入可补上未完成的配对。每一行的错误 (格式、重复、已注册、配对失败) 记入报告。
+"""
+from __future__ import annotations
+import csv
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.device import Device, DeviceType, normalize_mac
+from app.services.device_directory import device_directory
+from app.services.pagination import count_cache
+from app.services.presence import presence_registry
+
+REQUIRED_COLUMNS = ("mac_address", "device_type")
+OPTIONAL_COLUMNS = ("name", "firmware_version", "paired_mac")
+
+# 按 MAC 查询时每条 IN 查询的 MAC 数 (低于 SQLite 绑定参数上限)
+_LOOKUP_CHUNK = 5000
+
+_NAME_MAX = Device.__table__.c.name.type.length
+_FIRMWARE_MAX = Device.__table__.c.firmware_version.type.length
+_TYPES = {device_type.value: device_type for device_type in DeviceType}
+
+_devices = Device.__table__
+_DIRECTORY_COLUMNS = (
+    _devices.c.mac_address, _devices.c.id, _devices.c.device_type,
+    _devices.c.user_id, _devices.c.paired_device_id,
+)
+_BULK_PAIR = (
+    update(_devices)
+    .where(_devices.c.id == bindparam("device_id"))
+    .values(paired_device_id=bindparam("partner_id"))
+)
+
+
+class InvalidHeader(ValueError):
+    """CSV 表头不正确"""
+
+
+class InvalidEncoding(ValueError):
+    """CSV 不是 UTF-8 编码"""
+
+
+@dataclass
+class ProvisionReport:
+    """导入结果"""
+    total: int = 0      # 数据行数 (不含表头和空行)
+    inserted: int = 0
+    existing: int = 0   # MAC 已注册，跳过
+    invalid: int = 0    # 格式错误或文件内重复
+    paired: int = 0     # 配对成功的设备对数
+    pair_failed: int = 0
+    errors: list[dict] = field(default_factory=list)  # {"line", "mac_address", "error"}
+    elapsed_ms: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.elapsed_ms * 1000 if self.elapsed_ms else 0.0
+
+
+class ProvisioningService:
+    """设备批量导入服务"""
+
+    @staticmethod
+    def parse_header(line: str) -> dict[str, int]:
+        """
+        解析表头，返回列名 -> 列序号
+
+        Raises:
+            InvalidHeader: 缺少必填列或有未知列
+        """
+        names = [name.strip().lower() for name in next(csv.reader([line.lstrip("\ufeff")]), [])]
+        unknown = set(names) - set(REQUIRED_COLUMNS) - set(OPTIONAL_COLUMNS)
+        if unknown:
+            raise InvalidHeader(f"未知列: {', '.join(sorted(unknown))}")
+        missing = [name for name in REQUIRED_COLUMNS if name not in names]
+        if missing:
+            raise InvalidHeader(f"缺少必填列: {', '.join(missing)}")
+        return {name: index for index, name in enumerate(names)}
+
+    @staticmethod
+    def check_chunk(
+        columns: dict[str, int],
+        lines: list[tuple[int, str]],
+        seen: set[str],
+        report: ProvisionReport,
+        max_errors: Optional[int],
+        now: datetime,
+    ) -> tuple[list[dict], list[int], list[tuple[int, str, str]]]:
+        """
+        解析并校验一块数据行
+
+        Returns:
+            (待写入的行, 对应行号, 配对请求 [(行号, MAC, 配对 MAC)])
+        """
+        width = len(columns)
+        # 逐行单独解析，未闭合的引号不会吞掉后续行
+        records = [next(csv.reader([text]), []) for _, text in lines]
+        column = {
+            name: [record[index].strip() if index < len(record) else "" for record in records]
+            for name, index in columns.items()
+        }
+        empty = [""] * len(records)
+        macs = [normalize_mac(value) for value in column["mac_address"]]
+        types = [_TYPES.get(value.lower()) for value in column["device_type"]]
+        names = column.get("name", empty)
+        firmwares = column.get("firmware_version", empty)
+        partners = column.get("paired_mac", empty)
+
+        rows, row_lines, pairs = [], [], []
+        for i, (line_no, _) in enumerate(lines):
+            mac = macs[i]
+            if len(records[i]) > width:
+                error = f"列数多于表头 ({len(records[i])} > {width})"
+            elif mac is None:
+                error = f"MAC 地址格式不正确: {column['mac_address'][i]}"
+            elif types[i] is None:
+                error = f"设备类型不正确: {column['device_type'][i]}"
+            elif len(names[i]) > _NAME_MAX:
+                error = f"设备名称超过 {_NAME_MAX} 个字符"
+            elif len(firmwares[i]) > _FIRMWARE_MAX:
+                error = f"固件版本超过 {_FIRMWARE_MAX} 个字符"
+            elif partners[i] and normalize_mac(partners[i]) in (None, mac):
+                error = f"配对 MAC 不正确: {partners[i]}"
+            elif mac in seen:
+                error = "文件内 MAC 重复"
+            else:
+                seen.add(mac)
+                rows.append({
+                    "mac_address": mac,
+                    "device_type": types[i],
+                    "name": names[i],
+                    "firmware_version": firmwares[i] or "1.0.0",
+                    "is_online": False,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+                row_lines.append(line_no)
+                if partners[i]:
+                    pairs.append((line_no, mac, normalize_mac(partners[i])))
+                continue
+            report.invalid += 1
+            ProvisioningService._add_error(report, max_errors, line_no, column["mac_address"][i], error)
+        return rows, row_lines, pairs
+
+    @staticmethod
+    def _add_error(report: ProvisionReport, max_errors: Optional[int], line: int, mac: str, error: str) -> None:
+        if max_errors is None or len(report.errors) < max_errors:
+            report.errors.append({"line": line, "mac_address": mac, "error": error})
+
+    @staticmethod
+    async def find_existing(db: AsyncSession, macs: list[str]) -> set[str]:
+        """一次 (每 _LOOKUP_CHUNK 个一条) IN 查询返回已注册的 MAC"""
+        existing: set[str] = set()
+        for start in range(0, len(macs), _LOOKUP_CHUNK):
+            result = await db.execute(
+                select(Device.mac_address).where(Device.mac_address.in_(macs[start:start + _LOOKUP_CHUNK]))
+            )
+            existing.update(result.scalars())
+        return existing
+
+    @staticmethod
+    async def insert_devices(db: AsyncSession, rows: list[dict]) -> list:
+        """
+        多行 INSERT 写入设备 (并发导入时已存在的 MAC 被 ON CONFLICT DO NOTHING 跳过)
+
+        Returns:
+            实际写入的设备行 (含 MAC 解析缓存所需的列)
+        """
+        if not rows:
+            return []
+        stmt = (
+            dialect_insert(db)(Device)
+            .on_conflict_do_nothing(index_elements=["mac_address"])
+            .returning(*_DIRECTORY_COLUMNS)
+        )
+        inserted = (await db.execute(stmt, rows)).all()
+        for device in inserted:
+            device_directory.mark_dirty(db.sync_session, device)
+        return inserted
+
+    @staticmethod
+    async def apply_pairs(
+        db: AsyncSession,
+        pairs: list[tuple[int, str, str]],
+        report: ProvisionReport,
+        max_errors: Optional[int],
+    ) -> None:
+        """
+        批量配对 (同一对设备在文件中出现两次时只配对一次)
+
+        配对设备需为另一类型，且双方未与其他设备配对；不满足的行记入报告
+        """
+        if not pairs:
+            return
+        macs = sorted({mac for _, mac, _ in pairs} | {partner for _, _, partner in pairs})
+        devices: dict[str, tuple[int, DeviceType, Optional[int]]] = {}
+        for start in range(0, len(macs), _LOOKUP_CHUNK):
+            result = await db.execute(
+                select(Device.mac_address, Device.id, Device.device_type, Device.paired_device_id)
+                .where(Device.mac_address.in_(macs[start:start + _LOOKUP_CHUNK]))
+            )
+            for mac, device_id, device_type, paired_device_id in result:
+                devices[mac] = (device_id, device_type, paired_device_id)
+
+        # 设备 ID -> 配对设备 ID (含数据库中已有的配对)
+        partner_of = {device_id: paired for device_id, _, paired in devices.values() if paired is not None}
+        assignments: dict[int, int] = {}
+        for line_no, mac, partner_mac in pairs:
+            device_id, device_type, _ = devices[mac]
+            partner = devices.get(partner_mac)
+            if partner is None:
+                error = f"配对设备不存在: {partner_mac}"
+            elif partner[1] == device_type:
+                error = f"配对设备类型相同 ({device_type.value})"
+            elif partner_of.get(device_id) == partner[0]:
+                continue
+            elif device_id in partner_of or partner[0] in partner_of:
+                error = "设备已与其他设备配对"
+            else:
+                partner_of[device_id], partner_of[partner[0]] = partner[0], device_id
+                assignments[device_id], assignments[partner[0]] = partner[0], device_id
+                report.paired += 1
+                continue
+            report.pair_failed += 1
+            ProvisioningService._add_error(report, max_errors, line_no, mac, error)
+
+        if not assignments:
+            return
+        await db.execute(
+            _BULK_PAIR,
+            [{"device_id": device_id, "partner_id": partner_id} for device_id, partner_id in assignments.items()],
+        )
+        ids = list(assignments)
+        for start in range(0, len(ids), _LOOKUP_CHUNK):
+            result = await db.execute(
+                select(*_DIRECTORY_COLUMNS).where(_devices.c.id.in_(ids[start:start + _LOOKUP_CHUNK]))
+            )
+            for device in result:
+                device_directory.mark_dirty(db.sync_session, device)
+                presence_registry.mark_dirty(db.sync_session, device.id)
+
+    @staticmethod
+    async def import_csv(
+        db: AsyncSession,
+        lines: AsyncIterator[bytes],
+        report: ProvisionReport,
+        chunk_size: int,
+        max_errors: Optional[int] = None,
+    ) -> ProvisionReport:
+        """
+        流式导入设备 CSV，每块写入后提交一次 (中断时已提交的块保留在 report 中，
+        重新导入时计为已注册，其 paired_mac 仍会配对)
+
+        Args:
+            lines: 逐行的原始字节 (UTF-8，可带 BOM)
+            max_errors: 报告中最多保留的错误行数 (None 为不限)
+
+        Raises:
+            InvalidHeader: 表头不正确
+            InvalidEncoding: 不是 UTF-8 编码
+        """
+        started = time.perf_counter()
+        columns: Optional[dict[str, int]] = None
+        seen: set[str] = set()
+        pairs: list[tuple[int, str, str]] = []
+        chunk: list[tuple[int, str]] = []
+        line_no = 0
+
+        async def write_chunk() -> None:
+            nonlocal chunk
+            rows, row_lines, chunk_pairs = ProvisioningService.check_chunk(
+                columns, chunk, seen, report, max_errors, datetime.utcnow()
+            )
+            existing = await ProvisioningService.find_existing(db, [row["mac_address"] for row in rows])
+            fresh = [row for row in rows if row["mac_address"] not in existing]
+            inserted = {device.mac_address for device in await ProvisioningService.insert_devices(db, fresh)}
+            await db.commit()
+            if inserted:
+                count_cache.invalidate(Device.__tablename__)
+
+            for row, number in zip(rows, row_lines):
+                if row["mac_address"] not in inserted:
+                    report.existing += 1
+                    ProvisioningService._add_error(report, max_errors, number, row["mac_address"], "MAC 已注册")
+            report.inserted += len(inserted)
+            # 已注册的设备也参与配对: 中断前提交的块尚未配对，重新导入时在此补上
+            pairs.extend(chunk_pairs)
+            chunk = []
+
+        async for raw in lines:
+            line_no += 1
+            try:
+                text = raw.decode("utf-8").rstrip("\r")
+            except UnicodeDecodeError:
+                raise InvalidEncoding(f"第 {line_no} 行不是 UTF-8 编码")
+            if not text.strip():
+                continue
+            if columns is None:
+                columns = ProvisioningService.parse_header(text)
+                continue
+            report.total += 1
+            chunk.append((line_no, text))
+            if len(chunk) >= chunk_size:
+                await write_chunk()
+
+        if columns is None:
+            raise InvalidHeader("文件为空")
+        if chunk:
+            await write_chunk()
+        await ProvisioningService.apply_pairs(db, pairs, report, max_errors)
+        await db.commit()
+
+        report.errors.sort(key=lambda error: error["line"])
+        report.elapsed_ms = (time.perf_counter() - started) * 1000
+        return report
@@ -0,0 +1,230 @@
+"""
+姿态汇总服务
+
+日志写入时在同一事务内增量维护两级汇总:
+- posture_daily_rollup: 按 (用户, 日期, 姿态类型, 是否正确)，供日 / 周 / 月 / 年统计
+- posture_hourly_rollup: 按 (用户, 整点, 是否正确)，供小时级时间序列
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.posture_rollup import PostureDailyRollup, PostureHourlyRollup
+from app.services.event_bus import event_bus
+from app.services.log_query import LogQuery, day_bounds
+from app.services.stats_cache import stats_cache
+
+_ROLLUP_KEY = ("user_id", "day", "posture_type", "is_correct")
+_HOURLY_KEY = ("user_id", "hour", "is_correct")
+
+
+class RollupService:
+    """姿态汇总服务"""
+
+    @staticmethod
+    def aggregate(logs: Iterable) -> dict[tuple, list[int]]:
+        """
+        按 (user_id, day, posture_type, is_correct) 汇总日志
+
+        Args:
+            logs: 带 user_id / recorded_at / posture_type / is_correct / duration 属性的行
+        """
+        deltas: dict[tuple, list[int]] = {}
+        for log in logs:
+            key = (log.user_id, log.recorded_at.date(), log.posture_type, log.is_correct)
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = [log.duration, 1]
+            else:
+                delta[0] += log.duration
+                delta[1] += 1
+        return deltas
+
+    @staticmethod
+    def aggregate_hourly(logs: Iterable) -> dict[tuple, list[int]]:
+        """按 (user_id, 整点, is_correct) 汇总日志"""
+        deltas: dict[tuple, list[int]] = {}
+        for log in logs:
+            hour = log.recorded_at.replace(minute=0, second=0, microsecond=0)
+            key = (log.user_id, hour, log.is_correct)
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = [log.duration, 1]
+            else:
+                delta[0] += log.duration
+                delta[1] += 1
+        return deltas
+
+    @staticmethod
+    async def _upsert(db: AsyncSession, model, key: tuple[str, ...], deltas: dict[tuple, list[int]]) -> None:
+        """把增量累加到汇总表"""
+        stmt = dialect_insert(db)(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={
+                "total_duration": model.total_duration + stmt.excluded.total_duration,
+                "record_count": model.record_count + stmt.excluded.record_count,
+            },
+        )
+        # 按主键排序写入，并发事务加锁顺序一致，避免死锁
+        await db.execute(stmt, [
+            {**dict(zip(key, values)), "total_duration": total, "record_count": count}
+            for values, (total, count) in sorted(deltas.items())
+        ])
+
+    @staticmethod
+    async def apply_logs(db: AsyncSession, logs: Iterable) -> None:
+        """把新写入的日志累加到日汇总和小时汇总 (调用方负责提交，与日志写入同一事务)"""
+        logs = list(logs)
+        if not logs:
+            return
+
+        await RollupService._upsert(db, PostureDailyRollup, _ROLLUP_KEY, RollupService.aggregate(logs))
+        await RollupService._upsert(db, PostureHourlyRollup, _HOURLY_KEY, RollupService.aggregate_hourly(logs))
+        stats_cache.mark_dirty(db.sync_session, logs)
+        event_bus.mark_posture(db.sync_session, logs)
+
+    @staticmethod
+    def _scope(
+        query,
+        user_id: Optional[int],
+        start_day: Optional[date],
+        end_day: Optional[date],
+    ):
+        """按用户和日期范围 [start_day, end_day] 限定汇总表查询"""
+        if user_id is not None:
+            query = query.where(PostureDailyRollup.user_id == user_id)
+        if start_day is not None:
+            query = query.where(PostureDailyRollup.day >= start_day)
+        if end_day is not None:
+            query = query.where(PostureDailyRollup.day <= end_day)
+        return query
+
+    @staticmethod
+    def _scope_hourly(
+        query,
+        user_id: Optional[int],
+        start_day: Optional[date],
+        end_day: Optional[date],
+    ):
+        """按用户和日期范围 [start_day, end_day] 限定小时汇总表查询"""
+        start, end = RollupService._time_range(start_day, end_day)
+        if user_id is not None:
+            query = query.where(PostureHourlyRollup.user_id == user_id)
+        if start is not None:
+            query = query.where(PostureHourlyRollup.hour >= start)
+        if end is not None:
+            query = query.where(PostureHourlyRollup.hour < end)
+        return query
+
+    @staticmethod
+    def _time_range(
+        start_day: Optional[date],
+        end_day: Optional[date],
+    ) -> tuple[Optional[datetime], Optional[datetime]]:
+        """日期范围 [start_day, end_day] 转换为半开时间区间 (两端可缺省)"""
+        start = day_bounds(start_day, start_day)[0] if start_day else None
+        end = day_bounds(end_day, end_day)[1] if end_day else None
+        return start, end
+
+    @staticmethod
+    def _raw_totals(
+        user_id: Optional[int],
+        start_day: Optional[date],
+        end_day: Optional[date],
+    ):
+        """同一范围内原始日志的按天汇总 (半开时间区间)"""
+        return LogQuery.daily_totals(user_id, *RollupService._time_range(start_day, end_day))
+
+    @staticmethod
+    async def rebuild(
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None,
+    ) -> int:
+        """
+        从原始日志重建日汇总和小时汇总 (可按用户和日期范围限定)
+
+        Returns:
+            重建后的日汇总行数
+        """
+        await db.execute(RollupService._scope(delete(PostureDailyRollup), user_id, start_day, end_day))
+        await db.execute(RollupService._scope_hourly(delete(PostureHourlyRollup), user_id, start_day, end_day))
+
+        await db.execute(
+            insert(PostureDailyRollup).from_select(
+                [*_ROLLUP_KEY, "total_duration", "record_count"],
+                RollupService._raw_totals(user_id, start_day, end_day),
+            )
+        )
+        await db.execute(
+            insert(PostureHourlyRollup).from_select(
+                [*_HOURLY_KEY, "total_duration", "record_count"],
+                LogQuery.hourly_totals(user_id, *RollupService._time_range(start_day, end_day)),
+            )
+        )
+
+        count_query = select(func.count()).select_from(PostureDailyRollup)
+        count_query = RollupService._scope(count_query, user_id, start_day, end_day)
+        return (await db.execute(count_query)).scalar() or 0
+
+    @staticmethod
+    async def check(
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None,
+    ) -> list[dict]:
+        """
+        校验日汇总、小时汇总与原始日志是否一致 (可按用户和日期范围限定)
+
+        Returns:
+            不一致项列表: table 为汇总表，key 为汇总键，
+            expected 为原始日志汇总，actual 为汇总表中的 (时长, 条数)
+        """
+        expected = {
+            (row.user_id, str(row.day), row.posture_type, bool(row.is_correct)): (
+                int(row.total_duration), row.record_count
+            )
+            for row in await db.execute(RollupService._raw_totals(user_id, start_day, end_day))
+        }
+        query = RollupService._scope(select(PostureDailyRollup), user_id, start_day, end_day)
+        actual = {
+            (row.user_id, str(row.day), row.posture_type, bool(row.is_correct)): (
+                row.total_duration, row.record_count
+            )
+            for row in (await db.execute(query)).scalars()
+        }
+        mismatches = RollupService._diff("daily", _ROLLUP_KEY, expected, actual)
+
+        time_range = RollupService._time_range(start_day, end_day)
+        expected = {
+            (row.user_id, row.hour, bool(row.is_correct)): (int(row.total_duration), row.record_count)
+            for row in await db.execute(LogQuery.hourly_totals(user_id, *time_range))
+        }
+        query = RollupService._scope_hourly(select(PostureHourlyRollup), user_id, start_day, end_day)
+        actual = {
+            (row.user_id, row.hour, bool(row.is_correct)): (row.total_duration, row.record_count)
+            for row in (await db.execute(query)).scalars()
+        }
+        mismatches += RollupService._diff("hourly", _HOURLY_KEY, expected, actual)
+        return mismatches
+
+    @staticmethod
+    def _diff(table: str, key_names: tuple[str, ...], expected: dict, actual: dict) -> list[dict]:
+        """比较原始汇总与汇总表"""
+        mismatches = []
+        for key in sorted(expected.keys() | actual.keys()):
+            if expected.get(key) != actual.get(key):
+                mismatches.append({
+                    "table": table,
+                    "key": dict(zip(key_names, key)),
+                    "expected": expected.get(key),
+                    "actual": actual.get(key),
+                })
+        return mismatches
@@ -0,0 +1,276 @@
+"""
+管理后台子串搜索
+
+PostgreSQL: pg_trgm GIN 索引 (手机号、昵称、设备名称、规范化后的 MAC)，
+LIKE / ILIKE '%x%' 直接走三元组索引。
+SQLite: FTS5 trigram 影子表 users_search / devices_search，由触发器与主表同步，
+按 rowid (= 主键) 关联回主表。
+
+三元组索引只对 3 个字符以上的查询词有效，更短的查询词退回普通 LIKE。
+MAC 地址统一去掉分隔符 (: - . 空格) 并转小写后匹配，"aa:bb:c"、"AABBC"、"aa-bb-c" 都能命中；
+查询词与库内表达式使用同一组分隔符。
+"""
+from __future__ import annotations
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import Connection, ColumnElement, case, func, inspect, literal_column, or_, select, table, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.device import Device
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 三元组索引生效的最短查询词
+MIN_INDEXED_LENGTH = 3
+
+# 联想先按匹配程度只取前若干条主键 (窄行排序)，再加载完整行
+TYPEAHEAD_CANDIDATES = 1000
+
+# MAC 分隔符: 查询词 (normalize_mac) 与索引 / 触发器中的表达式 (_MAC_SQL) 共用
+MAC_SEPARATORS = ":-. "
+
+
+def _mac_sql() -> str:
+    """规范化 MAC 的 SQL 表达式模板 ({} 为 MAC 列)"""
+    expression = "{}"
+    for separator in MAC_SEPARATORS:
+        expression = f"replace({expression}, '{separator}', '')"
+    return f"lower({expression})"
+
+
+_MAC_SQL = _mac_sql()
+_MAC_SEPARATOR_PATTERN = re.compile(f"[{re.escape(MAC_SEPARATORS)}]")
+_HEX = re.compile(r"^[0-9a-f]+$")
+
+_POSTGRESQL_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_users_phone_trgm ON users USING gin (phone gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_nickname_trgm ON users USING gin (nickname gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_devices_name_trgm ON devices USING gin (name gin_trgm_ops)",
+    # 旧版索引的 MAC 表达式只去掉 : 和 -，与查询表达式不一致时用不上
+    "DROP INDEX IF EXISTS ix_devices_mac_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_devices_mac_normalized_trgm ON devices "
+    f"USING gin (({_MAC_SQL.format('mac_address')}) gin_trgm_ops)",
+]
+
+# SQLite 影子表: 表名 -> (主表, 影子表列, 对应的主表表达式, 主表中需要同步的列)
+_SQLITE_SHADOWS = {
+    "users_search": (
+        "users", ("phone", "nickname"), ("{}.phone", "{}.nickname"), ("phone", "nickname"),
+    ),
+    "devices_search": (
+        "devices", ("mac", "name"), (_MAC_SQL.format("{}.mac_address"), "{}.name"), ("mac_address", "name"),
+    ),
+}
+
+# SQLite 影子表是否可用 (缺少 FTS5 / trigram 时退回 LIKE)
+_sqlite_fts_ready = False
+
+
+def normalize_mac(value: str) -> str:
+    """MAC 地址 (或片段) 去分隔符、转小写"""
+    return _MAC_SEPARATOR_PATTERN.sub("", value).lower()
+
+
+def _mac_fragment(query: str) -> Optional[str]:
+    """查询词看起来是 MAC 片段时返回规范化结果，否则返回 None"""
+    fragment = normalize_mac(query)
+    return fragment if fragment and _HEX.match(fragment) else None
+
+
+def _mac_column() -> ColumnElement:
+    """规范化后的 MAC 表达式 (常量内联，与 PostgreSQL 表达式索引一致)"""
+    return literal_column(_MAC_SQL.format("devices.mac_address"))
+
+
+def _fts_phrase(value: str) -> str:
+    """FTS5 短语 (整体作为子串匹配，转义双引号)"""
+    return '"{}"'.format(value.replace('"', '""'))
+
+
+def _create_postgresql_index(connection: Connection) -> None:
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError:
+        # 没有建扩展的权限时搜索仍然可用，只是退化为全表扫描
+        logger.warning("无法启用 pg_trgm 扩展，搜索不使用三元组索引")
+        return
+    for statement in _POSTGRESQL_DDL:
+        connection.execute(text(statement))
+
+
+def _sqlite_trigger_sql(shadow: str) -> dict[str, str]:
+    """影子表同步触发器: 触发器名 -> 建触发器语句"""
+    source, columns, expressions, watched = _SQLITE_SHADOWS[shadow]
+    column_list = ", ".join(columns)
+    new_values = ", ".join(expression.format("new") for expression in expressions)
+    assignments = ", ".join(
+        f"{column} = {expression.format('new')}"
+        for column, expression in zip(columns, expressions)
+    )
+    return {
+        f"{shadow}_insert": (
+            f"CREATE TRIGGER {shadow}_insert AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {shadow} (rowid, {column_list}) VALUES (new.id, {new_values}); END"
+        ),
+        # 只在被索引的列变化时同步 (心跳等频繁更新不触发)
+        f"{shadow}_update": (
+            f"CREATE TRIGGER {shadow}_update AFTER UPDATE OF {', '.join(watched)} ON {source} BEGIN "
+            f"UPDATE {shadow} SET {assignments} WHERE rowid = old.id; END"
+        ),
+        f"{shadow}_delete": (
+            f"CREATE TRIGGER {shadow}_delete AFTER DELETE ON {source} BEGIN "
+            f"DELETE FROM {shadow} WHERE rowid = old.id; END"
+        ),
+    }
+
+
+def _create_sqlite_index(connection: Connection) -> None:
+    global _sqlite_fts_ready
+    existing = set(inspect(connection).get_table_names())
+    try:
+        with connection.begin_nested():
+            for shadow, (source, columns, expressions, _) in _SQLITE_SHADOWS.items():
+                triggers = _sqlite_trigger_sql(shadow)
+                if shadow in existing:
+                    current = dict(connection.execute(text(
+                        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :source"
+                    ), {"source": source}).all())
+                    if all(current.get(name) == sql for name, sql in triggers.items()):
+                        continue
+                    # 规范化表达式有变化: 重建影子表和触发器
+                    logger.info("搜索影子表 %s 的表达式已变化，重建", shadow)
+                    for name in triggers:
+                        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+                    connection.execute(text(f"DROP TABLE {shadow}"))
+
+                column_list = ", ".join(columns)
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE {shadow} USING fts5({column_list}, tokenize='trigram')"
+                ))
+                # 已有数据一次性导入
+                connection.execute(text(
+                    f"INSERT INTO {shadow} (rowid, {column_list}) SELECT id, "
+                    + ", ".join(expression.format(source) for expression in expressions)
+                    + f" FROM {source}"
+                ))
+                for sql in triggers.values():
+                    connection.execute(text(sql))
+    except DBAPIError:
+        logger.warning("SQLite 不支持 FTS5 trigram，搜索使用 LIKE 全表扫描")
+        _sqlite_fts_ready = False
+        return
+    _sqlite_fts_ready = True
+
+
+def create_search_index(connection: Connection) -> None:
+    """创建搜索索引 (在 create_all 之后通过 run_sync 调用，可重复执行)"""
+    if connection.dialect.name == "postgresql":
+        _create_postgresql_index(connection)
+    elif connection.dialect.name == "sqlite":
+        _create_sqlite_index(connection)
+
+
+def _use_fts(db: AsyncSession, value: Optional[str]) -> bool:
+    return (
+        db.bind.dialect.name == "sqlite"
+        and _sqlite_fts_ready
+        and value is not None
+        and len(value) >= MIN_INDEXED_LENGTH
+    )
+
+
+def _fts_ids(shadow: str, match: str):
+    """影子表中匹配的主键"""
+    return (
+        select(literal_column("rowid"))
+        .select_from(table(shadow))
+        .where(literal_column(shadow).op("MATCH")(match))
+    )
+
+
+class SearchService:
+    """管理后台搜索"""
+
+    @staticmethod
+    def user_filter(db: AsyncSession, query: str) -> ColumnElement[bool]:
+        """用户搜索条件 (手机号或昵称包含查询词)"""
+        if _use_fts(db, query):
+            return User.id.in_(_fts_ids("users_search", _fts_phrase(query)))
+        return or_(
+            User.phone.contains(query, autoescape=True),
+            User.nickname.icontains(query, autoescape=True),
+        )
+
+    @staticmethod
+    def device_filter(db: AsyncSession, query: str) -> ColumnElement[bool]:
+        """设备搜索条件 (规范化 MAC 或名称包含查询词)"""
+        mac = _mac_fragment(query)
+        if _use_fts(db, query) and (mac is None or len(mac) >= MIN_INDEXED_LENGTH):
+            match = f"name : {_fts_phrase(query)}"
+            if mac is not None:
+                match = f"mac : {_fts_phrase(mac)} OR {match}"
+            return Device.id.in_(_fts_ids("devices_search", match))
+
+        conditions = [Device.name.icontains(query, autoescape=True)]
+        if mac is not None:
+            conditions.append(_mac_column().contains(mac, autoescape=True))
+        return or_(*conditions)
+
+    @staticmethod
+    async def typeahead_users(db: AsyncSession, query: str, limit: int) -> list[User]:
+        """
+        用户联想 (按匹配程度排序: 完全匹配 > 前缀匹配 > 包含，同级昵称短的在前)
+        """
+        lowered = query.lower()
+        nickname = func.lower(User.nickname)
+        rank = case(
+            (or_(User.phone == query, nickname == lowered), 0),
+            (or_(
+                User.phone.startswith(query, autoescape=True),
+                nickname.startswith(lowered, autoescape=True),
+            ), 1),
+            else_=2,
+        )
+        order = (rank, func.length(User.nickname), User.id.desc())
+        candidates = (
+            select(User.id)
+            .where(SearchService.user_filter(db, query))
+            .order_by(*order)
+            .limit(TYPEAHEAD_CANDIDATES)
+        )
+        result = await db.execute(
+            select(User).where(User.id.in_(candidates)).order_by(*order).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def typeahead_devices(db: AsyncSession, query: str, limit: int) -> list[Device]:
+        """
+        设备联想 (按匹配程度排序: 完全匹配 > 前缀匹配 > 包含，同级新设备在前)
+        """
+        lowered = query.lower()
+        name = func.lower(Device.name)
+        exact = [name == lowered]
+        prefix = [name.startswith(lowered, autoescape=True)]
+        mac = _mac_fragment(query)
+        if mac is not None:
+            exact.append(_mac_column() == mac)
+            prefix.append(_mac_column().startswith(mac, autoescape=True))
+        rank = case((or_(*exact), 0), (or_(*prefix), 1), else_=2)
+
+        order = (rank, Device.id.desc())
+        candidates = (
+            select(Device.id)
+            .where(SearchService.device_filter(db, query))
+            .order_by(*order)
+            .limit(TYPEAHEAD_CANDIDATES)
+        )
+        result = await db.execute(
+            select(Device).where(Device.id.in_(candidates)).order_by(*order).limit(limit)
+        )
+        return list(result.scalars().all())
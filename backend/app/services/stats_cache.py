@@ -0,0 +1,188 @@
+"""
+姿态统计结果缓存
+
+按 (用户, 统计类型, 参数) 缓存统计结果及其 ETag，LRU 淘汰。
+每条缓存记录覆盖的时间区间 [start, end)，日志写入时记录本事务涉及的
+(用户, 整点)，事务提交后只失效区间内包含这些整点的缓存。
+
+缓存为进程内缓存，多进程部署时各进程独立失效 (写入只失效本进程的缓存)。
+"""
+from __future__ import annotations
+import hashlib
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# 会话 info 中待失效的 (用户 -> 整点集合)，提交后生效
+_DIRTY_KEY = "stats_cache_dirty"
+
+
+@dataclass
+class CachedStats:
+    """缓存的统计结果"""
+    value: BaseModel
+    etag: str
+    start: datetime
+    end: datetime
+
+
+def make_etag(value: BaseModel) -> str:
+    """由统计结果内容生成强 ETag"""
+    digest = hashlib.blake2b(value.model_dump_json().encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否匹配 (弱比较)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class StatsCache:
+    """姿态统计结果 LRU 缓存"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: OrderedDict[tuple, CachedStats] = OrderedDict()
+        self._user_keys: dict[int, set[tuple]] = {}
+        # 用户数据版本，计算期间有写入提交时不缓存计算结果
+        self._versions: dict[int, int] = {}
+
+        # 指标
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    def version(self, user_id: int) -> int:
+        """用户数据版本 (计算前读取，写回缓存时校验)"""
+        return self._versions.get(user_id, 0)
+
+    def get(self, user_id: int, key: tuple) -> Optional[CachedStats]:
+        entry = self._entries.get((user_id, *key))
+        if entry is None:
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end((user_id, *key))
+        self._hits += 1
+        return entry
+
+    def put(
+        self,
+        user_id: int,
+        key: tuple,
+        value: BaseModel,
+        start: datetime,
+        end: datetime,
+        version: int,
+    ) -> CachedStats:
+        """
+        写入缓存
+
+        version 为计算前读取的数据版本，期间数据已变化时只返回结果不缓存
+        """
+        entry = CachedStats(value=value, etag=make_etag(value), start=start, end=end)
+        if version != self.version(user_id):
+            return entry
+
+        full_key = (user_id, *key)
+        self._entries[full_key] = entry
+        self._entries.move_to_end(full_key)
+        self._user_keys.setdefault(user_id, set()).add(full_key)
+
+        while len(self._entries) > self.capacity:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._discard_user_key(evicted_key)
+            self._evictions += 1
+        return entry
+
+    def invalidate(self, user_id: int, hours: Iterable[datetime]) -> int:
+        """
+        失效区间内包含任一写入时间的缓存
+
+        Returns:
+            失效的缓存条数
+        """
+        self._versions[user_id] = self.version(user_id) + 1
+
+        keys = self._user_keys.get(user_id)
+        if not keys:
+            return 0
+
+        moments = sorted(hours)
+        stale = []
+        for full_key in keys:
+            entry = self._entries[full_key]
+            # 区间内是否存在写入时间: 第一个 >= start 的时间点 < end
+            index = bisect_left(moments, entry.start)
+            if index < len(moments) and moments[index] < entry.end:
+                stale.append(full_key)
+
+        for full_key in stale:
+            del self._entries[full_key]
+            keys.discard(full_key)
+        if not keys:
+            del self._user_keys[user_id]
+
+        self._invalidations += len(stale)
+        return len(stale)
+
+    def _discard_user_key(self, full_key: tuple) -> None:
+        keys = self._user_keys.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._user_keys[full_key[0]]
+
+    def mark_dirty(self, session: Session, logs: Iterable) -> None:
+        """记录本事务写入的 (用户, 整点)，提交后失效对应缓存"""
+        dirty: dict[int, set[datetime]] = session.info.setdefault(_DIRTY_KEY, {})
+        for log in logs:
+            dirty.setdefault(log.user_id, set()).add(
+                log.recorded_at.replace(minute=0, second=0, microsecond=0)
+            )
+
+    def metrics(self) -> dict:
+        """缓存指标"""
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self._hits,
+            "misses": self._misses,
+            "invalidations": self._invalidations,
+            "evictions": self._evictions,
+        }
+
+
+# 进程内单例
+stats_cache = StatsCache(settings.stats_cache_size)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # 提交后才失效，避免并发请求在提交前重新计算并缓存旧数据
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if dirty:
+        for user_id, hours in dirty.items():
+            stats_cache.invalidate(user_id, hours)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,245 @@
+"""
+姿态统计服务
+"""
+from __future__ import annotations
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.posture_rollup import PostureDailyRollup, PostureHourlyRollup
+from app.schemas.posture import PostureSeries, PostureStats, SeriesBucket, SeriesPoint, WeeklyStats
+
+
+def bucket_floor(moment: datetime, bucket: SeriesBucket) -> datetime:
+    """时间向下对齐到所在桶的起点"""
+    hour = moment.replace(minute=0, second=0, microsecond=0)
+    if bucket == SeriesBucket.HOUR:
+        return hour
+    day = hour.replace(hour=0)
+    if bucket == SeriesBucket.DAY:
+        return day
+    if bucket == SeriesBucket.WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket == SeriesBucket.MONTH:
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_bucket(start: datetime, bucket: SeriesBucket) -> datetime:
+    """下一个桶的起点"""
+    if bucket == SeriesBucket.HOUR:
+        return start + timedelta(hours=1)
+    if bucket == SeriesBucket.DAY:
+        return start + timedelta(days=1)
+    if bucket == SeriesBucket.WEEK:
+        return start + timedelta(days=7)
+    if bucket == SeriesBucket.MONTH:
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    return start.replace(year=start.year + 1)
+
+
+def bucket_range(start: datetime, end: datetime, bucket: SeriesBucket) -> tuple[datetime, datetime]:
+    """
+    区间 [start, end) 按桶大小向外对齐
+
+    Raises:
+        ValueError: 对齐后超出 datetime 可表示的范围 (如 9999 年的年桶)
+    """
+    try:
+        last = bucket_floor(end, bucket)
+        return bucket_floor(start, bucket), last if last == end else next_bucket(last, bucket)
+    except (OverflowError, ValueError):
+        raise ValueError("时间超出可统计的范围")
+
+
+class StatsService:
+    """姿态统计服务 (读取日 / 小时汇总表，工作量与天数或小时数成正比)"""
+
+    @staticmethod
+    async def _load_days(
+        db: AsyncSession,
+        user_id: int,
+        start_date: date,
+        end_date: date,
+    ) -> dict[date, list]:
+        """读取 [start_date, end_date] 的日汇总，按日期分组"""
+        result = await db.execute(
+            select(
+                PostureDailyRollup.day,
+                PostureDailyRollup.posture_type,
+                PostureDailyRollup.is_correct,
+                PostureDailyRollup.total_duration,
+            )
+            .where(PostureDailyRollup.user_id == user_id)
+            .where(PostureDailyRollup.day >= start_date)
+            .where(PostureDailyRollup.day <= end_date)
+        )
+
+        days: dict[date, list] = {}
+        for row in result:
+            days.setdefault(row.day, []).append(row)
+        return days
+
+    @staticmethod
+    def _build_day_stats(day: date, rows: list) -> PostureStats:
+        """由一天的汇总行构建统计"""
+        total_duration = sum(row.total_duration for row in rows)
+        correct_duration = sum(row.total_duration for row in rows if row.is_correct)
+        correct_rate = correct_duration / total_duration if total_duration > 0 else 0
+
+        posture_breakdown: dict[str, int] = {}
+        for row in rows:
+            posture_breakdown[row.posture_type] = posture_breakdown.get(row.posture_type, 0) + row.total_duration
+
+        return PostureStats(
+            date=day,
+            total_duration=total_duration,
+            correct_duration=correct_duration,
+            incorrect_duration=total_duration - correct_duration,
+            correct_rate=round(correct_rate, 4),
+            posture_breakdown=posture_breakdown,
+        )
+
+    @staticmethod
+    async def get_daily_stats(db: AsyncSession, user_id: int, target_date: date) -> PostureStats:
+        """单日统计"""
+        days = await StatsService._load_days(db, user_id, target_date, target_date)
+        return StatsService._build_day_stats(target_date, days.get(target_date, []))
+
+    @staticmethod
+    async def get_weekly_stats(db: AsyncSession, user_id: int, start_date: date) -> WeeklyStats:
+        """周统计 (start_date 起 7 天)"""
+        end_date = start_date + timedelta(days=6)
+        days = await StatsService._load_days(db, user_id, start_date, end_date)
+
+        daily_stats = []
+        total_correct = 0
+        total_incorrect = 0
+
+        for i in range(7):
+            current_date = start_date + timedelta(days=i)
+            day_stats = StatsService._build_day_stats(current_date, days.get(current_date, []))
+            daily_stats.append(day_stats)
+            total_correct += day_stats.correct_duration
+            total_incorrect += day_stats.incorrect_duration
+
+        total_all = total_correct + total_incorrect
+        avg_rate = total_correct / total_all if total_all > 0 else 0
+
+        return WeeklyStats(
+            start_date=start_date,
+            end_date=end_date,
+            daily_stats=daily_stats,
+            total_correct_duration=total_correct,
+            total_incorrect_duration=total_incorrect,
+            average_correct_rate=round(avg_rate, 4),
+        )
+
+    @staticmethod
+    async def _load_hours(
+        db: AsyncSession,
+        user_id: int,
+        start: datetime,
+        end: datetime,
+    ):
+        """读取 [start, end) 的小时汇总 (每小时最多两行)"""
+        return await db.execute(
+            select(
+                PostureHourlyRollup.hour.label("moment"),
+                PostureHourlyRollup.is_correct,
+                PostureHourlyRollup.total_duration,
+            )
+            .where(PostureHourlyRollup.user_id == user_id)
+            .where(PostureHourlyRollup.hour >= start)
+            .where(PostureHourlyRollup.hour < end)
+        )
+
+    @staticmethod
+    async def _load_day_totals(
+        db: AsyncSession,
+        user_id: int,
+        start: datetime,
+        end: datetime,
+    ):
+        """读取 [start, end) 的日汇总，按 (日期, 是否正确) 合并姿态类型 (每天最多两行)"""
+        total = func.sum(PostureDailyRollup.total_duration)
+        return await db.execute(
+            select(
+                PostureDailyRollup.day.label("moment"),
+                PostureDailyRollup.is_correct,
+                total.label("total_duration"),
+            )
+            .where(PostureDailyRollup.user_id == user_id)
+            .where(PostureDailyRollup.day >= start.date())
+            .where(PostureDailyRollup.day < end.date())
+            .group_by(PostureDailyRollup.day, PostureDailyRollup.is_correct)
+        )
+
+    @staticmethod
+    async def get_series(
+        db: AsyncSession,
+        user_id: int,
+        start: datetime,
+        end: datetime,
+        bucket: SeriesBucket,
+        max_points: int,
+    ) -> PostureSeries:
+        """
+        时间序列统计 (区间按桶大小向外对齐)
+
+        小时桶读取小时汇总，其余桶读取日汇总后在内存中合并，
+        工作量与桶数 (及区间天数) 成正比，与原始日志条数无关。
+
+        Raises:
+            ValueError: 区间为空或桶数超过 max_points
+        """
+        if end <= start:
+            raise ValueError("结束时间必须晚于开始时间")
+
+        range_start, range_end = bucket_range(start, end, bucket)
+        buckets: dict[datetime, list[int]] = {}
+        cursor = range_start
+        while cursor < range_end:
+            if len(buckets) >= max_points:
+                raise ValueError(f"单次最多返回 {max_points} 个桶，请缩小范围或增大桶大小")
+            buckets[cursor] = [0, 0]
+            cursor = next_bucket(cursor, bucket)
+
+        if bucket == SeriesBucket.HOUR:
+            rows = await StatsService._load_hours(db, user_id, range_start, range_end)
+        else:
+            rows = await StatsService._load_day_totals(db, user_id, range_start, range_end)
+
+        for row in rows:
+            moment = row.moment
+            if not isinstance(moment, datetime):
+                moment = datetime.combine(moment, time.min)
+            totals = buckets[bucket_floor(moment, bucket)]
+            totals[0 if row.is_correct else 1] += int(row.total_duration)
+
+        points = []
+        for point_start, (correct, incorrect) in buckets.items():
+            total = correct + incorrect
+            points.append(SeriesPoint(
+                start=point_start,
+                correct_duration=correct,
+                incorrect_duration=incorrect,
+                correct_rate=round(correct / total, 4) if total > 0 else 0,
+            ))
+
+        total_correct = sum(point.correct_duration for point in points)
+        total_incorrect = sum(point.incorrect_duration for point in points)
+        total_all = total_correct + total_incorrect
+
+        return PostureSeries(
+            start=range_start,
+            end=range_end,
+            bucket=bucket,
+            points=points,
+            total_correct_duration=total_correct,
+            total_incorrect_duration=total_incorrect,
+            average_correct_rate=round(total_correct / total_all, 4) if total_all > 0 else 0,
+        )
@@ -0,0 +1,134 @@
+"""
+管理后台概览统计
+
+全部由聚合查询得出 (用户一次、设备按类型一次、当日日志从日汇总表一次)，
+结果在进程内缓存 ADMIN_SUMMARY_TTL 秒；缓存过期时并发请求只触发一次计算，
+其余请求等待同一结果。
+"""
+from __future__ import annotations
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.device import Device, DeviceType
+from app.models.posture_rollup import PostureDailyRollup
+from app.models.user import User
+from app.schemas.admin import AdminSummary
+
+settings = get_settings()
+
+
+def _count_if(condition):
+    """满足条件的行数 (可与其他聚合放在同一条查询中)"""
+    return func.count().filter(condition)
+
+
+class SummaryService:
+    """后台概览统计"""
+
+    @staticmethod
+    async def compute(db: AsyncSession, now: Optional[datetime] = None) -> AdminSummary:
+        """计算概览 (不经过缓存)"""
+        now = now or datetime.utcnow()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        users = (await db.execute(
+            select(
+                func.count(),
+                _count_if(User.is_active.is_(True)),
+                _count_if(User.is_admin.is_(True)),
+                _count_if(User.created_at >= today_start),
+            )
+        )).one()
+
+        devices_by_type = {device_type.value: 0 for device_type in DeviceType}
+        online = paired = bound = 0
+        device_rows = await db.execute(
+            select(
+                Device.device_type,
+                func.count(),
+                _count_if(Device.is_online.is_(True)),
+                _count_if(Device.paired_device_id.is_not(None)),
+                _count_if(Device.user_id.is_not(None)),
+            ).group_by(Device.device_type)
+        )
+        for device_type, count, type_online, type_paired, type_bound in device_rows:
+            devices_by_type[device_type.value] = count
+            online += type_online
+            paired += type_paired
+            bound += type_bound
+
+        logs_today, duration_today, reporting_users = (await db.execute(
+            select(
+                func.coalesce(func.sum(PostureDailyRollup.record_count), 0),
+                func.coalesce(func.sum(PostureDailyRollup.total_duration), 0),
+                func.count(func.distinct(PostureDailyRollup.user_id)),
+            ).where(PostureDailyRollup.day == today_start.date())
+        )).one()
+
+        return AdminSummary(
+            users_total=users[0],
+            users_active=users[1],
+            users_admin=users[2],
+            users_new_today=users[3],
+            users_reporting_today=reporting_users,
+            devices_total=sum(devices_by_type.values()),
+            devices_by_type=devices_by_type,
+            devices_online=online,
+            devices_paired=paired,
+            devices_bound=bound,
+            logs_today=logs_today,
+            duration_today=duration_today,
+            generated_at=now,
+        )
+
+
+class SummaryCache:
+    """概览结果缓存 (TTL，过期时只有一个请求重新计算)"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: Optional[AdminSummary] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+        # 指标
+        self._hits = 0
+        self._computations = 0
+        self._last_compute_ms = 0.0
+
+    async def get(self, compute: Callable[[], Awaitable[AdminSummary]]) -> AdminSummary:
+        if self._value is not None and time.monotonic() < self._expires_at:
+            self._hits += 1
+            return self._value
+
+        async with self._lock:
+            # 等锁期间其他请求可能已经算好
+            if self._value is not None and time.monotonic() < self._expires_at:
+                self._hits += 1
+                return self._value
+
+            started = time.perf_counter()
+            value = await compute()
+            self._last_compute_ms = (time.perf_counter() - started) * 1000
+            self._computations += 1
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl
+            return value
+
+    def metrics(self) -> dict:
+        return {
+            "hits": self._hits,
+            "computations": self._computations,
+            "last_compute_ms": round(self._last_compute_ms, 2),
+            "ttl_seconds": self.ttl,
+        }
+
+
+# 进程内单例
+summary_cache = SummaryCache(settings.admin_summary_ttl)
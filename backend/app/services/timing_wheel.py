@@ -0,0 +1,64 @@
+"""
+哈希时间轮
+
+按到期时间把键放进环形槽位 (每槽一个 tick)，推进时只访问经过的槽位，
+槽位跨度覆盖最长租约时每次推进的开销与到期条目数成正比；续约为 O(1) 的移槽。
+"""
+from __future__ import annotations
+import math
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TimingWheel(Generic[K, V]):
+    """哈希时间轮 (单线程使用，时间为 time.monotonic 秒)"""
+
+    def __init__(self, tick: float, span: float, now: float):
+        self.tick = tick
+        # 多留一个槽位，保证跨度内的到期时间不会与当前槽位重叠
+        self._slots: list[dict[K, tuple[float, V]]] = [{} for _ in range(int(math.ceil(span / tick)) + 2)]
+        self._slot_of: dict[K, int] = {}
+        # 下一个待处理的 tick
+        self._cursor = int(now // tick)
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._slot_of
+
+    def schedule(self, key: K, deadline: float, value: V) -> None:
+        """在 deadline 到期 (已存在时改为新的到期时间)"""
+        self.cancel(key)
+        index = max(int(math.ceil(deadline / self.tick)), self._cursor) % len(self._slots)
+        self._slots[index][key] = (deadline, value)
+        self._slot_of[key] = index
+
+    def cancel(self, key: K) -> bool:
+        index = self._slot_of.pop(key, None)
+        if index is None:
+            return False
+        del self._slots[index][key]
+        return True
+
+    def advance(self, now: float) -> list[tuple[K, V]]:
+        """
+        推进到 now，返回期间到期的 (键, 值)
+
+        超出跨度的条目 (到期时间晚于本圈) 留在原槽位等下一圈
+        """
+        target = int(now // self.tick)
+        steps = min(target - self._cursor + 1, len(self._slots))
+        expired: list[tuple[K, V]] = []
+        for offset in range(max(steps, 0)):
+            bucket = self._slots[(self._cursor + offset) % len(self._slots)]
+            if not bucket:
+                continue
+            due = [key for key, (deadline, _) in bucket.items() if deadline <= now]
+            for key in due:
+                expired.append((key, bucket.pop(key)[1]))
+                del self._slot_of[key]
+        self._cursor = max(self._cursor, target + 1)
+        return expired
@@ -3,16 +3,18 @@
 """
 from __future__ import annotations
 from datetime import datetime
-from typing import Optional, Tuple, List
+from typing import Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.models.user import User
 from app.models.device import Device
 from app.schemas.user import UserCreate, UserUpdate
 from app.services.auth import AuthService
+from app.services.pagination import Page, count_cache, paginate
+from app.services.principal_cache import principal_cache
+from app.services.search_service import SearchService
 
 
 class UserService:
@@ -23,13 +25,14 @@ class UserService:
         """创建用户"""
         user = User(
             phone=data.phone,
-            password_hash=AuthService.hash_password(data.password),
+            password_hash=await AuthService.hash_password(data.password),
             nickname=data.nickname,
             is_admin=data.is_admin,
         )
         db.add(user)
         await db.flush()
         await db.refresh(user)
+        count_cache.invalidate(User.__tablename__)
         return user
     
     @staticmethod
@@ -44,37 +47,38 @@ class UserService:
     async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
         """根据 ID 获取用户"""
         result = await db.execute(
-            select(User).where(User.id == user_id).options(selectinload(User.devices))
+            select(User).where(User.id == user_id)
         )
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_users_by_ids(db: AsyncSession, user_ids: list[int]) -> dict[int, User]:
+        """根据 ID 批量获取用户"""
+        result = await db.execute(
+            select(User).where(User.id.in_(user_ids))
+        )
+        return {user.id: user for user in result.scalars()}
+    
     @staticmethod
     async def list_users(
         db: AsyncSession, 
         page: int = 1, 
         page_size: int = 20,
-        search: Optional[str] = None
-    ) -> Tuple[List[User], int]:
-        """获取用户列表 (分页)"""
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[User]:
+        """
+        获取用户列表 (按注册时间倒序，支持游标分页)
+        
+        Raises:
+            ValueError: 游标格式不正确
+        """
         query = select(User)
         
         if search:
-            query = query.where(
-                User.phone.contains(search) | User.nickname.contains(search)
-            )
-        
-        # 统计总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await db.execute(count_query)).scalar() or 0
-        
-        # 分页查询
-        query = query.offset((page - 1) * page_size).limit(page_size)
-        query = query.order_by(User.created_at.desc())
+            query = query.where(SearchService.user_filter(db, search))
         
-        result = await db.execute(query)
-        users = list(result.scalars().all())
-        
-        return users, total
+        return await paginate(db, query, User, page, page_size, cursor)
     
     @staticmethod
     async def update_user(db: AsyncSession, user: User, data: UserUpdate) -> User:
@@ -83,6 +87,9 @@ class UserService:
         for key, value in update_data.items():
             setattr(user, key, value)
         
+        if "is_active" in update_data:
+            # 禁用 / 启用立即对已缓存的令牌生效
+            principal_cache.mark_dirty(db.sync_session, user.id)
         await db.flush()
         await db.refresh(user)
         return user
@@ -91,6 +98,8 @@ class UserService:
     async def delete_user(db: AsyncSession, user: User) -> None:
         """删除用户"""
         await db.delete(user)
+        count_cache.invalidate(User.__tablename__)
+        principal_cache.mark_dirty(db.sync_session, user.id)
     
     @staticmethod
     async def update_last_login(db: AsyncSession, user: User) -> None:
@@ -105,3 +114,28 @@ class UserService:
             select(func.count()).where(Device.user_id == user_id)
         )
         return result.scalar() or 0
+    
+    @staticmethod
+    async def recount_devices(db: AsyncSession, user_id: Optional[int] = None) -> int:
+        """
+        按设备表重算 device_count (修复冗余计数)
+        
+        Returns:
+            计数被修正的用户数
+        """
+        actual = (
+            select(func.count())
+            .where(Device.user_id == User.id)
+            .correlate(User)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(User)
+            .where(User.device_count != actual)
+            .values(device_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        if user_id is not None:
+            stmt = stmt.where(User.id == user_id)
+        result = await db.execute(stmt)
+        return result.rowcount
@@ -0,0 +1,80 @@
+"""
+认证开销基准测试
+
+在临时 SQLite 库中反复用同一令牌调用鉴权依赖 get_current_user，
+对比不使用缓存 (每次解码令牌 + 按主键查询) 与使用认证主体缓存时
+每次请求的鉴权耗时和 SQL 条数。
+
+用法:
+    python scripts/bench_auth.py [--requests 20000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/bench_auth.db"
+os.environ["DEBUG"] = "false"
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api.deps import get_current_user
+from app.database import async_session, init_db
+from app.models import User
+from app.services.auth import AuthService
+from app.services.principal_cache import principal_cache
+from scripts.check_auth_queries import QueryCounter
+
+
+async def run(credentials: HTTPAuthorizationCredentials, requests: int, cached: bool) -> tuple[float, int]:
+    """
+    Returns:
+        (每次鉴权平均微秒数, 执行的 SQL 条数)
+    """
+    principal_cache.clear()
+    with QueryCounter() as counter:
+        started = time.perf_counter()
+        for _ in range(requests):
+            if not cached:
+                principal_cache.clear()
+            # 与请求处理相同: 每个请求一个会话
+            async with async_session() as db:
+                await get_current_user(credentials, db)
+        elapsed = time.perf_counter() - started
+    return elapsed / requests * 1e6, len(counter.statements)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="认证开销基准测试")
+    parser.add_argument("--requests", type=int, default=20000, help="模拟请求数")
+    args = parser.parse_args()
+
+    await init_db()
+    async with async_session() as db:
+        user = User(phone="13900000009", password_hash="x", nickname="bench")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    token, _ = AuthService.create_access_token(user_id)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    print(f"{'mode':<10} | {'us/request':>10} | {'SQL':>8}")
+    baseline, baseline_sql = await run(credentials, args.requests, cached=False)
+    print(f"{'no cache':<10} | {baseline:10.1f} | {baseline_sql:8d}")
+    hits_before = principal_cache.metrics()["hits"]
+    cached, cached_sql = await run(credentials, args.requests, cached=True)
+    hit_rate = (principal_cache.metrics()["hits"] - hits_before) / args.requests
+    print(f"{'cached':<10} | {cached:10.1f} | {cached_sql:8d}")
+    print(f"加速 {baseline / cached:.1f}x，缓存命中率 {hit_rate:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,114 @@
+"""
+设备绑定 / 注册并发基准测试
+
+在临时 SQLite 库中创建一批用户 (手机)，通过 API 并发执行:
+- 争抢: 全部手机同时绑定同一个 MAC，检查只有一台成功、device_count 只加一次
+- 注册: 同时注册同一个 MAC，检查只有一次成功
+- 吞吐: 每台手机并发绑定各自的新 MAC，统计每次绑定的 SQL 条数和吞吐量
+
+用法:
+    python scripts/bench_device_bind.py [--phones 50] [--devices 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/bench_device_bind.db"
+os.environ["DEBUG"] = "false"
+
+import httpx
+from sqlalchemy import func, select
+
+from app.database import async_session
+from app.main import app
+from app.models import Device, User
+from app.services.auth import AuthService
+from scripts.check_auth_queries import QueryCounter
+
+
+def mac_of(index: int) -> str:
+    raw = f"{index:012X}"
+    return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+
+async def create_phones(count: int) -> list[dict]:
+    async with async_session() as db:
+        users = [User(phone=f"139{i:08d}", password_hash="x", nickname=f"bench-{i}") for i in range(count)]
+        db.add_all(users)
+        await db.commit()
+        user_ids = [user.id for user in users]
+    return [{"Authorization": f"Bearer {AuthService.create_access_token(user_id)[0]}"} for user_id in user_ids]
+
+
+async def device_counts() -> tuple[int, int]:
+    """(用户 device_count 之和, 已绑定设备数)"""
+    async with async_session() as db:
+        counted = await db.scalar(select(func.coalesce(func.sum(User.device_count), 0)))
+        bound = await db.scalar(select(func.count()).select_from(Device).where(Device.user_id.is_not(None)))
+    return counted, bound
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="设备绑定 / 注册并发基准测试")
+    parser.add_argument("--phones", type=int, default=50, help="并发的手机 (用户) 数")
+    parser.add_argument("--devices", type=int, default=20, help="吞吐测试中每台手机绑定的设备数")
+    args = parser.parse_args()
+    ok = True
+
+    async with app.router.lifespan_context(app):
+        phones = await create_phones(args.phones)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # 争抢同一个 MAC
+            body = {"mac_address": mac_of(0xFFFF00000000), "device_type": "detector"}
+            responses = await asyncio.gather(*(
+                client.post("/api/v1/users/me/devices", json=body, headers=headers) for headers in phones
+            ))
+            statuses = [response.status_code for response in responses]
+            counted, bound = await device_counts()
+            print(f"争抢绑定: {args.phones} 台手机，成功 {statuses.count(200)}，拒绝 {statuses.count(400)}，"
+                  f"device_count 合计 {counted} / 已绑定 {bound}")
+            ok &= statuses.count(200) == 1 and statuses.count(400) == args.phones - 1 and counted == bound == 1
+
+            # 同时注册同一个 MAC
+            body = {"mac_address": mac_of(0xFFFF00000001), "device_type": "feedbacker"}
+            responses = await asyncio.gather(*(client.post("/api/v1/devices/", json=body) for _ in phones))
+            statuses = [response.status_code for response in responses]
+            print(f"争抢注册: {args.phones} 次，成功 {statuses.count(200)}，拒绝 {statuses.count(400)}")
+            ok &= statuses.count(200) == 1 and statuses.count(400) == args.phones - 1
+
+            # 各自绑定新 MAC
+            async def bind_all(phone: int, headers: dict) -> list[int]:
+                codes = []
+                for i in range(args.devices):
+                    body = {"mac_address": mac_of(phone * args.devices + i), "device_type": "detector"}
+                    response = await client.post("/api/v1/users/me/devices", json=body, headers=headers)
+                    codes.append(response.status_code)
+                return codes
+
+            total = args.phones * args.devices
+            with QueryCounter() as counter:
+                started = time.perf_counter()
+                results = await asyncio.gather(*(bind_all(i, headers) for i, headers in enumerate(phones)))
+                elapsed = time.perf_counter() - started
+            succeeded = sum(codes.count(200) for codes in results)
+            writes = [s for s in counter.statements if not s.startswith("SELECT")]
+            counted, bound = await device_counts()
+            print(f"并发绑定: {succeeded} / {total} 成功，{total / elapsed:.0f} 次/s，"
+                  f"每次 {len(counter.statements) / total:.2f} 条 SQL (写 {len(writes) / total:.2f} 条)，"
+                  f"device_count 合计 {counted} / 已绑定 {bound}")
+            ok &= succeeded == total and counted == bound
+
+    print("检查通过" if ok else "检查失败")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,128 @@
+"""
+MAC 解析缓存基准测试
+
+在临时 SQLite 库中写入大量设备，测量:
+- 启动时流式加载的耗时和缓存占用内存 (与以 MAC 字符串为键的 dict 对比)
+- 按 MAC 查找的耗时 (缓存二分查找 / dict / 数据库 mac_address 索引查询)
+- 批量写入新设备的耗时 (逐条 put 与排序归并的 put_many 对比)
+
+用法:
+    python scripts/bench_device_directory.py [--devices 1000000] [--queries 2000] [--inserts 50000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/bench_device_directory.db"
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy import insert, select
+
+from app.database import async_session, engine
+from app.models.base import Base
+from app.models.device import Device, DeviceType
+from app.services.device_directory import DeviceDirectory, DeviceEntry
+
+
+def mac_of(index: int) -> str:
+    # 打散顺序，避免与自增 ID 同序
+    raw = f"{(index * 2654435761) % (1 << 48):012X}"
+    return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+
+async def seed(count: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    now = datetime.utcnow()
+    async with async_session() as db:
+        for start in range(0, count, 20000):
+            await db.execute(insert(Device), [
+                {
+                    "mac_address": mac_of(i),
+                    "device_type": DeviceType.DETECTOR if i % 2 else DeviceType.FEEDBACKER,
+                    "name": "",
+                    "firmware_version": "1.0.0",
+                    "is_online": False,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(start, min(start + 20000, count))
+            ])
+        await db.commit()
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="MAC 解析缓存基准测试")
+    parser.add_argument("--devices", type=int, default=1000000, help="设备数")
+    parser.add_argument("--queries", type=int, default=2000, help="数据库查询次数")
+    parser.add_argument("--inserts", type=int, default=50000, help="批量写入的新设备数")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    await seed(args.devices)
+    print(f"写入 {args.devices} 台设备: {time.perf_counter() - started:.1f} s")
+
+    directory = DeviceDirectory()
+    async with async_session() as db:
+        loaded = await directory.warm(db)
+    print(f"流式加载: {loaded} 台 {directory.metrics()['last_warm_ms']:.0f} ms")
+
+    # 再加载一次测量内存 (tracemalloc 会拖慢加载，不计时)
+    tracemalloc.start()
+    async with async_session() as db:
+        await directory.warm(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"缓存占用: {directory.memory_bytes() / 2**20:.1f} MB (加载峰值 {peak / 2**20:.1f} MB)")
+
+    tracemalloc.start()
+    async with async_session() as db:
+        rows = await db.execute(
+            select(Device.mac_address, Device.id, Device.device_type, Device.user_id, Device.paired_device_id)
+        )
+        by_mac = {row.mac_address: tuple(row[1:]) for row in rows}
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"对比 dict[str, tuple]: 占用 {current / 2**20:.1f} MB")
+
+    samples = [mac_of(random.randrange(args.devices)) for _ in range(100000)]
+    for label, lookup in (("缓存", directory.lookup), ("dict", by_mac.get)):
+        started = time.perf_counter()
+        for mac_address in samples:
+            lookup(mac_address)
+        print(f"{label}查找: {(time.perf_counter() - started) * 1e6 / len(samples):.2f} µs/次")
+
+    async with async_session() as db:
+        started = time.perf_counter()
+        for mac_address in samples[:args.queries]:
+            (await db.execute(select(Device).where(Device.mac_address == mac_address))).scalar_one_or_none()
+        print(f"数据库按 MAC 查询: {(time.perf_counter() - started) * 1e6 / args.queries:.0f} µs/次")
+
+    entry = DeviceEntry(0, DeviceType.DETECTOR, None, None)
+    added = [(mac_of(args.devices + i), entry) for i in range(args.inserts)]
+    singles = added[:1000]
+    started = time.perf_counter()
+    for mac_address, item in singles:
+        directory.put(mac_address, item)
+    print(f"逐条 put: {(time.perf_counter() - started) * 1e6 / len(singles):.0f} µs/台")
+    started = time.perf_counter()
+    directory.put_many(added[len(singles):])
+    elapsed = time.perf_counter() - started
+    print(f"put_many {len(added) - len(singles)} 台: {elapsed * 1000:.0f} ms "
+          f"({elapsed * 1e6 / max(len(added) - len(singles), 1):.1f} µs/台)")
+    await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,98 @@
+"""
+批量心跳基准测试
+
+在临时 SQLite 库中注册大量设备，分别测量:
+- 逐台调用 /devices/mac/{mac}/online 的耗时
+- 一次 /devices/heartbeats 上报全部设备的耗时 (首次需按 MAC 查询，之后命中快照缓存)
+- 后台任务把全部状态批量写入数据库的耗时
+
+用法:
+    python scripts/bench_heartbeats.py [--devices 10000] [--single 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/bench_heartbeats.db"
+os.environ["DEBUG"] = "false"
+
+import httpx
+from sqlalchemy import insert
+
+from app.database import async_session
+from app.main import app
+from app.models.device import Device, DeviceType
+from app.services.presence import presence_registry
+
+
+def mac_of(index: int) -> str:
+    raw = f"{index:012X}"
+    return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+
+async def seed(count: int) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {
+            "mac_address": mac_of(i),
+            "device_type": DeviceType.DETECTOR if i % 2 else DeviceType.FEEDBACKER,
+            "name": "",
+            "firmware_version": "1.0.0",
+            "is_online": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+    async with async_session() as db:
+        for start in range(0, count, 5000):
+            await db.execute(insert(Device), rows[start:start + 5000])
+        await db.commit()
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="批量心跳基准测试")
+    parser.add_argument("--devices", type=int, default=10000, help="设备数")
+    parser.add_argument("--single", type=int, default=500, help="逐台上报的设备数")
+    args = parser.parse_args()
+
+    async with app.router.lifespan_context(app):
+        await seed(args.devices)
+        # 手动写入，避免后台任务在测量期间落库
+        await presence_registry.stop()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            for i in range(args.single):
+                await client.post(f"/api/v1/devices/mac/{mac_of(i)}/online", params={"is_online": "true"})
+            single_ms = (time.perf_counter() - started) * 1000 / args.single
+            print(f"逐台上报: {single_ms:.2f} ms/台 (约 {single_ms * args.devices / 1000:.1f} s 上报 {args.devices} 台)")
+
+            body = {"heartbeats": [[mac_of(i), True, None] for i in range(args.devices)]}
+            for label in ("批量 (冷)", "批量 (热)"):
+                if label == "批量 (冷)":
+                    presence_registry._snapshots.clear()
+                started = time.perf_counter()
+                response = await client.post("/api/v1/devices/heartbeats", json=body)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                accepted = response.json()["data"]["accepted"]
+                print(f"{label}: {args.devices} 台 {elapsed_ms:.0f} ms，生效 {accepted}")
+
+        async with async_session() as db:
+            started = time.perf_counter()
+            flushed = await presence_registry.flush(db)
+            print(f"批量落库: {flushed} 台 {(time.perf_counter() - started) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
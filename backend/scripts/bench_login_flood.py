@@ -0,0 +1,112 @@
+"""
+登录洪峰基准测试
+
+在临时 SQLite 库中并发发起大量登录请求，同时每隔几毫秒请求一次与密码无关的
+/health，统计洪峰期间 /health 的延迟分布。分别在 bcrypt 直接在事件循环中计算
+(旧实现) 和在哈希线程池中计算两种模式下运行。
+
+用法:
+    python scripts/bench_login_flood.py [--logins 40] [--interval 0.01]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/bench_login.db"
+os.environ["DEBUG"] = "false"
+
+import httpx
+
+from app.config import get_settings
+from app.database import async_session
+from app.main import app
+from app.schemas.user import UserCreate
+from app.services.password_hasher import password_hasher
+from app.services.user_service import UserService
+
+settings = get_settings()
+
+PHONE = "13900000009"
+PASSWORD = "bench-password"
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def flood(client: httpx.AsyncClient, logins: int, interval: float) -> dict:
+    """并发登录期间持续探测 /health"""
+    probes: list[float] = []
+    finished = asyncio.Event()
+
+    async def probe():
+        while not finished.is_set():
+            started = time.perf_counter()
+            await client.get("/health")
+            probes.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(interval)
+
+    async def login() -> int:
+        response = await client.post("/api/v1/auth/login", json={"phone": PHONE, "password": PASSWORD})
+        return response.status_code
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(interval * 5)
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    finished.set()
+    await probe_task
+
+    return {
+        "elapsed": elapsed,
+        "ok": statuses.count(200),
+        "rejected": statuses.count(429),
+        "p50": statistics.median(probes),
+        "p99": percentile(probes, 0.99),
+        "max": max(probes),
+        "probes": len(probes),
+    }
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="登录洪峰基准测试")
+    parser.add_argument("--logins", type=int, default=40, help="并发登录请求数")
+    parser.add_argument("--interval", type=float, default=0.01, help="/health 探测间隔(秒)")
+    args = parser.parse_args()
+
+    async with app.router.lifespan_context(app):
+        async with async_session() as db:
+            await UserService.create_user(db, UserCreate(phone=PHONE, password=PASSWORD))
+            await db.commit()
+
+        print(f"bcrypt cost {password_hasher.rounds}，{args.logins} 个并发登录")
+        print(f"{'mode':<8} | {'ok':>4} | {'429':>4} | {'logins s':>8} | "
+              f"{'health p50':>10} | {'p99':>8} | {'max':>8} | probes")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for mode in ("inline", "pool"):
+                await password_hasher.stop()
+                password_hasher.workers = 0 if mode == "inline" else settings.password_hash_workers
+                await password_hasher.start()
+
+                result = await flood(client, args.logins, args.interval)
+                print(
+                    f"{mode:<8} | {result['ok']:>4} | {result['rejected']:>4} | {result['elapsed']:8.2f} | "
+                    f"{result['p50']:8.1f}ms | {result['p99']:6.1f}ms | {result['max']:6.1f}ms | {result['probes']}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,128 @@
+"""
+姿态日志入库基准测试
+
+对比逐条 ORM 写入与批量写入 (多行 INSERT / PostgreSQL COPY) 的吞吐量。
+
+用法:
+    python scripts/bench_posture_ingest.py
+    python scripts/bench_posture_ingest.py --postgres-url postgresql+asyncpg://user:pw@localhost/modelpos_bench
+
+注意: 会清空目标库中的表，请使用专门的测试库。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.models import Base, User, Device, DeviceType, PostureLog
+from app.services.posture_service import PostureService
+
+DEFAULT_SIZES = [100, 10_000, 100_000]
+
+
+def make_rows(user_id: int, device_id: int, count: int) -> list[dict]:
+    """生成测试日志行"""
+    start = datetime(2026, 1, 1)
+    now = datetime.utcnow()
+    return [
+        {
+            "device_id": device_id,
+            "user_id": user_id,
+            "posture_type": "correct" if i % 3 else "slouch",
+            "duration": 30 + i % 60,
+            "is_correct": bool(i % 3),
+            "recorded_at": start + timedelta(seconds=30 * i),
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+async def reset_schema(engine) -> tuple[int, int]:
+    """重建表并写入一个用户和设备"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        user = User(phone="13800000000", password_hash="x", nickname="bench")
+        device = Device(mac_address="AA:BB:CC:00:00:01", device_type=DeviceType.DETECTOR)
+        db.add_all([user, device])
+        await db.commit()
+        return user.id, device.id
+
+
+async def run_orm(session_factory, rows: list[dict]) -> float:
+    """逐条 ORM 写入 (旧实现)"""
+    async with session_factory() as db:
+        started = time.perf_counter()
+        for row in rows:
+            db.add(PostureLog(**row))
+        await db.flush()
+        await db.commit()
+        return time.perf_counter() - started
+
+
+async def run_bulk(session_factory, rows: list[dict]) -> float:
+    """批量写入"""
+    async with session_factory() as db:
+        started = time.perf_counter()
+        await PostureService.bulk_insert_logs(db, rows)
+        await db.commit()
+        return time.perf_counter() - started
+
+
+async def bench(url: str, sizes: list[int], skip_orm: bool) -> None:
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    print(f"\n== {engine.dialect.name} ==")
+    print(f"{'rows':>8} | {'orm rows/s':>12} | {'bulk rows/s':>12} | speedup")
+
+    for size in sizes:
+        orm_rate = None
+        if not skip_orm:
+            user_id, device_id = await reset_schema(engine)
+            elapsed = await run_orm(session_factory, make_rows(user_id, device_id, size))
+            orm_rate = size / elapsed
+
+        user_id, device_id = await reset_schema(engine)
+        elapsed = await run_bulk(session_factory, make_rows(user_id, device_id, size))
+        bulk_rate = size / elapsed
+
+        orm_text = f"{orm_rate:12.0f}" if orm_rate else f"{'-':>12}"
+        speedup = f"{bulk_rate / orm_rate:.1f}x" if orm_rate else "-"
+        print(f"{size:>8} | {orm_text} | {bulk_rate:12.0f} | {speedup}")
+
+    await engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="姿态日志入库基准测试")
+    parser.add_argument("--sqlite-url", help="SQLite 连接串，默认使用临时文件")
+    parser.add_argument("--postgres-url", help="PostgreSQL 连接串 (postgresql+asyncpg://...)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--skip-orm", action="store_true", help="跳过逐条 ORM 写入对照组")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_url = args.sqlite_url or f"sqlite+aiosqlite:///{tmp}/bench.db"
+        await bench(sqlite_url, args.sizes, args.skip_orm)
+
+    if args.postgres_url:
+        await bench(args.postgres_url, args.sizes, args.skip_orm)
+    else:
+        print("\n未指定 --postgres-url，跳过 PostgreSQL")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+管理后台搜索基准测试
+
+生成大量用户和设备，对比普通 LIKE '%x%' 全表扫描与搜索索引
+(SQLite FTS5 trigram / PostgreSQL pg_trgm) 的匹配计数耗时，以及联想接口的响应时间。
+
+用法:
+    python scripts/bench_search.py [--rows 1000000]
+    python scripts/bench_search.py --postgres-url postgresql+asyncpg://user:pw@localhost/modelpos_bench
+
+注意: 会清空目标库中的表，请使用专门的测试库。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.models import Base, User, Device, DeviceType
+from app.services.search_service import SearchService, create_search_index
+
+CHUNK_SIZE = 5000
+QUERIES = ["1380012", "a1:b2:0", "A1B20F", "设备12", "用户99"]
+REPEAT = 5
+
+
+def make_mac(i: int) -> str:
+    value = (0xA1B200000000 + i * 7919) & 0xFFFFFFFFFFFF
+    return ":".join(f"{value >> shift & 0xFF:02X}" for shift in range(40, -8, -8))
+
+
+async def reset_schema(engine, rows: int) -> None:
+    """重建表并写入 rows 个用户和设备，最后建索引 (SQLite 影子表一次性导入)"""
+    async with engine.begin() as conn:
+        for shadow in ("users_search", "devices_search"):
+            if conn.dialect.name == "sqlite":
+                await conn.execute(text(f"DROP TABLE IF EXISTS {shadow}"))
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    now = datetime.utcnow()
+    async with engine.begin() as conn:
+        for start in range(0, rows, CHUNK_SIZE):
+            ids = range(start, min(start + CHUNK_SIZE, rows))
+            await conn.execute(insert(User), [
+                {
+                    "phone": f"138{i:08d}",
+                    "password_hash": "x",
+                    "nickname": f"用户{i}",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in ids
+            ])
+            await conn.execute(insert(Device), [
+                {
+                    "mac_address": make_mac(i),
+                    "device_type": DeviceType.DETECTOR,
+                    "name": f"设备{i}",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in ids
+            ])
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.run_sync(create_search_index)
+    print(f"建索引耗时 {time.perf_counter() - started:.1f}s")
+
+
+async def timed(coro_factory) -> tuple[float, object]:
+    """重复执行，返回耗时中位数 (毫秒) 和最后一次结果"""
+    samples = []
+    result = None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = await coro_factory()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+async def bench(url: str, rows: int) -> None:
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    print(f"\n== {engine.dialect.name}, {rows} 用户 + {rows} 设备 ==")
+    await reset_schema(engine, rows)
+
+    print(f"{'query':<10} | {'LIKE ms':>9} | {'index ms':>9} | {'matches':>8} | {'typeahead ms':>12}")
+    async with session_factory() as db:
+        for query in QUERIES:
+            like_ms, _ = await timed(lambda: db.scalar(
+                select(func.count()).select_from(Device).where(
+                    Device.mac_address.contains(query) | Device.name.contains(query)
+                )
+            ))
+            index_ms, matches = await timed(lambda: db.scalar(
+                select(func.count()).select_from(Device).where(SearchService.device_filter(db, query))
+            ))
+            user_like_ms, _ = await timed(lambda: db.scalar(
+                select(func.count()).select_from(User).where(
+                    User.phone.contains(query) | User.nickname.contains(query)
+                )
+            ))
+            user_index_ms, user_matches = await timed(lambda: db.scalar(
+                select(func.count()).select_from(User).where(SearchService.user_filter(db, query))
+            ))
+
+            async def typeahead():
+                await SearchService.typeahead_users(db, query, 10)
+                await SearchService.typeahead_devices(db, query, 10)
+            typeahead_ms, _ = await timed(typeahead)
+
+            print(
+                f"{query:<10} | {like_ms + user_like_ms:9.1f} | {index_ms + user_index_ms:9.1f} | "
+                f"{matches + user_matches:8d} | {typeahead_ms:12.1f}"
+            )
+
+    await engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="管理后台搜索基准测试")
+    parser.add_argument("--rows", type=int, default=100_000, help="用户数和设备数")
+    parser.add_argument("--sqlite-url", help="SQLite 连接串，默认使用临时文件")
+    parser.add_argument("--postgres-url", help="PostgreSQL 连接串 (postgresql+asyncpg://...)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_url = args.sqlite_url or f"sqlite+aiosqlite:///{tmp}/bench.db"
+        await bench(sqlite_url, args.rows)
+
+    if args.postgres_url:
+        await bench(args.postgres_url, args.rows)
+    else:
+        print("\n未指定 --postgres-url，跳过 PostgreSQL")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+认证请求查询量检查
+
+在临时 SQLite 库中创建一个带设备和大量姿态日志的用户，统计一次认证请求
+(GET /api/v1/postures/logs/stream/{id}，除鉴权外不访问数据库) 执行的 SQL 条数
+和返回行数，确认鉴权只执行一条按主键的查询、只返回一行，与日志量无关。
+
+用法:
+    python scripts/check_auth_queries.py [--logs 20000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/auth_queries.db"
+os.environ["DEBUG"] = "false"
+
+import httpx
+from sqlalchemy import event
+
+from app.database import async_session, engine
+from app.main import app
+from app.models import Device, DeviceType, User
+from app.services.auth import AuthService
+from app.services.posture_service import PostureService
+from scripts.bench_posture_ingest import make_rows
+
+
+class QueryCounter:
+    """统计引擎执行的语句数和返回行数"""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        self.rows = 0
+
+    def __enter__(self):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine.sync_engine, "before_cursor_execute", self._before)
+        event.remove(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()))
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        # aiosqlite 适配器执行时已预取全部结果行
+        self.rows += len(getattr(cursor, "_rows", ()))
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="认证请求查询量检查")
+    parser.add_argument("--logs", type=int, default=20000, help="测试用户的姿态日志条数")
+    args = parser.parse_args()
+
+    async with app.router.lifespan_context(app):
+        async with async_session() as db:
+            user = User(phone="13900000009", password_hash="x", nickname="check")
+            device = Device(mac_address="AA:BB:CC:00:00:09", device_type=DeviceType.DETECTOR)
+            db.add_all([user, device])
+            await db.flush()
+            device.user_id = user.id
+            await PostureService.bulk_insert_logs(db, make_rows(user.id, device.id, args.logs))
+            await db.commit()
+            user_id = user.id
+
+        token, _ = AuthService.create_access_token(user_id)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            with QueryCounter() as counter:
+                response = await client.get("/api/v1/postures/logs/stream/none", headers=headers)
+
+    print(f"响应状态: {response.status_code}")
+    print(f"执行语句: {len(counter.statements)} 条，返回 {counter.rows} 行")
+    for statement in counter.statements:
+        print(f"  {statement}")
+
+    if response.status_code != 404 or len(counter.statements) != 1 or counter.rows != 1:
+        print("检查失败: 认证请求应只执行一条查询、返回一行")
+        return 1
+    print(f"检查通过 (用户有 {args.logs} 条日志，鉴权只查询一次)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
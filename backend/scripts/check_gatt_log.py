@@ -0,0 +1,82 @@
+"""
+GATT 日志解码检查
+
+按 .cursor/rules/05-ble-protocol.md 的单条日志格式 (timestamp u32 / posture_type u8 /
+duration_sec u16 / triggered u8，Little-Endian) 手工拼出每种 PostureType 的记录，
+确认 decode_log_records 解出的姿态类型、时长、时间戳与协议一致，且非法编码被拒绝。
+
+用法:
+    python scripts/check_gatt_log.py
+"""
+import os
+import struct
+import sys
+from datetime import datetime
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.gatt_log import decode_log_records
+
+# 协议中的 PostureType 编码 -> 期望入库的姿态类型
+SPEC_POSTURES = {
+    0: ("NORMAL", "correct"),
+    1: ("HUNCHED", "slouch"),
+    2: ("LEAN_LEFT", "lean_left"),
+    3: ("LEAN_RIGHT", "lean_right"),
+}
+
+TIMESTAMP = 1735689600  # 2025-01-01 00:00:00 UTC
+
+
+def record(timestamp: int, posture: int, duration: int, triggered: int) -> bytes:
+    return struct.pack("<IBHB", timestamp, posture, duration, triggered)
+
+
+def main() -> int:
+    ok = True
+
+    # 协议示例帧: 2025-01-01 00:00:00，HUNCHED，持续 300 秒，已触发反馈
+    frame = bytes.fromhex("80857467" "01" "2c01" "01")
+    assert frame == record(TIMESTAMP, 1, 300, 1)
+    (row,) = decode_log_records(frame, device_id=1, user_id=1, max_records=10)
+    expected = {
+        "posture_type": "slouch",
+        "duration": 300,
+        "is_correct": False,
+        "recorded_at": datetime.utcfromtimestamp(TIMESTAMP),
+    }
+    actual = {key: row[key] for key in expected}
+    print(f"示例帧 {frame.hex()}: {actual}")
+    ok &= actual == expected
+
+    payload = b"".join(
+        record(TIMESTAMP + code, code, 60 + code, code % 2) for code in SPEC_POSTURES
+    )
+    rows = decode_log_records(payload, device_id=1, user_id=1, max_records=10)
+    for (code, (name, posture_type)), row in zip(SPEC_POSTURES.items(), rows):
+        matched = (
+            row["posture_type"] == posture_type
+            and row["duration"] == 60 + code
+            and row["is_correct"] == (code == 0)
+            and row["recorded_at"] == datetime.utcfromtimestamp(TIMESTAMP + code)
+        )
+        print(f"  {code} {name:<10} -> {row['posture_type']:<10} {'通过' if matched else '不一致'}")
+        ok &= matched
+
+    # 协议外的编码必须拒绝
+    for label, bad in (("姿态类型 4", record(TIMESTAMP, 4, 60, 0)), ("触发标志 2", record(TIMESTAMP, 0, 60, 2))):
+        try:
+            decode_log_records(bad, device_id=1, user_id=1, max_records=10)
+        except ValueError as e:
+            print(f"  {label}: 已拒绝 ({e})")
+        else:
+            print(f"  {label}: 未被拒绝")
+            ok = False
+
+    print("检查通过" if ok else "检查失败")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+统计查询执行计划检查
+
+确认汇总重建使用的按用户 + 时间范围的日志汇总查询 (按日 / 按小时)
+命中 (user_id, recorded_at) 复合索引。
+SQLite 使用 EXPLAIN QUERY PLAN；PostgreSQL 在事务内关闭顺序扫描后 EXPLAIN，
+只验证索引可用 (小表上规划器本来就会倾向顺序扫描)。
+
+用法:
+    python scripts/explain_stats.py
+"""
+import asyncio
+import os
+import sys
+from datetime import date
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database import async_session, init_db
+from app.services.log_query import LogQuery, day_bounds
+
+# 分区表上计划里出现的是各分区自动创建的同构索引 (posture_logs_pYYYYMM_user_id_recorded_at_idx)
+INDEX_NAMES = ("ix_posture_logs_user_recorded", "_user_id_recorded_at_idx")
+
+
+async def main() -> int:
+    await init_db()
+
+    start, end = day_bounds(date(2026, 1, 1), date(2026, 1, 7))
+    queries = {
+        "daily_totals": LogQuery.daily_totals(1, start, end),
+        "hourly_totals": LogQuery.hourly_totals(1, start, end),
+    }
+
+    failed = False
+    async with async_session() as session:
+        if session.bind.dialect.name == "postgresql":
+            await session.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for name, query in queries.items():
+            plan = await LogQuery.explain(session, query)
+            uses_index = any(name in plan for name in INDEX_NAMES)
+            failed = failed or not uses_index
+            print(f"== {name}: {'命中索引' if uses_index else '未命中索引'} ==")
+            print(plan)
+            print()
+
+        await session.rollback()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
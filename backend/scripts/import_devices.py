@@ -0,0 +1,69 @@
+"""
+从 CSV 批量导入设备 (工厂批次)
+
+CSV 首行为表头: mac_address, device_type 必填，name, firmware_version, paired_mac 可选。
+已注册的 MAC 跳过；每行的错误写入 --errors 指定的 CSV (缺省打印前 20 条)。
+
+用法:
+    python scripts/import_devices.py batch.csv [--errors errors.csv] [--chunk-size 5000]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import sys
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+from app.database import async_session, engine
+from app.services.provisioning import ProvisionReport, ProvisioningService
+
+
+async def read_lines(path: str):
+    with open(path, "rb") as f:
+        for line in f:
+            yield line.rstrip(b"\n")
+
+
+async def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="从 CSV 批量导入设备")
+    parser.add_argument("path", help="CSV 文件")
+    parser.add_argument("--errors", help="错误报告输出路径 (CSV)")
+    parser.add_argument("--chunk-size", type=int, default=settings.provisioning_chunk_size, help="每次提交的行数")
+    args = parser.parse_args()
+
+    report = ProvisionReport()
+    try:
+        async with async_session() as db:
+            await ProvisioningService.import_csv(db, read_lines(args.path), report, chunk_size=args.chunk_size)
+    except ValueError as e:
+        print(f"导入中止: {e} (已写入 {report.inserted} 台)")
+        return 1
+    finally:
+        await engine.dispose()
+
+    print(
+        f"共 {report.total} 行: 新增 {report.inserted}，已注册 {report.existing}，无效 {report.invalid}，"
+        f"配对 {report.paired} 对 (失败 {report.pair_failed})"
+    )
+    print(f"耗时 {report.elapsed_ms / 1000:.2f} s，{report.rows_per_second:.0f} 行/s")
+
+    if args.errors:
+        with open(args.errors, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["line", "mac_address", "error"])
+            writer.writeheader()
+            writer.writerows(report.errors)
+        print(f"错误报告: {args.errors} ({len(report.errors)} 行)")
+    else:
+        for error in report.errors[:20]:
+            print(f"  第 {error['line']} 行 {error['mac_address']}: {error['error']}")
+        if len(report.errors) > 20:
+            print(f"  ... 另有 {len(report.errors) - 20} 行，使用 --errors 输出完整报告")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
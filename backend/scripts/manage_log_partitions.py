@@ -0,0 +1,129 @@
+"""
+姿态日志分区管理
+
+用法:
+    python scripts/manage_log_partitions.py status     # 查看分区情况
+    python scripts/manage_log_partitions.py maintain   # 立即执行一轮预建分区 + 保留期清理
+    python scripts/manage_log_partitions.py migrate    # 把已有的普通 posture_logs 表迁移为分区表 (仅 PostgreSQL)
+
+migrate 会锁表并在一个事务内完成: 旧表改名为 posture_logs_legacy，新建分区表并
+按旧数据的时间范围建好分区，复制数据，同步 id 序列。确认无误后手动 DROP 旧表。
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+
+from app.config import get_settings
+from app.database import async_session, init_db
+from app.models.posture_log import PostureLog
+from app.services.log_partition import (
+    DEFAULT_PARTITION, TABLE_NAME, LogPartitionService,
+    add_months, create_partitioned_table, month_start, partition_name, run_maintenance,
+)
+
+settings = get_settings()
+
+LEGACY_TABLE = f"{TABLE_NAME}_legacy"
+
+
+async def status() -> int:
+    async with async_session() as db:
+        if not await LogPartitionService.is_partitioned(db):
+            print(f"{TABLE_NAME} 未分区 ({db.bind.dialect.name})")
+            return 0
+
+        print(f"{TABLE_NAME} 按月分区:")
+        names = [partition_name(month) for month in await LogPartitionService.list_partitions(db)]
+        for name in [*names, DEFAULT_PARTITION]:
+            # reltuples 为统计估计值，避免逐分区 COUNT
+            estimate = (await db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+                {"name": name},
+            )).scalar()
+            print(f"  {name:<28} 约 {max(estimate or 0, 0)} 行")
+    return 0
+
+
+async def maintain() -> int:
+    report = await run_maintenance(async_session)
+    print(f"新建分区: {report['created'] or '无'}")
+    print(f"删除分区: {report['dropped'] or '无'}")
+    print(f"删除日志: {report['deleted']} 条")
+    return 0
+
+
+async def migrate() -> int:
+    async with async_session() as db:
+        if db.bind.dialect.name != "postgresql":
+            print("只有 PostgreSQL 支持分区")
+            return 1
+        if await LogPartitionService.is_partitioned(db):
+            print(f"{TABLE_NAME} 已是分区表")
+            return 0
+
+        await db.execute(text(f"LOCK TABLE {TABLE_NAME} IN ACCESS EXCLUSIVE MODE"))
+        await db.execute(text(f"ALTER TABLE {TABLE_NAME} RENAME TO {LEGACY_TABLE}"))
+        # 索引名全库唯一，旧表的索引一并改名，避免与新表冲突
+        indexes = await db.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+            {"table": LEGACY_TABLE},
+        )
+        for (name,) in indexes.all():
+            await db.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name}_legacy"'))
+
+        conn = await db.connection()
+        await conn.run_sync(create_partitioned_table)
+
+        first, last = (await db.execute(
+            text(f"SELECT min(recorded_at), max(recorded_at) FROM {LEGACY_TABLE}")
+        )).one()
+        current = month_start(datetime.utcnow().date())
+        first_month = month_start(first.date()) if first else current
+        last_month = max(month_start(last.date()) if last else current, current)
+        created = await LogPartitionService.ensure_partitions(
+            db, first_month, add_months(last_month, settings.posture_partition_premake_months)
+        )
+        print(f"已创建 {len(created)} 个分区 ({created[0]} ~ {created[-1]})")
+
+        columns = ", ".join(column.name for column in PostureLog.__table__.columns)
+        result = await db.execute(
+            text(f"INSERT INTO {TABLE_NAME} ({columns}) SELECT {columns} FROM {LEGACY_TABLE}")
+        )
+        print(f"已复制 {result.rowcount} 条日志")
+
+        max_id = (await db.execute(select(func.max(PostureLog.id)))).scalar()
+        if max_id:
+            await db.execute(
+                text(f"SELECT setval(pg_get_serial_sequence('{TABLE_NAME}', 'id'), :value)"),
+                {"value": max_id},
+            )
+
+        await db.commit()
+
+    print(f"迁移完成，确认无误后执行: DROP TABLE {LEGACY_TABLE};")
+    return 0
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="姿态日志分区管理")
+    parser.add_argument("command", choices=["status", "maintain", "migrate"])
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        return await migrate()
+
+    await init_db()
+    if args.command == "status":
+        return await status()
+    return await maintain()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
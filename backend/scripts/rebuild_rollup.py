@@ -0,0 +1,68 @@
+"""
+姿态汇总 (日 / 小时) 重建 / 一致性校验
+
+用法:
+    python scripts/rebuild_rollup.py rebuild [--user-id N] [--since 2026-01-01] [--until 2026-01-31]
+    python scripts/rebuild_rollup.py check [--user-id N] [--since ...] [--until ...]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import async_session, init_db
+from app.services.log_partition import retention_cutoff
+from app.services.rollup_service import RollupService
+
+
+async def rebuild(user_id, since, until):
+    async with async_session() as session:
+        count = await RollupService.rebuild(session, user_id, since, until)
+        await session.commit()
+    print(f"汇总重建完成，日汇总共 {count} 行")
+
+
+async def check(user_id, since, until) -> int:
+    async with async_session() as session:
+        mismatches = await RollupService.check(session, user_id, since, until)
+
+    for item in mismatches[:50]:
+        key = " ".join(f"{name}={value}" for name, value in item["key"].items())
+        print(f"不一致 [{item['table']}]: {key} 原始={item['expected']} 汇总={item['actual']}")
+    if len(mismatches) > 50:
+        print(f"... 共 {len(mismatches)} 处不一致")
+
+    if mismatches:
+        print("校验失败，可执行 rebuild 修复")
+        return 1
+    print("汇总与原始日志一致")
+    return 0
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="姿态汇总重建 / 一致性校验")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, default=None, help="只处理指定用户")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="起始日期 (含)")
+    parser.add_argument("--until", type=date.fromisoformat, default=None, help="结束日期 (含)")
+    args = parser.parse_args()
+
+    # 保留期之前的原始日志已清理，汇总是唯一数据来源，不能重建
+    cutoff = retention_cutoff()
+    if cutoff is not None and (args.since is None or args.since < cutoff):
+        print(f"原始日志只保留 {cutoff} 之后的数据，起始日期调整为 {cutoff}")
+        args.since = cutoff
+
+    await init_db()
+    if args.command == "rebuild":
+        await rebuild(args.user_id, args.since, args.until)
+        return 0
+    return await check(args.user_id, args.since, args.until)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
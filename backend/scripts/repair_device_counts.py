@@ -0,0 +1,38 @@
+"""
+用户设备数 (users.device_count) 修复
+
+按设备表批量重算所有用户的 device_count，只更新计数不一致的用户。
+旧库中还没有 device_count 列时由 init_db (与服务启动相同的建表步骤) 补列并回填。
+
+用法:
+    python scripts/repair_device_counts.py [--user-id N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# 将项目根目录添加到 python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import async_session, init_db
+from app.services.user_service import UserService
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="用户设备数修复")
+    parser.add_argument("--user-id", type=int, default=None, help="只修复指定用户")
+    args = parser.parse_args()
+
+    await init_db()
+
+    async with async_session() as session:
+        fixed = await UserService.recount_devices(session, args.user_id)
+        await session.commit()
+
+    print(f"修复完成，{fixed} 个用户的设备数已更正")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
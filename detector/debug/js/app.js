@@ -3,6 +3,9 @@
  * 整合 PostureDetector 和 BleSimulator
  */
 
+// 在线心跳间隔 (需小于后端 PRESENCE_LEASE_DETECTOR)
+const HEARTBEAT_INTERVAL_MS = 30000;
+
 // 状态变量
 const state = {
     uptime: 0,
@@ -188,6 +191,13 @@ function setupTimers() {
                 `${hours.toString().padStart(2, '0')}:${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
         }
     }, 1000);
+
+    // 在线心跳 (后端租约到期前续约，超时未心跳视为离线)
+    setInterval(() => {
+        if (elements.powerSwitch.checked) {
+            reportOnlineStatus(true);
+        }
+    }, HEARTBEAT_INTERVAL_MS);
 }
 
 
@@ -136,8 +136,8 @@ struct DeviceInfo: Codable, Identifiable {
     let firmwareVersion: String
     let userId: Int?
     let pairedDeviceId: Int?
-    let isOnline: Bool
-    let lastSeenAt: Date?
+    var isOnline: Bool
+    var lastSeenAt: Date?
     let createdAt: Date
     let userPhone: String?
     let pairedDeviceMac: String?
@@ -157,6 +157,23 @@ struct DeviceInfo: Codable, Identifiable {
     }
 }
 
+/// 实时事件 (presence: 设备上线 / 离线，posture: 新写入的姿态日志汇总)
+struct DeviceEvent: Decodable {
+    let type: String
+    let deviceId: Int?
+    let userId: Int?
+    let isOnline: Bool?
+    let lastSeenAt: Date?
+    
+    private enum CodingKeys: String, CodingKey {
+        case type
+        case deviceId = "device_id"
+        case userId = "user_id"
+        case isOnline = "is_online"
+        case lastSeenAt = "last_seen_at"
+    }
+}
+
 /// 设备创建请求
 struct DeviceCreateRequest: Codable {
     let macAddress: String
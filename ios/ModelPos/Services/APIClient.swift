@@ -211,6 +211,58 @@ actor APIClient {
         let _: APIResponse<String?> = try await request("DELETE", path: "/users/me/devices/\(deviceId)")
     }
     
+    /// 订阅我的设备实时事件 (WebSocket)
+    /// 连接断开时流结束，调用方重新加载列表后再次订阅
+    func deviceEvents() throws -> AsyncThrowingStream<DeviceEvent, Error> {
+        guard let token = accessToken else {
+            throw APIError.unauthorized
+        }
+        guard var components = URLComponents(string: baseURL + "/events/ws") else {
+            throw APIError.invalidURL
+        }
+        components.scheme = components.scheme == "https" ? "wss" : "ws"
+        components.queryItems = [
+            URLQueryItem(name: "token", value: token),
+            URLQueryItem(name: "scope", value: "mine")
+        ]
+        guard let url = components.url else {
+            throw APIError.invalidURL
+        }
+        
+        let task = session.webSocketTask(with: url)
+        let decoder = self.decoder
+        task.resume()
+        
+        return AsyncThrowingStream { continuation in
+            let receiver = Task {
+                do {
+                    while true {
+                        let data: Data
+                        switch try await task.receive() {
+                        case .string(let text):
+                            data = Data(text.utf8)
+                        case .data(let payload):
+                            data = payload
+                        @unknown default:
+                            continue
+                        }
+                        let event = try decoder.decode(DeviceEvent.self, from: data)
+                        // 服务端空闲保活
+                        if event.type != "ping" {
+                            continuation.yield(event)
+                        }
+                    }
+                } catch {
+                    continuation.finish(throwing: error)
+                }
+            }
+            continuation.onTermination = { _ in
+                receiver.cancel()
+                task.cancel(with: .goingAway, reason: nil)
+            }
+        }
+    }
+    
     // MARK: - 姿态数据 API
     
     /// 上传姿态日志
@@ -49,6 +49,7 @@ struct DevicesView: View {
             }
             .task {
                 await loadDevices()
+                await watchPresence()
             }
             .refreshable {
                 await loadDevices()
@@ -56,6 +57,28 @@ struct DevicesView: View {
         }
     }
     
+    /// 接收设备上线 / 离线推送 (视图消失时结束)，断线后静默重新加载列表并重连
+    private func watchPresence() async {
+        while !Task.isCancelled {
+            do {
+                for try await event in try await APIClient.shared.deviceEvents() where event.type == "presence" {
+                    guard let index = devices.firstIndex(where: { $0.id == event.deviceId }),
+                          let isOnline = event.isOnline else { continue }
+                    devices[index].isOnline = isOnline
+                    devices[index].lastSeenAt = event.lastSeenAt
+                }
+            } catch {
+                // 断线或令牌失效，稍后重试
+            }
+            
+            try? await Task.sleep(for: .seconds(3))
+            if Task.isCancelled { break }
+            if let latest = try? await APIClient.shared.getMyDevices() {
+                devices = latest
+            }
+        }
+    }
+    
     private func loadDevices() async {
         isLoading = true
         errorMessage = nil